@@ -1,49 +1,168 @@
 # backend/app/agent/company_agent.py
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain.chains import LLMChain
-from langchain.prompts import PromptTemplate
+import asyncio
+import json
 import logging
 import re
-from backend.app.memory import initialize_pinecone, query_similar
-from backend.app.embeddings import generate_embedding
-from backend.app.data_ingestion import process_company_data
-from backend.app.config import GEMINI_API_KEY
+import time
+from backend.app.memory import initialize_pinecone
+from backend.app.embeddings import generate_embedding, cached_embedding
+from backend.app.ingest_jobs import ingest_jobs, QueueFullError
+from backend.app.agent.llm_registry import register_prompt, run_chain, get_streaming_runnable, warm_up
+from backend.app.agent.retrieval import retrieve, lexical_retrieval, reciprocal_rank_fusion
+from backend.app.agent.context import (
+    pack_context,
+    compact_table,
+    OVERVIEW_FIELDS,
+    INCOME_STATEMENT_FIELDS,
+    QUOTE_FIELDS
+)
+from backend.app.rate_limit import acquire
+from backend.app.answer_cache import answer_cache
+from backend.app.tools.company_resolver import get_company_resolver, canonical_company
+from backend.app.metrics import (
+    PIPELINE_STAGE_SECONDS,
+    PIPELINE_IN_FLIGHT,
+    PIPELINE_ROUTES,
+    RETRIEVAL_MODE,
+    CONTEXT_TOKENS,
+    GENERATION_FIRST_TOKEN_SECONDS
+)
 
 logger = logging.getLogger(__name__)
 
 # Initialize Pinecone
 pinecone_index = initialize_pinecone()
 
+# Prompts are compiled once and shared through the LLM registry
+register_prompt(
+    "extract_company",
+    """
+    Extract the company name and stock symbol (if present) from the following query.
+
+    Query: {query}
+
+    IMPORTANT: You must respond ONLY with a valid JSON object in the following format:
+    {{
+        "company_name": "extracted company name or null if none found",
+        "company_symbol": "extracted stock symbol or null if none found"
+    }}
+
+    Do not include any explanations, notes, or additional text before or after the JSON.
+    """,
+    input_variables=["query"],
+    temperature=0.1
+)
+
+register_prompt(
+    "query_relevance",
+    """
+    Classify the following query into one of these categories:
+
+    Query: {query}
+
+    - GREETING: If it's a greeting, small talk, or asking about capabilities (e.g., "hello", "how are you", "what can you do")
+    - COMPANY: If it's related to companies, business, finance, stocks, or corporate information
+    - GENERAL: If it's about general knowledge, entertainment, personal topics, or other non-business subjects
+
+    Respond with ONLY "GREETING", "COMPANY", or "GENERAL".
+    """,
+    input_variables=["query"],
+    temperature=0.1
+)
+
+register_prompt(
+    "query_router",
+    """
+    Classify the following query and extract the company it is about.
+
+    Query: {query}
+
+    Categories:
+    - GREETING: a greeting, small talk, or asking about capabilities (e.g., "hello", "how are you", "what can you do")
+    - COMPANY: related to companies, business, finance, stocks, or corporate information
+    - GENERAL: general knowledge, entertainment, personal topics, or other non-business subjects
+
+    IMPORTANT: You must respond ONLY with a valid JSON object in the following format:
+    {{
+        "query_type": "GREETING", "COMPANY" or "GENERAL",
+        "company_name": "extracted company name or null if none found",
+        "company_symbol": "extracted stock symbol or null if none found"
+    }}
+
+    Do not include any explanations, notes, or additional text before or after the JSON.
+    """,
+    input_variables=["query"],
+    temperature=0.1
+)
+
+register_prompt(
+    "greeting",
+    """
+    You are a friendly AI assistant specialized in company research and financial information.
+
+    Current date: {current_date}
+    Current time: {current_time}
+
+    Respond to this greeting or small talk in a friendly, concise way. Mention that you're 
+    specialized in company information but can also chat casually.
+
+    User message: {query}
+
+    Response:
+    """,
+    input_variables=["query", "current_date", "current_time"],
+    temperature=0.7
+)
+
+register_prompt(
+    "general",
+    """
+    You are an AI assistant specialized in company research and financial information.
+
+    The user has asked a general knowledge question that's not related to companies or business.
+
+    User message: {query}
+
+    Politely explain that while you're primarily designed to help with company and business information,
+    you can try to assist with their question. Then provide a brief, helpful response to their query
+    if possible, or suggest they ask about company-related topics where you can provide more detailed information.
+
+    Response:
+    """,
+    input_variables=["query"],
+    temperature=0.7
+)
+
+register_prompt(
+    "company_answer",
+    """
+    You are an AI assistant specialized in company research and financial information.
+
+    Use the following information to answer the user's question about {company_name}.
+
+    Context information:
+    {context}
+
+    User question: {query}
+
+    Provide a comprehensive but concise answer based on the context information.
+    If the context doesn't contain enough information to fully answer the question,
+    acknowledge this and provide what you can based on the available information.
+
+    Response:
+    """,
+    input_variables=["company_name", "context", "query"],
+    temperature=0.7
+)
+
+def warm_up_llm_clients():
+    """Pre-build every agent chain and the streaming answer runnables."""
+    warm_up(streaming_prompts=("greeting", "general", "company_answer"))
+
 async def extract_company_info(query):
     """Extract company name and possibly stock symbol from the query."""
-    # Use Gemini to extract company information
-    llm = ChatGoogleGenerativeAI(
-        model="gemini-2.0-flash",
-        google_api_key=GEMINI_API_KEY,
-        temperature=0.1
-    )
-    
-    prompt = PromptTemplate(
-        template="""
-        Extract the company name and stock symbol (if present) from the following query.
-        
-        Query: {query}
-        
-        IMPORTANT: You must respond ONLY with a valid JSON object in the following format:
-        {{
-            "company_name": "extracted company name or null if none found",
-            "company_symbol": "extracted stock symbol or null if none found"
-        }}
-        
-        Do not include any explanations, notes, or additional text before or after the JSON.
-        """,
-        input_variables=["query"]
-    )
-    
-    chain = LLMChain(llm=llm, prompt=prompt)
-    
     try:
-        response = await chain.arun(query=query)
+        response = await run_chain("extract_company", query=query)
         # Clean the response to ensure it's valid JSON
         response = response.strip()
         # Remove any markdown formatting that might be present
@@ -92,30 +211,7 @@ async def check_query_relevance(query: str):
     - "general" for general knowledge questions
     """
     try:
-        # Use Gemini to check relevance
-        llm = ChatGoogleGenerativeAI(
-            model="gemini-2.0-flash",
-            google_api_key=GEMINI_API_KEY,
-            temperature=0.1
-        )
-        
-        prompt = PromptTemplate(
-            template="""
-            Classify the following query into one of these categories:
-            
-            Query: {query}
-            
-            - GREETING: If it's a greeting, small talk, or asking about capabilities (e.g., "hello", "how are you", "what can you do")
-            - COMPANY: If it's related to companies, business, finance, stocks, or corporate information
-            - GENERAL: If it's about general knowledge, entertainment, personal topics, or other non-business subjects
-            
-            Respond with ONLY "GREETING", "COMPANY", or "GENERAL".
-            """,
-            input_variables=["query"]
-        )
-        
-        chain = LLMChain(llm=llm, prompt=prompt)
-        response = await chain.arun(query=query)
+        response = await run_chain("query_relevance", query=query)
         
         # Clean up response and check
         response = response.strip().upper()
@@ -130,273 +226,352 @@ async def check_query_relevance(query: str):
         # If there's an error, default to allowing the query
         return "company"
 
-# Update the generate_response function to use all available tools
+# Cheap local pre-classification: obvious greetings and explicit tickers are
+# routed without any LLM call
+_GREETING_RE = re.compile(
+    r"^\s*(hi|hello|hey|hiya|howdy|yo|greetings|good (morning|afternoon|evening)|"
+    r"how are you( doing)?|what can you do|who are you|what are you|help|thanks|thank you|"
+    r"thx|bye|goodbye|see you)\b[\s!?.,]*(there|again|bot|assistant|today)?[\s!?.,]*$",
+    re.IGNORECASE
+)
+_TICKER_PATTERNS = [
+    re.compile(r"\$([A-Z]{1,5}(?:\.[A-Z]{1,2})?)\b"),
+    re.compile(r"\b(?:NYSE|NASDAQ|NSE|BSE|AMEX|LSE|TSX)\s*:\s*([A-Z]{1,5}(?:\.[A-Z]{1,2})?)\b"),
+    re.compile(r"\b(?:ticker|symbol)\s+(?:is\s+)?([A-Z]{1,5}(?:\.[A-Z]{1,2})?)\b"),
+]
 
-async def generate_response(user_id, query):
-    """Generate a response to a user query using Gemini and Pinecone."""
+def preclassify_query(query: str):
+    """Route a query locally when the answer is obvious.
+    
+    Returns a route dict (see ``route_query``) for greetings, queries that
+    name an explicit ticker (``$AAPL``, ``NASDAQ: AAPL``, ``ticker AAPL``) and
+    queries naming exactly one company known to the offline resolver, or None
+    when the LLM router is needed.
+    """
+    if _GREETING_RE.match(query):
+        return {"query_type": "greeting", "company_name": None, "company_symbol": None, "source": "local"}
+    
+    resolver = get_company_resolver()
+    for pattern in _TICKER_PATTERNS:
+        match = pattern.search(query)
+        if match:
+            symbol = match.group(1).upper()
+            listing = resolver.by_symbol(symbol)
+            company_name = listing["company_name"] if listing else symbol
+            return {"query_type": "company", "company_name": company_name, "company_symbol": symbol, "source": "local"}
+    
+    # A single, unambiguous company named in the query is resolved offline
+    listing = resolver.find_in_query(query)
+    if listing:
+        return {
+            "query_type": "company",
+            "company_name": listing["company_name"],
+            "company_symbol": listing["company_symbol"],
+            "source": "local"
+        }
+    
+    return None
+
+def _parse_json_response(response: str):
+    """Parse a JSON object from an LLM reply, tolerating markdown code fences."""
+    response = response.strip()
+    if response.startswith("```json"):
+        response = response.replace("```json", "", 1)
+    elif response.startswith("```"):
+        response = response.replace("```", "", 1)
+    if response.endswith("```"):
+        response = response[:-3]
+    result = json.loads(response.strip())
+    if not isinstance(result, dict):
+        raise ValueError("Response is not a dictionary")
+    return result
+
+async def route_query(query: str):
+    """Classify a query and extract its company in a single step.
+    
+    Returns a dict with ``query_type`` ("greeting", "company" or "general"),
+    ``company_name``, ``company_symbol`` and ``source`` ("local" or "llm").
+    The local pre-classifier is tried first; otherwise one LLM call returns
+    all three fields at once.
+    """
+    route = preclassify_query(query)
+    if route:
+        return route
+    
     try:
-        # First, check what type of query this is
-        query_type = await check_query_relevance(query)
-        
-        # Initialize the LLM
-        llm = ChatGoogleGenerativeAI(
-            model="gemini-2.0-flash",
-            google_api_key=GEMINI_API_KEY,
-            temperature=0.7
+        result = _parse_json_response(await run_chain("query_router", query=query))
+        query_type = str(result.get("query_type") or "").upper()
+        if "GREETING" in query_type:
+            query_type = "greeting"
+        elif "GENERAL" in query_type:
+            query_type = "general"
+        else:
+            query_type = "company"
+        # Canonicalize the extracted name so queries use the name ingestion stores under
+        company_name, company_symbol = canonical_company(
+            result.get("company_name") or None, result.get("company_symbol") or None
         )
+        return {
+            "query_type": query_type,
+            "company_name": company_name,
+            "company_symbol": company_symbol,
+            "source": "llm"
+        }
+    except Exception as e:
+        logger.error(f"Error routing query: {str(e)}")
+        # If there's an error, default to treating it as a company query
+        listing = get_company_resolver().find_in_query(query, strict=False) or {}
+        return {
+            "query_type": "company",
+            "company_name": listing.get("company_name"),
+            "company_symbol": listing.get("company_symbol"),
+            "source": "fallback"
+        }
+
+# Update the generate_response function to use all available tools
+
+async def _no_progress(stage, status, **details):
+    """Default progress callback: ignore pipeline stage events."""
+    return None
+
+async def prepare_response(query, progress=_no_progress, use_cache=True):
+    """Run every pipeline stage up to final generation.
+    
+    ``progress(stage, status, **details)`` is awaited as each stage starts and
+    finishes (classification, company_extraction, retrieval, external_fetch,
+    context).
+    Company questions close enough to one answered before are served from
+    the semantic answer cache unless ``use_cache`` is False.
+    
+    Returns a tuple of (prompt_name, inputs) for the final LLM call, where
+    prompt_name is a prompt registered in the LLM registry, or
+    (None, message) when the answer needs no generation step.
+    """
+    # Classify the query and extract the company in one routing step
+    await progress("classification", "started")
+    with PIPELINE_STAGE_SECONDS.time(stage="classification"):
+        route = await route_query(query)
+    query_type = route["query_type"]
+    PIPELINE_ROUTES.inc(query_type=query_type, source=route["source"])
+    await progress("classification", "done", query_type=query_type, source=route["source"])
+    
+    # Handle greeting/small talk
+    if query_type == "greeting":
+        # Handle greeting logic...
+        from datetime import datetime
+        current_date = datetime.now().strftime("%B %d, %Y")
+        current_time = datetime.now().strftime("%H:%M:%S")
         
-        # Handle greeting/small talk
-        if query_type == "greeting":
-            # Handle greeting logic...
-            from datetime import datetime
-            current_date = datetime.now().strftime("%B %d, %Y")
-            current_time = datetime.now().strftime("%H:%M:%S")
-            
-            prompt = PromptTemplate(
-                template="""
-                You are a friendly AI assistant specialized in company research and financial information.
-                
-                Current date: {current_date}
-                Current time: {current_time}
-                
-                Respond to this greeting or small talk in a friendly, concise way. Mention that you're 
-                specialized in company information but can also chat casually.
-                
-                User message: {query}
-                
-                Response:
-                """,
-                input_variables=["query", "current_date", "current_time"]
-            )
-            
-            chain = LLMChain(llm=llm, prompt=prompt)
-            return await chain.arun(query=query, current_date=current_date, current_time=current_time)
+        return "greeting", {"query": query, "current_date": current_date, "current_time": current_time}
+    
+    # Handle general knowledge
+    elif query_type == "general":
+        # Handle general knowledge logic...
+        return "general", {"query": query}
+    
+    # For company-related queries the router has already extracted the company
+    await progress("company_extraction", "started")
+    company_name = route.get("company_name")
+    company_symbol = route.get("company_symbol")
+    await progress("company_extraction", "done", company_name=company_name, company_symbol=company_symbol)
+    
+    # If no company name was extracted, inform the user
+    if not company_name:
+        return None, "I couldn't identify a specific company in your query. Could you please mention the company name more clearly?"
+    
+    logger.info(f"Extracted company: {company_name}, symbol: {company_symbol}")
+    
+    # Exact-term questions (tickers, products, people) are answered from the
+    # lexical index alone, without a vector search. The query is embedded
+    # alongside the lexical search either way, since the answer cache is
+    # keyed by embedding
+    async def search_lexical():
+        with PIPELINE_STAGE_SECONDS.time(stage="lexical_search"):
+            return await asyncio.to_thread(lexical_retrieval, query, company_name)
+    
+    async def embed_query():
+        with PIPELINE_STAGE_SECONDS.time(stage="embedding"):
+            return await generate_embedding(query)
+    
+    (lexical_matches, lexical_only), query_embedding = await asyncio.gather(search_lexical(), embed_query())
+    
+    # Serve the answer to an equivalent earlier question about this company
+    with PIPELINE_STAGE_SECONDS.time(stage="answer_cache"):
+        cached = answer_cache.lookup(company_name, query_embedding, bypass=not use_cache)
+    if cached:
+        answer, similarity, cached_query = cached
+        logger.info(f"Answer cache hit for {company_name} ({similarity:.3f}): {cached_query!r}")
+        await progress("answer_cache", "hit", similarity=round(similarity, 4))
+        return None, answer
+    
+    await progress("retrieval", "started")
+    if lexical_only:
+        matches = lexical_matches
+        mode = "lexical"
+    else:
+        # Search Pinecone with and without the company filter at once, then
+        # fuse with the lexical matches
+        with PIPELINE_STAGE_SECONDS.time(stage="retrieval"):
+            vector_matches = await retrieve(pinecone_index, query_embedding, company_name)
+        matches = reciprocal_rank_fusion(vector_matches, lexical_matches)
+        mode = "hybrid"
+    RETRIEVAL_MODE.inc(mode=mode)
+    similar_info = list(matches)
+    await progress("retrieval", "done", matches=len(similar_info), mode=mode)
+    
+    # If we still don't have information, fetch it from external APIs
+    if not similar_info:
+        logger.info(f"No data found in Pinecone for {company_name}, fetching from external sources")
+        await progress("external_fetch", "started")
         
-        # Handle general knowledge
-        elif query_type == "general":
-            # Handle general knowledge logic...
-            prompt = PromptTemplate(
-                template="""
-                You are an AI assistant specialized in company research and financial information.
-                
-                The user has asked a general knowledge question that's not related to companies or business.
-                
-                User message: {query}
-                
-                Politely explain that while you're primarily designed to help with company and business information,
-                you can try to assist with their question. Then provide a brief, helpful response to their query
-                if possible, or suggest they ask about company-related topics where you can provide more detailed information.
-                
-                Response:
-                """,
-                input_variables=["query"]
-            )
-            
-            chain = LLMChain(llm=llm, prompt=prompt)
-            return await chain.arun(query=query)
+        # Import here to avoid circular imports
+        from backend.app.tools.company_tools import fetch_company_data_concurrently
         
-        # For company-related queries
-        else:
-            # Extract company information
-            company_info = await extract_company_info(query)
-            
-            # Fix here: Check if company_info is a tuple and handle it properly
-            if isinstance(company_info, tuple):
-                company_name = company_info[0] if len(company_info) > 0 else None
-                company_symbol = company_info[1] if len(company_info) > 1 else None
-                company_info = {
-                    "company_name": company_name,
-                    "company_symbol": company_symbol
-                }
-            
-            # Now safely get the company name and symbol
-            company_name = company_info.get("company_name")
-            company_symbol = company_info.get("company_symbol")
-            
-            # If no company name was extracted, inform the user
-            if not company_name:
-                return "I couldn't identify a specific company in your query. Could you please mention the company name more clearly?"
-            
-            logger.info(f"Extracted company: {company_name}, symbol: {company_symbol}")
-            
-            # Generate embedding for the query
-            query_embedding = await generate_embedding(query)
-            
-            # Search for similar information in Pinecone
-            similar_info = []
-            
-            # Try to find company by name first
+        # Fetch company data from every source at once; each source has its
+        # own timeout, so wall time is bounded by the slowest one
+        with PIPELINE_STAGE_SECONDS.time(stage="external_fetch"):
+            company_symbol, company_data = await fetch_company_data_concurrently(company_name, company_symbol)
+        
+        # Structured Alpha Vantage data goes in as short tables rather than raw dicts
+        if "overview" in company_data:
+            overview = company_data["overview"]
+            similar_info.append(compact_table("Company Overview", overview, OVERVIEW_FIELDS))
+            if isinstance(overview, dict) and overview.get("Description"):
+                similar_info.append(f"Company Description: {overview['Description']}")
+        
+        if "financials" in company_data:
+            financials = company_data["financials"]
+            statement = financials.get("income_statement") if isinstance(financials, dict) else financials
+            similar_info.append(compact_table("Latest Annual Income Statement", statement, INCOME_STATEMENT_FIELDS))
+        
+        if "stock_price" in company_data:
+            similar_info.append(compact_table("Stock Price", company_data["stock_price"], QUOTE_FIELDS))
+        
+        if "news" in company_data:
+            for article in company_data["news"][:3]:  # Limit to top 3 news items
+                similar_info.append(f"News: {article.get('title')} - {article.get('description')}")
+        
+        if "search_results" in company_data:
+            for result in company_data["search_results"][:3]:  # Limit to top 3 results
+                similar_info.append(f"Info: {result.get('title')} - {result.get('snippet')}")
+        
+        for url_info in company_data.get("url_content", []):
+            similar_info.append(f"Additional Info: {url_info.get('text', '')[:500]}...")
+        
+        if "wikipedia" in company_data:
+            similar_info.append(f"Wikipedia: {company_data['wikipedia'].get('extract', '')}")
+        
+        await progress("external_fetch", "done", sources=sorted(company_data.keys()))
+        
+        # Answer from the fetched data now; storing it for future questions
+        # (fetch, embed, upsert) runs as a background ingestion job
+        if company_data:
             try:
-                results = query_similar(
-                    pinecone_index, 
-                    query_embedding, 
-                    filter={"company_name": {"$eq": company_name}},
-                    top_k=5
-                )
-                
-                if results and hasattr(results, 'matches') and results.matches:
-                    for match in results.matches:
-                        if match.score > 0.7:  # Relevance threshold
-                            similar_info.append(match.metadata.get("content", ""))
+                job = await ingest_jobs.submit(company_name, company_symbol)
+                logger.info(f"Queued ingestion job {job['id']} for {company_name}")
+            except (QueueFullError, RuntimeError) as e:
+                logger.warning(f"Not storing fetched data for {company_name}: {str(e)}")
             except Exception as e:
-                logger.error(f"Error querying Pinecone by company name: {str(e)}")
-            
-            # If no results by exact name, try a more flexible search
-            if not similar_info:
-                try:
-                    # Query without company filter to find any relevant information
-                    results = query_similar(
-                        pinecone_index,
-                        query_embedding,
-                        top_k=5
-                    )
-                    
-                    if results and hasattr(results, 'matches') and results.matches:
-                        for match in results.matches:
-                            if match.score > 0.7:  # Relevance threshold
-                                similar_info.append(match.metadata.get("content", ""))
-                except Exception as e:
-                    logger.error(f"Error querying Pinecone without filter: {str(e)}")
+                logger.error(f"Error queueing ingestion for {company_name}: {str(e)}")
+    
+    # Deduplicate, select and trim the passages to the prompt's token budget
+    with PIPELINE_STAGE_SECONDS.time(stage="context"):
+        context, context_stats = pack_context(similar_info)
+    CONTEXT_TOKENS.observe(context_stats["tokens"])
+    await progress("context", "done", **context_stats)
+    
+    # If we still don't have information, inform the user
+    if not context:
+        return None, f"I couldn't find specific information about {company_name}. Could you please provide more details or ask about a different company?"
+    
+    # Generate a response using the context and query
+    return "company_answer", {"company_name": company_name, "context": context, "query": query}
+
+async def _remember_answer(inputs, answer, started_at):
+    """Store a generated company answer in the semantic answer cache."""
+    try:
+        # prepare_response embedded the query, so this is a cache read
+        query_embedding = await cached_embedding(inputs["query"])
+        if query_embedding is None:
+            return
+        answer_cache.store(inputs["company_name"], inputs["query"], query_embedding, answer, started_at)
+    except Exception as e:
+        logger.error(f"Error caching answer: {str(e)}")
+
+async def generate_response(user_id, query, use_cache=True):
+    """Generate a response to a user query using Gemini and Pinecone."""
+    try:
+        with PIPELINE_IN_FLIGHT.track(mode="generate"):
+            started_at = time.time()
+            prompt_name, inputs = await prepare_response(query, use_cache=use_cache)
+            if prompt_name is None:
+                return inputs
             
-            # If we still don't have information, fetch it from external APIs
-            if not similar_info:
-                logger.info(f"No data found in Pinecone for {company_name}, fetching from external sources")
-                
-                # Import here to avoid circular imports
-                from backend.app.tools.company_tools import (
-                    get_company_overview,
-                    get_stock_price,
-                    get_company_news,
-                    search_company_info,
-                    get_wikipedia_info,
-                    get_company_financials,
-                    extract_info_from_url
-                )
-                
-                # Fetch company data from multiple sources
-                company_data = {}
-                
-                # Try to get stock symbol if not provided
-                if not company_symbol:
-                    try:
-                        # Search for the company symbol
-                        from backend.app.tools.company_tools import search_company_symbol
-                        company_symbol = await search_company_symbol(company_name)
-                        logger.info(f"Found symbol for {company_name}: {company_symbol}")
-                    except Exception as e:
-                        logger.error(f"Error finding symbol for {company_name}: {str(e)}")
-                
-                # Get company overview from Alpha Vantage
-                try:
-                    if company_symbol:
-                        overview = get_company_overview(company_symbol)
-                        if overview and not isinstance(overview, str) and "error" not in overview:
-                            company_data["overview"] = overview
-                            similar_info.append(f"Company Overview: {overview}")
-                except Exception as e:
-                    logger.error(f"Error getting company overview: {str(e)}")
-                
-                # Get company financials from Alpha Vantage
-                try:
-                    if company_symbol:
-                        financials = get_company_financials(company_symbol)
-                        if financials and not isinstance(financials, str) and "error" not in financials:
-                            company_data["financials"] = financials
-                            similar_info.append(f"Financial Data: {financials}")
-                except Exception as e:
-                    logger.error(f"Error getting company financials: {str(e)}")
-                
-                # Get stock price
-                try:
-                    if company_symbol:
-                        price_data = get_stock_price(company_symbol)
-                        if price_data and "error" not in price_data:
-                            company_data["stock_price"] = price_data
-                            similar_info.append(f"Stock Price: {price_data}")
-                except Exception as e:
-                    logger.error(f"Error getting stock price: {str(e)}")
-                
-                # Get company news
-                try:
-                    news = get_company_news(company_name)
-                    if news and not isinstance(news, str) and "error" not in news:
-                        company_data["news"] = news
-                        for article in news[:3]:  # Limit to top 3 news items
-                            similar_info.append(f"News: {article.get('title')} - {article.get('description')}")
-                except Exception as e:
-                    logger.error(f"Error getting company news: {str(e)}")
-                
-                # Search for general company information
-                try:
-                    search_results = search_company_info(company_name)
-                    if search_results and not isinstance(search_results, str) and "error" not in search_results:
-                        company_data["search_results"] = search_results
-                        for result in search_results[:3]:  # Limit to top 3 results
-                            similar_info.append(f"Info: {result.get('title')} - {result.get('snippet')}")
-                            
-                            # Try to extract more info from the top result URL
-                            if result.get("link") and len(similar_info) < 10:
-                                url_info = extract_info_from_url(result.get("link"))
-                                if url_info and "error" not in url_info:
-                                    similar_info.append(f"Additional Info: {url_info.get('text', '')[:500]}...")
-                except Exception as e:
-                    logger.error(f"Error searching company info: {str(e)}")
-                
-                # Get Wikipedia information
-                try:
-                    wiki_info = get_wikipedia_info(company_name)
-                    if wiki_info and "error" not in wiki_info:
-                        company_data["wikipedia"] = wiki_info
-                        similar_info.append(f"Wikipedia: {wiki_info.get('extract', '')}")
-                except Exception as e:
-                    logger.error(f"Error getting Wikipedia info: {str(e)}")
-                
-                # In the generate_response function, there's a syntax error with nested try blocks
-                # Let's fix the part where you're storing data in Pinecone
-                
-                # Store the newly fetched data in Pinecone for future use
-                if company_data:
-                    try:
-                        # Import process_company_data from the correct module
-                        from backend.app.data_ingestion import process_company_data
-                        
-                        # Process and store the company data
-                        await process_company_data(company_name, company_data)
-                        logger.info(f"Stored new data for {company_name} in Pinecone")
-                    except Exception as e:
-                        logger.error(f"Error storing company data: {str(e)}")
-                
-                # If we still don't have information, inform the user
-                if not similar_info:
-                    return f"I couldn't find specific information about {company_name}. Could you please provide more details or ask about a different company?"
-                
-                # Combine the similar information into context
-                context = "\n\n".join(similar_info)
-                
-                # Generate a response using the context and query
-                prompt = PromptTemplate(
-                    template="""
-                    You are an AI assistant specialized in company research and financial information.
-                    
-                    Use the following information to answer the user's question about {company_name}.
-                    
-                    Context information:
-                    {context}
-                    
-                    User question: {query}
-                    
-                    Provide a comprehensive but concise answer based on the context information.
-                    If the context doesn't contain enough information to fully answer the question,
-                    acknowledge this and provide what you can based on the available information.
-                    
-                    Response:
-                    """,
-                    input_variables=["company_name", "context", "query"]
-                )
-                
-                chain = LLMChain(llm=llm, prompt=prompt)
-                return await chain.arun(company_name=company_name, context=context, query=query)
+            with PIPELINE_STAGE_SECONDS.time(stage="generation"):
+                response = await run_chain(prompt_name, **inputs)
+            if prompt_name == "company_answer":
+                await _remember_answer(inputs, response, started_at)
+            return response
     
     except Exception as e:
         logger.error(f"Error generating response: {str(e)}")
-        return f"I apologize, but I encountered an error while processing your request. Please try again."
\ No newline at end of file
+        return f"I apologize, but I encountered an error while processing your request. Please try again."
+
+async def stream_response(user_id, query, use_cache=True):
+    """Stream a response as (event, data) pairs.
+    
+    Emits ``("stage", {...})`` events as pipeline stages start and finish,
+    then ``("token", text)`` for each chunk generated by the chat model, and
+    finally ``("done", {})``. Failures are reported as ``("error", {...})``.
+    """
+    events = asyncio.Queue()
+    
+    async def progress(stage, status, **details):
+        await events.put(("stage", {"stage": stage, "status": status, **details}))
+    
+    async def run_pipeline():
+        try:
+            return await prepare_response(query, progress, use_cache=use_cache)
+        finally:
+            await events.put(None)
+    
+    started_at = time.time()
+    PIPELINE_IN_FLIGHT.inc(mode="stream")
+    task = asyncio.ensure_future(run_pipeline())
+    try:
+        # Forward stage events while the pipeline runs
+        while True:
+            event = await events.get()
+            if event is None:
+                break
+            yield event
+        
+        prompt_name, inputs = await task
+        if prompt_name is None:
+            yield "token", inputs
+            yield "done", {}
+            return
+        
+        yield "stage", {"stage": "generation", "status": "started"}
+        await acquire("gemini")
+        generation_started = time.perf_counter()
+        generated = []
+        async for chunk in get_streaming_runnable(prompt_name).astream(inputs):
+            text = getattr(chunk, "content", chunk)
+            if text:
+                if not generated:
+                    GENERATION_FIRST_TOKEN_SECONDS.observe(time.perf_counter() - generation_started)
+                generated.append(text)
+                yield "token", text
+        PIPELINE_STAGE_SECONDS.observe(time.perf_counter() - generation_started, stage="generation")
+        yield "stage", {"stage": "generation", "status": "done"}
+        if prompt_name == "company_answer":
+            await _remember_answer(inputs, "".join(generated), started_at)
+        yield "done", {}
+    except Exception as e:
+        logger.error(f"Error streaming response: {str(e)}")
+        yield "error", {"message": "I apologize, but I encountered an error while processing your request. Please try again."}
+    finally:
+        PIPELINE_IN_FLIGHT.dec(mode="stream")
+        if not task.done():
+            task.cancel()
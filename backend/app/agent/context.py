@@ -0,0 +1,187 @@
+# backend/app/agent/context.py
+import logging
+import re
+from backend.app.config import CONTEXT_TOKEN_BUDGET, CONTEXT_MMR_LAMBDA, CONTEXT_DEDUP_THRESHOLD
+
+logger = logging.getLogger(__name__)
+
+_WORD_RE = re.compile(r"\w+")
+_KEY_VALUE_RE = re.compile(r"^\s*([A-Za-z][\w .&/()%-]{0,60}):\s*(.*?)\s*$")
+_NUMBER_RE = re.compile(r"^-?\d+(\.\d+)?$")
+_EMPTY_VALUES = {"", "none", "null", "n/a", "-", "0000-00-00"}
+
+# Characters per token for Gemini-style tokenizers on English text
+CHARS_PER_TOKEN = 4
+
+# Alpha Vantage fields worth putting in a prompt, with their display labels
+OVERVIEW_FIELDS = {
+    "Name": "Name", "Symbol": "Symbol", "Exchange": "Exchange", "Sector": "Sector", "Industry": "Industry",
+    "MarketCapitalization": "Market cap", "RevenueTTM": "Revenue (TTM)", "GrossProfitTTM": "Gross profit (TTM)",
+    "EBITDA": "EBITDA", "ProfitMargin": "Profit margin", "PERatio": "P/E", "EPS": "EPS",
+    "DividendYield": "Dividend yield", "QuarterlyRevenueGrowthYOY": "Revenue growth (YoY, quarterly)",
+    "52WeekHigh": "52-week high", "52WeekLow": "52-week low", "AnalystTargetPrice": "Analyst target",
+    "FiscalYearEnd": "Fiscal year end", "LatestQuarter": "Latest quarter"
+}
+INCOME_STATEMENT_FIELDS = {
+    "fiscalDateEnding": "Fiscal year ending", "reportedCurrency": "Currency", "totalRevenue": "Revenue",
+    "grossProfit": "Gross profit", "operatingIncome": "Operating income", "ebitda": "EBITDA",
+    "netIncome": "Net income", "researchAndDevelopment": "R&D"
+}
+QUOTE_FIELDS = {
+    "symbol": "Symbol", "price": "Price", "change": "Change", "change_percent": "Change %",
+    "volume": "Volume", "latest_trading_day": "As of"
+}
+
+def estimate_tokens(text):
+    """Rough token count for a prompt fragment."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def _humanize(value):
+    """Shorten large numbers (2950000000000 -> 2.95T); leave everything else as is."""
+    value = str(value).strip()
+    if not _NUMBER_RE.match(value):
+        return value
+    number = float(value)
+    for threshold, suffix in ((1e12, "T"), (1e9, "B"), (1e6, "M")):
+        if abs(number) >= threshold:
+            return f"{number / threshold:.2f}{suffix}"
+    return value
+
+def compact_table(title, record, fields=None):
+    """Render a structured record as a short two-column table.
+
+    Only ``fields`` (a key -> label mapping) are kept when given; empty
+    values are dropped and large numbers shortened. Returns "" if nothing
+    is left.
+    """
+    if not isinstance(record, dict):
+        return f"{title}: {record}"
+    items = [(label, record.get(key)) for key, label in fields.items()] if fields else list(record.items())
+    rows = [
+        f"{label} | {_humanize(value)}" for label, value in items
+        if value is not None and not isinstance(value, (dict, list)) and str(value).strip().lower() not in _EMPTY_VALUES
+    ]
+    return f"{title}:\n" + "\n".join(rows) if rows else ""
+
+def compact_key_values(text):
+    """Compact a chunk made mostly of "key: value" lines (stored financial data).
+
+    Lines with empty values are dropped and large numbers shortened; other
+    text is returned unchanged.
+    """
+    lines = text.splitlines()
+    parsed = [_KEY_VALUE_RE.match(line) for line in lines]
+    if len(lines) < 4 or sum(1 for m in parsed if m) * 2 < len(lines):
+        return text
+    kept = []
+    for line, match in zip(lines, parsed):
+        if not match or not match.group(2):
+            # Plain text, or a heading such as "Financial Information:"
+            kept.append(line)
+        elif match.group(2).lower() not in _EMPTY_VALUES:
+            kept.append(f"{match.group(1)}: {_humanize(match.group(2))}")
+    return "\n".join(kept)
+
+def _shingles(text, size=3):
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < size:
+        return set(words)
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+def _jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+def _trim_overlap(text, kept_texts, min_overlap=40, max_overlap=400):
+    """Drop a leading span that repeats the end of an already packed passage.
+
+    Neighbouring chunks from the text splitter share up to 200 characters.
+    """
+    for kept in kept_texts:
+        for size in range(min(max_overlap, len(text), len(kept)), min_overlap - 1, -1):
+            if kept.endswith(text[:size]):
+                return text[size:].lstrip()
+    return text
+
+def _truncate(text, max_chars):
+    """Cut text to ``max_chars``, at a sentence or line boundary when one is close."""
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars]
+    boundary = max(cut.rfind(". "), cut.rfind("\n"))
+    if boundary >= max_chars // 2:
+        cut = cut[:boundary + 1]
+    return cut.rstrip() + " ..."
+
+def pack_context(passages, token_budget=CONTEXT_TOKEN_BUDGET, mmr_lambda=CONTEXT_MMR_LAMBDA,
+                 dedup_threshold=CONTEXT_DEDUP_THRESHOLD, min_tokens=60):
+    """Assemble the prompt context from retrieved passages within a token budget.
+
+    ``passages`` are match dicts with "text" and "score", or plain strings
+    taken to be in relevance order. Near-duplicates (shingle Jaccard at or
+    above ``dedup_threshold``) are dropped, the rest are picked by maximal
+    marginal relevance so overlapping chunks don't crowd out other sources,
+    and text repeated from a neighbouring chunk is trimmed. The last
+    passage that doesn't fit is truncated if at least ``min_tokens`` remain.
+
+    Returns ``(context, stats)``.
+    """
+    candidates = []
+    for rank, passage in enumerate(passages):
+        if isinstance(passage, dict):
+            text, score = passage.get("text") or "", passage.get("score")
+        else:
+            text, score = str(passage), None
+        text = compact_key_values(text.strip())
+        if text:
+            candidates.append({"text": text, "score": 1.0 / (rank + 1) if score is None else float(score),
+                               "shingles": _shingles(text)})
+    stats = {"passages": len(candidates), "duplicates": 0, "packed": 0, "truncated": 0, "tokens": 0}
+    if not candidates:
+        return "", stats
+
+    # Drop near-duplicates, keeping the more relevant copy
+    candidates.sort(key=lambda c: c["score"], reverse=True)
+    unique = []
+    for candidate in candidates:
+        if any(candidate["text"] in u["text"] or _jaccard(candidate["shingles"], u["shingles"]) >= dedup_threshold
+               for u in unique):
+            stats["duplicates"] += 1
+        else:
+            unique.append(candidate)
+
+    top_score = unique[0]["score"] or 1.0
+    for candidate in unique:
+        candidate["relevance"] = candidate["score"] / top_score
+
+    selected, remaining = [], unique
+    budget_chars = token_budget * CHARS_PER_TOKEN
+    used = 0
+    while remaining and used < budget_chars:
+        def mmr(c):
+            redundancy = max((_jaccard(c["shingles"], s["shingles"]) for s in selected), default=0.0)
+            return mmr_lambda * c["relevance"] - (1 - mmr_lambda) * redundancy
+
+        best = max(remaining, key=mmr)
+        remaining = [c for c in remaining if c is not best]
+        text = _trim_overlap(best["text"], [s["text"] for s in selected])
+        if not text:
+            continue
+        # Passages are joined with a blank line
+        room = budget_chars - used - (2 if selected else 0)
+        if len(text) > room:
+            if room < min_tokens * CHARS_PER_TOKEN:
+                continue
+            text = _truncate(text, room - 4)
+            stats["truncated"] += 1
+        selected.append({**best, "text": text})
+        used += len(text) + (2 if len(selected) > 1 else 0)
+
+    context = "\n\n".join(s["text"] for s in selected)
+    stats.update(packed=len(selected), tokens=estimate_tokens(context))
+    logger.info(
+        f"Packed {stats['packed']} of {stats['passages']} passages into ~{stats['tokens']} tokens "
+        f"({stats['duplicates']} duplicates dropped)"
+    )
+    return context, stats
@@ -0,0 +1,114 @@
+# backend/app/agent/llm_registry.py
+import asyncio
+import logging
+import threading
+import time
+from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain.chains import LLMChain
+from langchain.prompts import PromptTemplate
+from backend.app.config import GEMINI_API_KEY, CHAT_MODEL
+from backend.app.rate_limit import retry_async
+
+logger = logging.getLogger(__name__)
+
+# Shared, pre-built LLM objects. Chat models and chains hold no per-request
+# state, so one instance per (model, temperature) serves every request.
+_lock = threading.Lock()
+_models = {}
+_chains = {}
+_runnables = {}
+_prompts = {}
+
+def register_prompt(name, template, input_variables, temperature=0.7, model=CHAT_MODEL):
+    """Compile a prompt once and register it with its default model settings."""
+    prompt = PromptTemplate(template=template, input_variables=input_variables)
+    with _lock:
+        _prompts[name] = {"prompt": prompt, "temperature": temperature, "model": model}
+    return prompt
+
+def get_prompt(name):
+    """Return a registered PromptTemplate."""
+    return _prompts[name]["prompt"]
+
+def get_chat_model(model=CHAT_MODEL, temperature=0.7, streaming=False):
+    """Return the shared chat model client for these settings, building it once."""
+    key = (model, temperature, streaming)
+    llm = _models.get(key)
+    if llm is None:
+        with _lock:
+            llm = _models.get(key)
+            if llm is None:
+                llm = ChatGoogleGenerativeAI(
+                    model=model,
+                    google_api_key=GEMINI_API_KEY,
+                    temperature=temperature,
+                    streaming=streaming
+                )
+                _models[key] = llm
+    return llm
+
+def _settings(name, model, temperature):
+    entry = _prompts[name]
+    return (
+        model or entry["model"],
+        entry["temperature"] if temperature is None else temperature
+    )
+
+def get_chain(name, model=None, temperature=None):
+    """Return the shared LLMChain for a registered prompt."""
+    model, temperature = _settings(name, model, temperature)
+    key = (name, model, temperature)
+    chain = _chains.get(key)
+    if chain is None:
+        llm = get_chat_model(model, temperature)
+        with _lock:
+            chain = _chains.setdefault(key, LLMChain(llm=llm, prompt=get_prompt(name)))
+    return chain
+
+async def run_chain(name, **inputs):
+    """Run a registered chain, throttled by the Gemini bucket and retried when rate limited."""
+    return await retry_async(get_chain(name).arun, upstream="gemini", **inputs)
+
+def get_streaming_runnable(name, model=None, temperature=None):
+    """Return the shared ``prompt | llm`` runnable used to stream a registered prompt."""
+    model, temperature = _settings(name, model, temperature)
+    key = (name, model, temperature)
+    runnable = _runnables.get(key)
+    if runnable is None:
+        llm = get_chat_model(model, temperature, streaming=True)
+        with _lock:
+            runnable = _runnables.setdefault(key, get_prompt(name) | llm)
+    return runnable
+
+def warm_up(streaming_prompts=()):
+    """Build every registered chain (and the given streaming runnables) ahead of traffic."""
+    start = time.perf_counter()
+    for name in list(_prompts):
+        get_chain(name)
+    for name in streaming_prompts:
+        get_streaming_runnable(name)
+    logger.info(
+        f"Warmed LLM registry: {len(_models)} clients, {len(_chains)} chains "
+        f"in {time.perf_counter() - start:.3f}s"
+    )
+
+async def health_check(live=False, timeout=10.0):
+    """Report registry contents; with ``live=True`` also ping the chat model."""
+    status = {
+        "status": "ok",
+        "clients": [
+            {"model": model, "temperature": temperature, "streaming": streaming}
+            for model, temperature, streaming in _models
+        ],
+        "chains": sorted({name for name, _, _ in _chains}),
+        "prompts": sorted(_prompts)
+    }
+    if live:
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(get_chat_model(temperature=0.0).ainvoke("Reply with OK."), timeout=timeout)
+            status["live"] = {"ok": True, "latency_ms": round((time.perf_counter() - start) * 1000, 1)}
+        except Exception as e:
+            status["status"] = "degraded"
+            status["live"] = {"ok": False, "error": str(e)}
+    return status
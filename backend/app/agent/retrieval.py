@@ -0,0 +1,174 @@
+# backend/app/agent/retrieval.py
+import asyncio
+import logging
+import re
+import time
+from backend.app.config import (
+    RETRIEVAL_TOP_K,
+    RETRIEVAL_MIN_SCORE,
+    RETRIEVAL_DEADLINE,
+    RRF_K,
+    LEXICAL_ONLY_RETRIEVAL
+)
+from backend.app.memory import query_similar
+from backend.app.memory.bm25 import get_bm25_index, tokenize
+from backend.app.singleflight import normalize_name
+from backend.app.metrics import VECTOR_QUERY_SECONDS
+
+logger = logging.getLogger(__name__)
+
+def _matches(results, min_score):
+    """Plain dicts for the matches in a query response that clear ``min_score``."""
+    matches = []
+    if results is None:
+        return matches
+    for match in getattr(results, "matches", None) or []:
+        if match.score > min_score:
+            metadata = match.metadata or {}
+            matches.append({
+                "id": match.id,
+                "score": float(match.score),
+                "text": metadata.get("text", ""),
+                "metadata": metadata
+            })
+    return matches
+
+def _timed_query(index, query_embedding, top_k, filter=None):
+    """query_similar, recording its duration per query kind."""
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        results = query_similar(index, query_embedding, top_k=top_k, filter=filter)
+        # query_similar logs and returns None on failure
+        outcome = "ok" if results is not None else "error"
+        return results
+    finally:
+        VECTOR_QUERY_SECONDS.observe(time.perf_counter() - start, filtered=str(filter is not None).lower(),
+                                     outcome=outcome)
+
+def merge_matches(*match_lists, top_k=RETRIEVAL_TOP_K):
+    """Merge match lists, keeping the best-scoring copy of each id, best first."""
+    best = {}
+    for matches in match_lists:
+        for match in matches:
+            if match["id"] not in best or match["score"] > best[match["id"]]["score"]:
+                best[match["id"]] = match
+    return sorted(best.values(), key=lambda m: m["score"], reverse=True)[:top_k]
+
+async def retrieve(index, query_embedding, company_name, top_k=RETRIEVAL_TOP_K,
+                   min_score=RETRIEVAL_MIN_SCORE, deadline=RETRIEVAL_DEADLINE):
+    """Find stored chunks relevant to a query about ``company_name``.
+
+    The company-filtered and unfiltered queries are sent at the same time
+    from worker threads. If the filtered query finds matches they are
+    returned without waiting for the other one; otherwise the unfiltered
+    matches are used. Results are merged and deduplicated by id, and
+    whatever has not arrived by ``deadline`` seconds is ignored.
+
+    Returns a list of ``{"id", "score", "text", "metadata"}`` dicts.
+    """
+    filtered = asyncio.ensure_future(asyncio.to_thread(
+        _timed_query, index, query_embedding, top_k, filter={"company_name": {"$eq": company_name}}
+    ))
+    unfiltered = asyncio.ensure_future(asyncio.to_thread(
+        _timed_query, index, query_embedding, top_k
+    ))
+
+    loop = asyncio.get_running_loop()
+    stop_at = loop.time() + deadline
+    company_matches, other_matches = [], []
+    pending = {filtered, unfiltered}
+    try:
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, timeout=max(0.0, stop_at - loop.time()), return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                logger.warning(f"Retrieval deadline of {deadline}s hit for {company_name}")
+                break
+            for task in done:
+                try:
+                    matches = _matches(task.result(), min_score)
+                except Exception as e:
+                    logger.error(f"Error querying Pinecone: {str(e)}")
+                    continue
+                if task is filtered:
+                    company_matches = matches
+                else:
+                    other_matches = matches
+            if company_matches:
+                break
+    finally:
+        # A Pinecone call already running in a thread can't be interrupted; its result is simply dropped
+        for task in pending:
+            task.cancel()
+
+    if company_matches:
+        # The unfiltered query can only add chunks about the same company
+        company = normalize_name(company_name)
+        same_company = [
+            m for m in other_matches if normalize_name(m["metadata"].get("company_name")) == company
+        ]
+        return merge_matches(company_matches, same_company, top_k=top_k)
+    return merge_matches(other_matches, top_k=top_k)
+
+def lexical_search(query, company_name, top_k=RETRIEVAL_TOP_K):
+    """BM25 matches for a query within one company's chunks.
+
+    Only chunks containing at least half of the query's terms are kept, so a
+    single shared common word doesn't count as a match.
+    """
+    try:
+        matches = get_bm25_index().search(query, company_name=company_name, top_k=top_k)
+    except Exception as e:
+        logger.error(f"Error searching BM25 index: {str(e)}")
+        return []
+    return [m for m in matches if m["matched_terms"] * 2 >= m["query_terms"]]
+
+_SPECIFIC_WORD_RE = re.compile(r"[A-Za-z0-9][A-Za-z0-9.&'’\-]*")
+
+def is_exact_term_match(query, company_name, lexical_matches, rare_term_ratio=0.02):
+    """Whether the best lexical match alone answers the query.
+
+    True when the query names something specific (a ticker, number, proper
+    noun or rare term besides the company itself) and the top BM25 chunk
+    contains every content term of the query. Those queries skip the
+    embedding call and vector search entirely.
+    """
+    if not LEXICAL_ONLY_RETRIEVAL or not lexical_matches:
+        return False
+    company_terms = set(tokenize(company_name or ""))
+    content_terms = [t for t in dict.fromkeys(tokenize(query)) if t not in company_terms]
+    if not content_terms:
+        return False
+
+    words = _SPECIFIC_WORD_RE.findall(query)
+    specific = set()
+    for position, word in enumerate(words):
+        if any(c.isdigit() for c in word) or (len(word) >= 2 and word.isupper()) or (position > 0 and word[0].isupper()):
+            specific.update(tokenize(word))
+    index = get_bm25_index()
+    specific.update(t for t in content_terms if index.document_frequency(t) <= rare_term_ratio)
+    if not (specific & set(content_terms)):
+        return False
+
+    top_terms = set(tokenize(lexical_matches[0]["text"]))
+    return all(term in top_terms for term in content_terms)
+
+def lexical_retrieval(query, company_name, top_k=RETRIEVAL_TOP_K):
+    """``(matches, exact)``: BM25 matches for a query and whether they alone answer it.
+
+    Blocking (the first call loads the index from SQLite), so run it in a
+    worker thread.
+    """
+    matches = lexical_search(query, company_name, top_k=top_k)
+    return matches, is_exact_term_match(query, company_name, matches)
+
+def reciprocal_rank_fusion(*ranked_lists, k=RRF_K, top_k=RETRIEVAL_TOP_K):
+    """Fuse ranked match lists: each match scores the sum of 1 / (k + rank) over the lists it is in."""
+    fused = {}
+    for matches in ranked_lists:
+        for rank, match in enumerate(matches, start=1):
+            entry = fused.setdefault(match["id"], {**match, "score": 0.0})
+            entry["score"] += 1.0 / (k + rank)
+    return sorted(fused.values(), key=lambda m: m["score"], reverse=True)[:top_k]
@@ -0,0 +1,161 @@
+# backend/app/answer_cache.py
+import logging
+import time
+from collections import OrderedDict
+import numpy as np
+from backend.app.config import (
+    ANSWER_CACHE_ENABLED,
+    ANSWER_CACHE_THRESHOLD,
+    ANSWER_CACHE_TTL,
+    ANSWER_CACHE_MAX_PER_COMPANY,
+    ANSWER_CACHE_MAX_COMPANIES
+)
+from backend.app.singleflight import normalize_name
+
+logger = logging.getLogger(__name__)
+
+class _CompanyAnswers:
+    """Cached answers for one company, with their query embeddings as unit vectors."""
+
+    def __init__(self):
+        self.vectors = []
+        self.queries = []
+        self.answers = []
+        self.stored_at = []
+        self._matrix = None
+
+    def matrix(self):
+        if self._matrix is None:
+            self._matrix = np.stack(self.vectors)
+        return self._matrix
+
+    def add(self, vector, query, answer, max_entries):
+        self.vectors.append(vector)
+        self.queries.append(query)
+        self.answers.append(answer)
+        self.stored_at.append(time.time())
+        if len(self.vectors) > max_entries:
+            for column in (self.vectors, self.queries, self.answers, self.stored_at):
+                del column[0]
+        self._matrix = None
+
+    def replace(self, i, vector, query, answer):
+        self.vectors[i] = vector
+        self.queries[i] = query
+        self.answers[i] = answer
+        self.stored_at[i] = time.time()
+        self._matrix = None
+
+class SemanticAnswerCache:
+    """Answers to company questions, looked up by query-embedding similarity.
+
+    A lookup hits when a cached query for the same company has cosine
+    similarity of at least ``threshold`` to the new query and is younger than
+    ``ttl``. ``invalidate`` drops a company's answers; answers generated from
+    a request that started before the invalidation are not stored.
+    """
+
+    def __init__(self, threshold=ANSWER_CACHE_THRESHOLD, ttl=ANSWER_CACHE_TTL,
+                 max_per_company=ANSWER_CACHE_MAX_PER_COMPANY, max_companies=ANSWER_CACHE_MAX_COMPANIES,
+                 enabled=ANSWER_CACHE_ENABLED):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_per_company = max_per_company
+        self.max_companies = max_companies
+        self.enabled = enabled
+        self._companies = OrderedDict()
+        self._invalidated_at = {}
+        self._cleared_at = 0.0
+        self._stats = {"hits": 0, "misses": 0, "bypassed": 0, "stores": 0, "stale_stores": 0, "invalidations": 0}
+
+    @staticmethod
+    def _unit(embedding):
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    def lookup(self, company_name, embedding, bypass=False):
+        """Return ``(answer, similarity, cached_query)`` for the closest cached query, or None."""
+        if bypass or not self.enabled:
+            self._stats["bypassed"] += 1
+            return None
+        company = normalize_name(company_name)
+        entries = self._companies.get(company)
+        vector = self._unit(embedding) if embedding is not None else None
+        if not entries or vector is None:
+            self._stats["misses"] += 1
+            return None
+
+        scores = entries.matrix() @ vector
+        # Entries expire by age; mask them out rather than rebuilding the matrix
+        expired = np.asarray(entries.stored_at) < time.time() - self.ttl
+        scores[expired] = -1.0
+        best = int(np.argmax(scores))
+        if scores[best] < self.threshold:
+            self._stats["misses"] += 1
+            return None
+
+        self._companies.move_to_end(company)
+        self._stats["hits"] += 1
+        return entries.answers[best], float(scores[best]), entries.queries[best]
+
+    def store(self, company_name, query, embedding, answer, started_at=None):
+        """Cache an answer. Skipped if the company was invalidated after ``started_at``."""
+        if not self.enabled or not answer:
+            return False
+        company = normalize_name(company_name)
+        if started_at is not None and max(self._invalidated_at.get(company, 0), self._cleared_at) > started_at:
+            self._stats["stale_stores"] += 1
+            return False
+        vector = self._unit(embedding) if embedding is not None else None
+        if vector is None:
+            return False
+
+        entries = self._companies.get(company)
+        if entries is None:
+            entries = self._companies[company] = _CompanyAnswers()
+            while len(self._companies) > self.max_companies:
+                self._companies.popitem(last=False)
+        self._companies.move_to_end(company)
+        if entries.vectors:
+            # A fresh answer to an equivalent question replaces the old one
+            scores = entries.matrix() @ vector
+            best = int(np.argmax(scores))
+            if scores[best] >= self.threshold:
+                entries.replace(best, vector, query, answer)
+                self._stats["stores"] += 1
+                return True
+        entries.add(vector, query, answer, self.max_per_company)
+        self._stats["stores"] += 1
+        return True
+
+    def invalidate(self, company_name=None):
+        """Drop cached answers for one company (or all). Returns how many were dropped."""
+        now = time.time()
+        if company_name is None:
+            dropped = sum(len(e.answers) for e in self._companies.values())
+            self._companies.clear()
+            self._invalidated_at.clear()
+            self._cleared_at = now
+        else:
+            company = normalize_name(company_name)
+            entries = self._companies.pop(company, None)
+            dropped = len(entries.answers) if entries else 0
+            self._invalidated_at[company] = now
+        self._stats["invalidations"] += 1
+        if dropped:
+            logger.info(f"Invalidated {dropped} cached answers for {company_name or 'all companies'}")
+        return dropped
+
+    def stats(self):
+        lookups = self._stats["hits"] + self._stats["misses"]
+        return {
+            **self._stats,
+            "hit_rate": round(self._stats["hits"] / lookups, 4) if lookups else 0.0,
+            "enabled": self.enabled,
+            "threshold": self.threshold,
+            "companies": len(self._companies),
+            "entries": sum(len(e.answers) for e in self._companies.values())
+        }
+
+answer_cache = SemanticAnswerCache()
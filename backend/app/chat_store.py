@@ -0,0 +1,249 @@
+# backend/app/chat_store.py
+import base64
+import json
+import logging
+import sqlite3
+import threading
+from datetime import datetime
+from backend.app.config import CHAT_DB, CHAT_DIR
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TITLE = "New Conversation"
+
+# Chat fields that have their own columns; anything else the frontend sends is kept in "extra"
+_CHAT_FIELDS = ("id", "title", "messages", "createdAt", "updatedAt")
+
+def encode_cursor(updated_at, chat_id):
+    """Opaque pagination cursor pointing just past the given chat."""
+    return base64.urlsafe_b64encode(json.dumps([updated_at, chat_id]).encode("utf-8")).decode("ascii")
+
+def decode_cursor(cursor):
+    """Inverse of ``encode_cursor``. Raises ValueError for a malformed cursor."""
+    try:
+        updated_at, chat_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return str(updated_at), str(chat_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+class ChatStore:
+    """SQLite (WAL) store for chat histories, one row per message.
+
+    Appending a message inserts one row and bumps the chat's counters in a
+    single transaction, so cost doesn't grow with history length and
+    concurrent appends to the same chat can't overwrite each other.
+    """
+
+    def __init__(self, path=CHAT_DB):
+        self.path = path
+        self._lock = threading.Lock()
+        # Autocommit mode; multi-statement writes use explicit BEGIN IMMEDIATE transactions
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS chats (
+                id TEXT PRIMARY KEY,
+                title TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL,
+                message_count INTEGER NOT NULL DEFAULT 0,
+                extra TEXT
+            );
+            CREATE TABLE IF NOT EXISTS messages (
+                chat_id TEXT NOT NULL REFERENCES chats(id) ON DELETE CASCADE,
+                position INTEGER NOT NULL,
+                message TEXT NOT NULL,
+                PRIMARY KEY (chat_id, position)
+            );
+            CREATE INDEX IF NOT EXISTS idx_chats_updated ON chats(updated_at DESC, id DESC);
+            """
+        )
+        self._conn.execute("PRAGMA foreign_keys=ON")
+
+    def _transaction(self, work):
+        """Run ``work(conn)`` inside one write transaction."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = work(self._conn)
+                self._conn.execute("COMMIT")
+                return result
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    @staticmethod
+    def _chat_dict(row, messages=None):
+        chat = json.loads(row["extra"]) if row["extra"] else {}
+        chat.update({
+            "id": row["id"],
+            "title": row["title"],
+            "createdAt": row["created_at"],
+            "updatedAt": row["updated_at"]
+        })
+        if messages is not None:
+            chat["messages"] = messages
+        return chat
+
+    def _messages(self, chat_id):
+        rows = self._conn.execute(
+            "SELECT message FROM messages WHERE chat_id = ? ORDER BY position", (chat_id,)
+        ).fetchall()
+        return [json.loads(row["message"]) for row in rows]
+
+    def get_chat(self, chat_id):
+        """Return a chat with its messages, or None."""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM chats WHERE id = ?", (chat_id,)).fetchone()
+            if row is None:
+                return None
+            return self._chat_dict(row, self._messages(chat_id))
+
+    def list_chats(self, limit=None, cursor=None, summaries_only=False):
+        """Return a page of chats, most recently updated first, and the cursor for the next page.
+
+        The page is read from the (updated_at, id) index, so its cost doesn't
+        depend on how many chats or messages exist. Summaries carry
+        ``messageCount`` instead of the messages. ``next_cursor`` is None on
+        the last page.
+        """
+        query = "SELECT * FROM chats"
+        params = []
+        if cursor:
+            query += " WHERE (updated_at, id) < (?, ?)"
+            params.extend(decode_cursor(cursor))
+        query += " ORDER BY updated_at DESC, id DESC"
+        if limit:
+            # Read one extra row to learn whether another page exists
+            query += " LIMIT ?"
+            params.append(limit + 1)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+            has_more = bool(limit) and len(rows) > limit
+            rows = rows[:limit] if limit else rows
+            chats = []
+            for row in rows:
+                if summaries_only:
+                    chat = self._chat_dict(row)
+                    chat["messageCount"] = row["message_count"]
+                else:
+                    chat = self._chat_dict(row, self._messages(row["id"]))
+                chats.append(chat)
+        next_cursor = encode_cursor(rows[-1]["updated_at"], rows[-1]["id"]) if has_more else None
+        return chats, next_cursor
+
+    def chat_exists(self, chat_id):
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM chats WHERE id = ?", (chat_id,)).fetchone() is not None
+
+    def save_chat(self, chat_id, chat):
+        """Create or replace a whole chat, messages included."""
+        now = datetime.now().isoformat()
+        messages = chat.get("messages") or []
+        extra = {k: v for k, v in chat.items() if k not in _CHAT_FIELDS}
+
+        def work(conn):
+            conn.execute(
+                """
+                INSERT INTO chats (id, title, created_at, updated_at, message_count, extra)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET
+                    title = excluded.title,
+                    updated_at = excluded.updated_at,
+                    message_count = excluded.message_count,
+                    extra = excluded.extra
+                """,
+                (chat_id, chat.get("title") or DEFAULT_TITLE, chat.get("createdAt") or now,
+                 chat.get("updatedAt") or now, len(messages), json.dumps(extra) if extra else None)
+            )
+            conn.execute("DELETE FROM messages WHERE chat_id = ?", (chat_id,))
+            conn.executemany(
+                "INSERT INTO messages (chat_id, position, message) VALUES (?, ?, ?)",
+                [(chat_id, i, json.dumps(message)) for i, message in enumerate(messages)]
+            )
+
+        self._transaction(work)
+
+    def delete_chat(self, chat_id):
+        """Delete a chat and its messages. Returns False if it didn't exist."""
+        def work(conn):
+            conn.execute("DELETE FROM messages WHERE chat_id = ?", (chat_id,))
+            return conn.execute("DELETE FROM chats WHERE id = ?", (chat_id,)).rowcount > 0
+
+        return self._transaction(work)
+
+    def update_title(self, chat_id, title):
+        """Rename a chat. Returns False if it doesn't exist."""
+        def work(conn):
+            return conn.execute(
+                "UPDATE chats SET title = ?, updated_at = ? WHERE id = ?",
+                (title, datetime.now().isoformat(), chat_id)
+            ).rowcount > 0
+
+        return self._transaction(work)
+
+    def append_message(self, chat_id, message):
+        """Append one message, creating the chat if needed.
+
+        A new chat's title is taken from its first user message.
+        """
+        now = datetime.now().isoformat()
+
+        def work(conn):
+            conn.execute(
+                "INSERT OR IGNORE INTO chats (id, title, created_at, updated_at) VALUES (?, ?, ?, ?)",
+                (chat_id, DEFAULT_TITLE, now, now)
+            )
+            row = conn.execute("SELECT title, message_count FROM chats WHERE id = ?", (chat_id,)).fetchone()
+            title = row["title"]
+            if row["message_count"] == 0 and message.get("role") == "user" and title == DEFAULT_TITLE:
+                content = message.get("content", "")
+                title = content[:30] + "..." if len(content) > 30 else content
+            conn.execute(
+                "INSERT INTO messages (chat_id, position, message) VALUES (?, ?, ?)",
+                (chat_id, row["message_count"], json.dumps(message))
+            )
+            conn.execute(
+                "UPDATE chats SET title = ?, updated_at = ?, message_count = message_count + 1 WHERE id = ?",
+                (title, now, chat_id)
+            )
+
+        self._transaction(work)
+
+    def migrate_json_chats(self, chat_dir=CHAT_DIR):
+        """Import legacy ``<id>.json`` chat files, then rename each to ``.json.migrated``.
+
+        Chats already in the database are not overwritten. Returns the number imported.
+        """
+        imported = 0
+        for chat_file in sorted(chat_dir.glob("*.json")):
+            try:
+                with open(chat_file, "r") as f:
+                    chat = json.load(f)
+                chat_id = chat.get("id") or chat_file.stem
+                if not self.chat_exists(chat_id):
+                    self.save_chat(chat_id, chat)
+                    imported += 1
+                chat_file.rename(chat_file.with_name(chat_file.name + ".migrated"))
+            except Exception as e:
+                logger.error(f"Error migrating chat file {chat_file}: {str(e)}")
+        if imported:
+            logger.info(f"Migrated {imported} chat files from {chat_dir} into {self.path}")
+        return imported
+
+_store = None
+
+def get_chat_store():
+    """Return the process-wide chat store."""
+    global _store
+    if _store is None:
+        _store = ChatStore()
+    return _store
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    print(f"Imported {get_chat_store().migrate_json_chats()} chats")
@@ -24,6 +24,128 @@ from pathlib import Path
 # Application settings
 CHAT_DIR = Path("d:/College/Company_Research_Chatbot/backend/data/chats")
 CHAT_DIR.mkdir(parents=True, exist_ok=True)
+DATA_DIR = CHAT_DIR.parent
 
 # Model settings
-EMBEDDING_DIMENSION = 768  # Dimension for Gemini embeddings
\ No newline at end of file
+CHAT_MODEL = os.getenv("CHAT_MODEL", "gemini-2.0-flash")
+EMBEDDING_DIMENSION = 768  # Dimension for Gemini embeddings
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "models/embedding-001")
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "100"))  # Gemini accepts up to 100 texts per call
+EMBEDDING_MAX_CONCURRENCY = int(os.getenv("EMBEDDING_MAX_CONCURRENCY", "4"))
+EMBEDDING_CACHE_PATH = Path(os.getenv("EMBEDDING_CACHE_PATH", str(DATA_DIR / "embedding_cache.sqlite3")))
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "200000"))
+
+# Vector store settings
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "pinecone").lower()  # "pinecone" or "local"
+LOCAL_INDEX_STORAGE = os.getenv("LOCAL_INDEX_STORAGE", "disk").lower()  # "disk" or "memory"
+LOCAL_INDEX_DIR = Path(os.getenv("LOCAL_INDEX_DIR", str(DATA_DIR / "vector_index")))
+LOCAL_INDEX_QUANTIZATION = os.getenv("LOCAL_INDEX_QUANTIZATION", "float16").lower()  # "float16" or "int8"
+LOCAL_INDEX_MERGE_FACTOR = int(os.getenv("LOCAL_INDEX_MERGE_FACTOR", "4"))  # segments per size tier before a merge
+LOCAL_INDEX_MAX_SEGMENTS = int(os.getenv("LOCAL_INDEX_MAX_SEGMENTS", "32"))
+UPSERT_BATCH_SIZE = int(os.getenv("UPSERT_BATCH_SIZE", "100"))
+UPSERT_MAX_CONCURRENCY = int(os.getenv("UPSERT_MAX_CONCURRENCY", "4"))
+UPSERT_MAX_RETRIES = int(os.getenv("UPSERT_MAX_RETRIES", "3"))
+
+# HTTP client settings (shared aiohttp connection pool)
+HTTP_POOL_LIMIT = int(os.getenv("HTTP_POOL_LIMIT", "100"))
+HTTP_POOL_LIMIT_PER_HOST = int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", "10"))
+HTTP_DNS_CACHE_TTL = int(os.getenv("HTTP_DNS_CACHE_TTL", "300"))
+HTTP_KEEPALIVE_TIMEOUT = float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", "30"))
+HTTP_TOTAL_TIMEOUT = float(os.getenv("HTTP_TOTAL_TIMEOUT", "30"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "10"))
+
+# Per-source timeouts (seconds) for the concurrent external fetch fallback
+EXTERNAL_SOURCE_TIMEOUT = float(os.getenv("EXTERNAL_SOURCE_TIMEOUT", "10"))
+SOURCE_TIMEOUTS = {
+    "default": EXTERNAL_SOURCE_TIMEOUT,
+    "symbol": float(os.getenv("SYMBOL_SEARCH_TIMEOUT", "5")),
+    "stock_price": float(os.getenv("STOCK_PRICE_TIMEOUT", "5")),
+    "overview": float(os.getenv("OVERVIEW_TIMEOUT", str(EXTERNAL_SOURCE_TIMEOUT))),
+    "financials": float(os.getenv("FINANCIALS_TIMEOUT", str(EXTERNAL_SOURCE_TIMEOUT))),
+    "news": float(os.getenv("NEWS_TIMEOUT", str(EXTERNAL_SOURCE_TIMEOUT))),
+    "search": float(os.getenv("SEARCH_TIMEOUT", "15")),
+    "wikipedia": float(os.getenv("WIKIPEDIA_TIMEOUT", str(EXTERNAL_SOURCE_TIMEOUT))),
+    "url": float(os.getenv("URL_EXTRACT_TIMEOUT", "8")),
+}
+
+# Upstream rate limits: sustained requests per second and burst size
+def _rate_limit(name, per_second, burst):
+    return {
+        "rate": float(os.getenv(f"{name}_RATE_PER_SEC", str(per_second))),
+        "burst": int(os.getenv(f"{name}_BURST", str(burst)))
+    }
+
+RATE_LIMITS = {
+    "gemini": _rate_limit("GEMINI", 5, 10),
+    "alpha_vantage": _rate_limit("ALPHA_VANTAGE", 5 / 60, 5),  # free tier: 5 requests per minute
+    "newsapi": _rate_limit("NEWSAPI", 1, 5),
+    "serper": _rate_limit("SERPER", 5, 10),
+    "jina": _rate_limit("JINA", 0.33, 5),  # 20 requests per minute without a paid key
+    "mediawiki": _rate_limit("MEDIAWIKI", 10, 10),
+}
+
+# Retry settings for upstream calls
+RETRY_MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", "4"))
+RETRY_BASE_DELAY = float(os.getenv("RETRY_BASE_DELAY", "1"))
+RETRY_MAX_DELAY = float(os.getenv("RETRY_MAX_DELAY", "30"))
+
+# Market data cache TTLs in seconds (0 means never expire); the stale window is
+# how long an expired entry may still be served while it refreshes in the background
+QUOTE_CACHE_TTL = float(os.getenv("QUOTE_CACHE_TTL", "60"))
+QUOTE_CACHE_STALE = float(os.getenv("QUOTE_CACHE_STALE", "300"))
+OVERVIEW_CACHE_TTL = float(os.getenv("OVERVIEW_CACHE_TTL", str(24 * 3600)))
+OVERVIEW_CACHE_STALE = float(os.getenv("OVERVIEW_CACHE_STALE", str(24 * 3600)))
+FINANCIALS_CACHE_TTL = float(os.getenv("FINANCIALS_CACHE_TTL", str(91 * 24 * 3600)))
+FINANCIALS_CACHE_STALE = float(os.getenv("FINANCIALS_CACHE_STALE", str(30 * 24 * 3600)))
+SYMBOL_CACHE_TTL = float(os.getenv("SYMBOL_CACHE_TTL", "0"))
+MARKET_CACHE_MAX_ENTRIES = int(os.getenv("MARKET_CACHE_MAX_ENTRIES", "5000"))
+
+# Background ingestion jobs
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "100"))
+INGEST_JOB_DB = Path(os.getenv("INGEST_JOB_DB", str(DATA_DIR / "ingest_jobs.sqlite3")))
+
+# Per-company record of the chunk ids stored in the vector index
+CHUNK_MANIFEST_DB = Path(os.getenv("CHUNK_MANIFEST_DB", str(DATA_DIR / "chunk_manifest.sqlite3")))
+
+# Chat history database (existing CHAT_DIR/*.json files are migrated into it on startup)
+CHAT_DB = Path(os.getenv("CHAT_DB", str(DATA_DIR / "chats.sqlite3")))
+
+# Jina Reader URL extraction during ingestion
+URL_EXTRACT_CONCURRENCY = int(os.getenv("URL_EXTRACT_CONCURRENCY", "4"))
+URL_EXTRACT_DEADLINE = float(os.getenv("URL_EXTRACT_DEADLINE", "20"))
+URL_CONTENT_BUDGET = int(os.getenv("URL_CONTENT_BUDGET", "40000"))  # characters per ingestion
+URL_CONTENT_CACHE_TTL = float(os.getenv("URL_CONTENT_CACHE_TTL", str(6 * 3600)))
+URL_CONTENT_CACHE_STALE = float(os.getenv("URL_CONTENT_CACHE_STALE", str(7 * 24 * 3600)))  # revalidated by ETag
+URL_CONTENT_CACHE_MAX_ENTRIES = int(os.getenv("URL_CONTENT_CACHE_MAX_ENTRIES", "2000"))
+
+# Semantic answer cache for company questions
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.92"))  # cosine similarity
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", str(6 * 3600)))
+ANSWER_CACHE_MAX_PER_COMPANY = int(os.getenv("ANSWER_CACHE_MAX_PER_COMPANY", "200"))
+ANSWER_CACHE_MAX_COMPANIES = int(os.getenv("ANSWER_CACHE_MAX_COMPANIES", "500"))
+
+# Offline company name/ticker resolver. The listings file ships with the code;
+# an Alpha Vantage LISTING_STATUS export can be dropped in instead.
+COMPANY_LISTINGS_PATH = Path(os.getenv(
+    "COMPANY_LISTINGS_PATH", str(Path(__file__).resolve().parent.parent / "data" / "company_listings.csv")
+))
+RESOLVER_FUZZY_THRESHOLD = float(os.getenv("RESOLVER_FUZZY_THRESHOLD", "0.85"))
+
+# Vector retrieval
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "5"))
+RETRIEVAL_MIN_SCORE = float(os.getenv("RETRIEVAL_MIN_SCORE", "0.7"))
+RETRIEVAL_DEADLINE = float(os.getenv("RETRIEVAL_DEADLINE", "3"))
+
+# In-process BM25 index over stored chunk text, fused with vector results
+BM25_INDEX_DB = Path(os.getenv("BM25_INDEX_DB", str(DATA_DIR / "bm25_index.sqlite3")))
+BM25_K1 = float(os.getenv("BM25_K1", "1.5"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+RRF_K = int(os.getenv("RRF_K", "60"))
+LEXICAL_ONLY_RETRIEVAL = os.getenv("LEXICAL_ONLY_RETRIEVAL", "true").lower() == "true"
+
+# Context packing for the company answer prompt
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "2000"))  # estimated at ~4 characters per token
+CONTEXT_MMR_LAMBDA = float(os.getenv("CONTEXT_MMR_LAMBDA", "0.7"))  # 1.0 ranks by relevance only
+CONTEXT_DEDUP_THRESHOLD = float(os.getenv("CONTEXT_DEDUP_THRESHOLD", "0.8"))  # shingle Jaccard similarity
@@ -1,18 +1,36 @@
 # backend/app/data_ingestion.py
-import aiohttp
 import asyncio
 import logging
+import time
 from datetime import datetime
+import aiohttp
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from backend.app.config import (
     ALPHA_VANTAGE_API_KEY, 
     SERPER_API_KEY, 
     NEWS_API_KEY, 
     MEDIAWIKI_API_ENDPOINT,
-    JINA_READER_API_KEY
+    JINA_READER_API_KEY,
+    SOURCE_TIMEOUTS,
+    URL_EXTRACT_CONCURRENCY,
+    URL_EXTRACT_DEADLINE,
+    URL_CONTENT_BUDGET,
+    URL_CONTENT_CACHE_TTL,
+    URL_CONTENT_CACHE_STALE,
+    URL_CONTENT_CACHE_MAX_ENTRIES
 )
-from backend.app.embeddings import generate_embedding
-from backend.app.memory import store_memory, initialize_pinecone
+from backend.app.embeddings import batch_generate_embeddings
+from backend.app.answer_cache import answer_cache
+from backend.app.http_client import get_http_session
+from backend.app.rate_limit import acquire, raise_for_rate_limit, retry_async
+from backend.app.singleflight import coalesce, normalize_name
+from backend.app.memory import initialize_pinecone, delete_company_data
+from backend.app.memory.manifest import chunk_id, get_chunk_manifest
+from backend.app.memory.bm25 import get_bm25_index
+from backend.app.memory.bulk_upsert import BulkUpsertWriter
+from backend.app.tools.market_cache import TTLCache
+from backend.app.tools.company_resolver import canonical_company
+from backend.app.metrics import INGEST_STAGE_SECONDS, INGEST_SOURCE_SECONDS, INGEST_CHUNKS
 
 logger = logging.getLogger(__name__)
 
@@ -20,18 +38,24 @@ async def fetch_stock_data(company_symbol):
     """Fetch stock data from Alpha Vantage API."""
     url = f"https://www.alphavantage.co/query?function=OVERVIEW&symbol={company_symbol}&apikey={ALPHA_VANTAGE_API_KEY}"
     
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url) as response:
-            if response.status == 200:
-                data = await response.json()
-                if "Symbol" in data:
-                    return data
-                else:
-                    logger.warning(f"No stock data found for {company_symbol}")
-                    return None
-            else:
-                logger.error(f"Error fetching stock data: {response.status}")
-                return None
+    await acquire("alpha_vantage")
+    session = get_http_session()
+    async with session.get(url) as response:
+        raise_for_rate_limit("alpha_vantage", response)
+        if response.status == 200:
+            data = await response.json()
+            if "Symbol" in data:
+                return data
+            notice = data.get("Note") or data.get("Information")
+            if notice:
+                # Throttling or a bad key comes back as a 200 with a message
+                raise ValueError(f"Alpha Vantage declined the request: {notice}")
+            logger.warning(f"No stock data found for {company_symbol}")
+            return None
+        else:
+            logger.error(f"Error fetching stock data: {response.status}")
+            response.raise_for_status()
+            return None
 
 async def search_company_info(company_name):
     """Search for company information using Serper API."""
@@ -45,31 +69,37 @@ async def search_company_info(company_name):
         "num": 5
     }
     
-    async with aiohttp.ClientSession() as session:
-        async with session.post(url, headers=headers, json=payload) as response:
-            if response.status == 200:
-                data = await response.json()
-                return data
-            else:
-                logger.error(f"Error searching company info: {response.status}")
-                return None
+    await acquire("serper")
+    session = get_http_session()
+    async with session.post(url, headers=headers, json=payload) as response:
+        raise_for_rate_limit("serper", response)
+        if response.status == 200:
+            data = await response.json()
+            return data
+        else:
+            logger.error(f"Error searching company info: {response.status}")
+            response.raise_for_status()
+            return None
 
 async def fetch_news(company_name):
     """Fetch news about the company using News API."""
     url = f"https://newsapi.org/v2/everything?q={company_name}&apiKey={NEWS_API_KEY}&pageSize=5&language=en&sortBy=publishedAt"
     
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url) as response:
-            if response.status == 200:
-                data = await response.json()
-                if data.get("status") == "ok" and data.get("totalResults", 0) > 0:
-                    return data.get("articles", [])
-                else:
-                    logger.warning(f"No news found for {company_name}")
-                    return []
+    await acquire("newsapi")
+    session = get_http_session()
+    async with session.get(url) as response:
+        raise_for_rate_limit("newsapi", response)
+        if response.status == 200:
+            data = await response.json()
+            if data.get("status") == "ok" and data.get("totalResults", 0) > 0:
+                return data.get("articles", [])
             else:
-                logger.error(f"Error fetching news: {response.status}")
+                logger.warning(f"No news found for {company_name}")
                 return []
+        else:
+            logger.error(f"Error fetching news: {response.status}")
+            response.raise_for_status()
+            return []
 
 async def fetch_wikipedia_info(company_name):
     """Fetch company information from Wikipedia."""
@@ -81,38 +111,44 @@ async def fetch_wikipedia_info(company_name):
         "srlimit": 1
     }
     
-    async with aiohttp.ClientSession() as session:
-        async with session.get(MEDIAWIKI_API_ENDPOINT, params=params) as response:
-            if response.status == 200:
-                data = await response.json()
-                search_results = data.get("query", {}).get("search", [])
-                
-                if not search_results:
-                    logger.warning(f"No Wikipedia page found for {company_name}")
-                    return None
-                
-                page_id = search_results[0]["pageid"]
-                
-                # Get the full page content
-                content_params = {
-                    "action": "query",
-                    "format": "json",
-                    "prop": "extracts",
-                    "pageids": page_id,
-                    "explaintext": True
-                }
-                
-                async with session.get(MEDIAWIKI_API_ENDPOINT, params=content_params) as content_response:
-                    if content_response.status == 200:
-                        content_data = await content_response.json()
-                        page_content = content_data.get("query", {}).get("pages", {}).get(str(page_id), {}).get("extract", "")
-                        return page_content
-                    else:
-                        logger.error(f"Error fetching Wikipedia content: {content_response.status}")
-                        return None
-            else:
-                logger.error(f"Error searching Wikipedia: {response.status}")
+    await acquire("mediawiki")
+    session = get_http_session()
+    async with session.get(MEDIAWIKI_API_ENDPOINT, params=params) as response:
+        raise_for_rate_limit("mediawiki", response)
+        if response.status == 200:
+            data = await response.json()
+            search_results = data.get("query", {}).get("search", [])
+            
+            if not search_results:
+                logger.warning(f"No Wikipedia page found for {company_name}")
                 return None
+            
+            page_id = search_results[0]["pageid"]
+            
+            # Get the full page content
+            content_params = {
+                "action": "query",
+                "format": "json",
+                "prop": "extracts",
+                "pageids": page_id,
+                "explaintext": True
+            }
+            
+            await acquire("mediawiki")
+            async with session.get(MEDIAWIKI_API_ENDPOINT, params=content_params) as content_response:
+                raise_for_rate_limit("mediawiki", content_response)
+                if content_response.status == 200:
+                    content_data = await content_response.json()
+                    page_content = content_data.get("query", {}).get("pages", {}).get(str(page_id), {}).get("extract", "")
+                    return page_content
+                else:
+                    logger.error(f"Error fetching Wikipedia content: {content_response.status}")
+                    content_response.raise_for_status()
+                    return None
+        else:
+            logger.error(f"Error searching Wikipedia: {response.status}")
+            response.raise_for_status()
+            return None
 
 # Add this function to extract content from URLs using Jina Reader
 async def extract_content_from_url(url):
@@ -126,35 +162,247 @@ async def extract_content_from_url(url):
         "url": url
     }
     
-    async with aiohttp.ClientSession() as session:
-        async with session.post(api_url, headers=headers, json=payload) as response:
-            if response.status == 200:
-                data = await response.json()
-                return data.get("text", "")
-            else:
-                logger.error(f"Error extracting content from URL: {response.status}")
-                return ""
+    await acquire("jina")
+    session = get_http_session()
+    async with session.post(api_url, headers=headers, json=payload) as response:
+        raise_for_rate_limit("jina", response)
+        if response.status == 200:
+            data = await response.json()
+            return data.get("text", "")
+        else:
+            logger.error(f"Error extracting content from URL: {response.status}")
+            response.raise_for_status()
+            return ""
+
+# Extracted page text by URL. Expired entries are kept for a while so they can
+# be revalidated against the page's ETag instead of re-extracted.
+url_content_cache = TTLCache(max_entries=URL_CONTENT_CACHE_MAX_ENTRIES)
+
+async def fetch_etag(url):
+    """The page's current ETag from a HEAD request, or None if it has none or the request fails."""
+    try:
+        session = get_http_session()
+        async with session.head(url, allow_redirects=True, timeout=aiohttp.ClientTimeout(total=3)) as response:
+            if response.status < 400:
+                return response.headers.get("ETag")
+    except Exception as e:
+        logger.debug(f"Could not fetch ETag for {url}: {str(e)}")
+    return None
+
+async def extract_content_cached(url):
+    """Extract a URL's content, reusing cached text while the page's ETag is unchanged.
+
+    Fresh entries are returned as-is. Expired entries with an ETag are
+    revalidated with a HEAD request; only a changed (or missing) ETag costs a
+    Jina Reader call.
+    """
+    cache_key = ("url_content", (url,))
+    entry, state = url_content_cache.lookup(cache_key)
+    if state == "fresh":
+        return entry.value["text"]
+    
+    etag_task = asyncio.ensure_future(fetch_etag(url))
+    if state == "stale" and entry.value["etag"]:
+        etag = await etag_task
+        if etag == entry.value["etag"]:
+            url_content_cache.store(cache_key, entry.value, URL_CONTENT_CACHE_TTL, URL_CONTENT_CACHE_STALE)
+            return entry.value["text"]
+        etag_task = None
+    
+    try:
+        text = await retry_async(extract_content_from_url, url)
+    except BaseException:
+        if etag_task is not None:
+            etag_task.cancel()
+        raise
+    etag = await etag_task if etag_task is not None else etag
+    if text:
+        url_content_cache.store(
+            cache_key, {"etag": etag, "text": text}, URL_CONTENT_CACHE_TTL, URL_CONTENT_CACHE_STALE
+        )
+    return text
+
+async def extract_contents(links, max_concurrency=URL_EXTRACT_CONCURRENCY,
+                           deadline=URL_EXTRACT_DEADLINE, budget=URL_CONTENT_BUDGET, failed=None):
+    """Extract several URLs concurrently and return ``{url: text}`` for those that succeeded.
+    
+    At most ``max_concurrency`` extractions run at once and each has its own
+    timeout. Collection stops, and any still-running extractions are
+    cancelled, once ``deadline`` seconds pass or ``budget`` characters of
+    content have been gathered. If ``failed`` is a set, links that errored,
+    timed out or were never collected are added to it.
+    """
+    if not links:
+        return {}
+    semaphore = asyncio.Semaphore(max_concurrency)
+    
+    async def extract(link):
+        async with semaphore:
+            try:
+                return link, await asyncio.wait_for(extract_content_cached(link), timeout=SOURCE_TIMEOUTS["url"])
+            except asyncio.TimeoutError:
+                logger.warning(f"Timed out extracting content from URL {link}")
+            except Exception as e:
+                logger.error(f"Error extracting content from URL {link}: {str(e)}")
+            return link, None
+    
+    tasks = [asyncio.ensure_future(extract(link)) for link in dict.fromkeys(links)]
+    contents = {}
+    settled = set()
+    collected = 0
+    try:
+        for next_done in asyncio.as_completed(tasks, timeout=deadline):
+            link, text = await next_done
+            if text is not None:
+                settled.add(link)
+            if text:
+                contents[link] = text
+                collected += len(text)
+                if collected >= budget:
+                    logger.info(f"URL content budget reached after {len(contents)} of {len(tasks)} pages")
+                    break
+    except asyncio.TimeoutError:
+        logger.warning(f"URL extraction deadline hit after {len(contents)} of {len(tasks)} pages")
+    finally:
+        for task in tasks:
+            task.cancel()
+    if failed is not None:
+        failed.update(link for link in dict.fromkeys(links) if link not in settled)
+    return contents
+
+def _stored_ids(index, ids, batch_size=100):
+    """Which of ``ids`` are actually present in the index."""
+    present = set()
+    ids = list(ids)
+    for i in range(0, len(ids), batch_size):
+        try:
+            response = index.fetch(ids=ids[i:i + batch_size])
+        except Exception as e:
+            logger.error(f"Error checking stored chunks: {str(e)}")
+            continue
+        vectors = response.vectors if hasattr(response, "vectors") else response.get("vectors", {})
+        present.update(vectors)
+    return present
+
+def _delete_ids(index, ids, batch_size=1000):
+    """Delete vectors by id in batches; returns how many leading ids were deleted."""
+    for i in range(0, len(ids), batch_size):
+        try:
+            index.delete(ids=ids[i:i + batch_size])
+        except Exception as e:
+            logger.error(f"Error deleting stale chunks: {str(e)}")
+            return i
+    return len(ids)
+
+def _delete_chunks(index, manifest, bm25_index, company_name, ids):
+    """Delete chunks from the vector index, then drop the deleted ones from the manifest and BM25 index."""
+    deleted = _delete_ids(index, ids)
+    manifest.remove(company_name, ids[:deleted])
+    bm25_index.remove_many(ids[:deleted])
+    return deleted
+
+async def _timed_source(source, coro):
+    """Await one ingestion source, recording how long it took and whether it returned data."""
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        result = await coro
+        outcome = "ok" if result else "empty"
+        return result
+    finally:
+        INGEST_SOURCE_SECONDS.observe(time.perf_counter() - start, source=source, outcome=outcome)
+
+# Progress of in-flight ingestions by normalized company name, shared by
+# every caller waiting on the same run
+_ingestions = {}
+
+def _report(company_name, stage, **counts):
+    """Record an ingestion's progress and pass it to every caller waiting on it."""
+    ingestion = _ingestions.get(normalize_name(company_name))
+    if ingestion is None:
+        return
+    ingestion["stage"] = stage
+    ingestion["counts"].update(counts)
+    for listener in list(ingestion["listeners"]):
+        try:
+            listener(stage, **counts)
+        except Exception as e:
+            logger.error(f"Error reporting ingestion progress for {company_name}: {str(e)}")
+
+async def process_company_data(company_name, company_symbol=None, progress=None):
+    """Process company data from multiple sources and store in Pinecone.
+    
+    The company is stored under its canonical listing name (see
+    ``canonical_company``), the same name the chat router filters on, so
+    "Apple" and "Apple Inc." are one company.
+    
+    Ingestion is incremental: chunks are keyed by content hash, and the
+    company's chunk manifest decides which chunks are new (embedded and
+    upserted), unchanged (skipped) or gone (deleted). Running it twice on
+    the same data writes nothing the second time.
+    
+    ``progress(stage, **counts)`` is called, if given, as the pipeline moves
+    through the fetching, embedding and storing stages.
+    
+    A call made while the same company is already being ingested joins
+    that run instead of starting another: its ``progress`` is first called
+    with the run's current stage and counts, then receives the same
+    reports as the caller that started it. The joining call's
+    ``company_symbol`` is not used, and copies under its legacy name are
+    left for the next run to clean up.
+    """
+    canonical_name, company_symbol = canonical_company(company_name, company_symbol)
+    # Chunks stored before names were canonicalized are under the name as given
+    legacy_name = company_name if normalize_name(company_name) != normalize_name(canonical_name) else None
+    
+    key = normalize_name(canonical_name)
+    ingestion = _ingestions.setdefault(key, {"callers": 0, "listeners": [], "stage": None, "counts": {}})
+    ingestion["callers"] += 1
+    if progress is not None:
+        if ingestion["stage"] is not None:
+            logger.info(f"Joining in-flight ingestion of {canonical_name} at stage {ingestion['stage']}")
+            progress(ingestion["stage"], **ingestion["counts"])
+        ingestion["listeners"].append(progress)
+    try:
+        return await _ingest_company(canonical_name, company_symbol, legacy_name)
+    finally:
+        if progress is not None:
+            ingestion["listeners"].remove(progress)
+        ingestion["callers"] -= 1
+        if ingestion["callers"] == 0 and _ingestions.get(key) is ingestion:
+            del _ingestions[key]
 
 # Update the process_company_data function to use all APIs
-async def process_company_data(company_name, company_symbol=None):
-    """Process company data from multiple sources and store in Pinecone."""
+# Concurrent ingestions of the same company share one run
+@coalesce("ingest", key=lambda company_name, *args: normalize_name(company_name))
+async def _ingest_company(company_name, company_symbol, legacy_name):
+    report = lambda stage, **counts: _report(company_name, stage, **counts)
+    report("fetching")
     # Initialize Pinecone
     pinecone_index = initialize_pinecone()
     
     logger.info(f"Processing data for company: {company_name}, symbol: {company_symbol}")
     
     # Collect data from various sources
+    fetch_started = time.perf_counter()
     tasks = [
-        search_company_info(company_name),
-        fetch_wikipedia_info(company_name),
-        fetch_news(company_name)
+        _timed_source("serper", retry_async(search_company_info, company_name)),
+        _timed_source("wikipedia", retry_async(fetch_wikipedia_info, company_name)),
+        _timed_source("news", retry_async(fetch_news, company_name))
     ]
     
     if company_symbol:
-        tasks.append(fetch_stock_data(company_symbol))
+        tasks.append(_timed_source("alpha_vantage", retry_async(fetch_stock_data, company_symbol)))
     
     results = await asyncio.gather(*tasks, return_exceptions=True)
     
+    # Sources that failed this time; their stored chunks are kept rather than
+    # treated as gone
+    sources = ["serper", "wikipedia", "news", "alpha_vantage"]
+    failed_sources = {source for source, result in zip(sources, results) if isinstance(result, Exception)}
+    if "serper" in failed_sources:
+        failed_sources.add("url_content")
+    
     # Process results safely
     serper_data = results[0] if not isinstance(results[0], Exception) else None
     wiki_data = results[1] if not isinstance(results[1], Exception) else None
@@ -164,30 +412,32 @@ async def process_company_data(company_name, company_symbol=None):
     # Log what data was retrieved
     logger.info(f"Retrieved data: Serper: {bool(serper_data)}, Wiki: {bool(wiki_data)}, News: {bool(news_data)}, Stock: {bool(stock_data)}")
     
-    # Combine and clean data
+    # Combine and clean data, as (source, text) pairs
     combined_text = []
     
     # Process Serper data
     if serper_data:
         organic_results = serper_data.get("organic", [])
+        
+        # Extract content from the result URLs concurrently using Jina Reader
+        links = [result.get("link") for result in organic_results if result.get("link")]
+        failed_links = set()
+        url_contents = await _timed_source("url_extract", extract_contents(links, failed=failed_links))
+        if failed_links:
+            failed_sources.add("url_content")
+        
         for result in organic_results:
             title = result.get("title", "")
             snippet = result.get("snippet", "")
-            combined_text.append(f"Title: {title}\nDescription: {snippet}")
+            combined_text.append(("serper", f"Title: {title}\nDescription: {snippet}"))
             
-            # Try to extract content from the URL using Jina Reader
-            link = result.get("link")
-            if link:
-                try:
-                    url_content = await extract_content_from_url(link)
-                    if url_content:
-                        combined_text.append(f"Content from {title}:\n{url_content}")
-                except Exception as e:
-                    logger.error(f"Error extracting content from URL {link}: {str(e)}")
+            url_content = url_contents.get(result.get("link"))
+            if url_content:
+                combined_text.append(("url_content", f"Content from {title}:\n{url_content}"))
     
     # Process Wikipedia data
     if wiki_data:
-        combined_text.append(f"Wikipedia Information:\n{wiki_data}")
+        combined_text.append(("wikipedia", f"Wikipedia Information:\n{wiki_data}"))
     
     # Process news data
     if news_data:
@@ -200,50 +450,133 @@ async def process_company_data(company_name, company_symbol=None):
             
             news_text = f"News Title: {title}\nSource: {source}\nDate: {published_at}\n"
             news_text += f"Description: {description}\nContent: {content}"
-            combined_text.append(news_text)
+            combined_text.append(("news", news_text))
     
     # Process stock data
     if stock_data:
         stock_text = "Financial Information:\n"
         for key, value in stock_data.items():
             stock_text += f"{key}: {value}\n"
-        combined_text.append(stock_text)
+        combined_text.append(("alpha_vantage", stock_text))
+    
+    INGEST_STAGE_SECONDS.observe(time.perf_counter() - fetch_started, stage="fetch")
     
     # Split text into chunks
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000,
-        chunk_overlap=200,
-        length_function=len,
+    with INGEST_STAGE_SECONDS.time(stage="split"):
+        text_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=1000,
+            chunk_overlap=200,
+            length_function=len,
+        )
+        
+        all_chunks = []
+        for source, text in combined_text:
+            all_chunks.extend((source, chunk) for chunk in text_splitter.split_text(text))
+    
+    logger.info(f"Created {len(all_chunks)} text chunks for {company_name}")
+    report("embedding", chunks_fetched=len(all_chunks))
+    
+    if not all_chunks:
+        logger.warning(f"No data retrieved for {company_name}; leaving stored chunks untouched")
+        return 0
+    
+    # Key chunks by content so unchanged text keeps its id across ingestions
+    chunks_by_id, chunk_sources = {}, {}
+    for source, chunk in all_chunks:
+        cid = chunk_id(company_name, chunk)
+        if cid not in chunks_by_id:
+            chunks_by_id[cid] = chunk
+            chunk_sources[cid] = source
+    
+    # The manifest and BM25 index are SQLite-backed, so they are used from worker threads
+    manifest = await asyncio.to_thread(get_chunk_manifest)
+    if not await asyncio.to_thread(manifest.has_company, company_name):
+        # First ingestion with a manifest: drop vectors stored under the old timestamp keys
+        await asyncio.to_thread(delete_company_data, pinecone_index, company_name)
+    
+    existing_sources = await asyncio.to_thread(manifest.chunk_sources, company_name)
+    existing_ids = set(existing_sources)
+    legacy_ids = await asyncio.to_thread(manifest.chunk_ids, legacy_name) if legacy_name else set()
+    stored_ids = await asyncio.to_thread(_stored_ids, pinecone_index, existing_ids & chunks_by_id.keys())
+    new_ids = [cid for cid in chunks_by_id if cid not in stored_ids]
+    stale_ids = existing_ids - chunks_by_id.keys()
+    logger.info(
+        f"{company_name}: {len(new_ids)} new or changed chunks, {len(stored_ids)} unchanged, "
+        f"{len(stale_ids)} to remove"
     )
     
-    all_chunks = []
-    for text in combined_text:
-        chunks = text_splitter.split_text(text)
-        all_chunks.extend(chunks)
+    INGEST_CHUNKS.inc(len(new_ids), result="new")
+    INGEST_CHUNKS.inc(len(stored_ids), result="unchanged")
     
-    logger.info(f"Created {len(all_chunks)} text chunks for {company_name}")
+    # Generate embeddings in batches and store in Pinecone; chunks are
+    # documents, not queries, to the embedding model
+    with INGEST_STAGE_SECONDS.time(stage="embed"):
+        embeddings = await batch_generate_embeddings(
+            [chunks_by_id[cid] for cid in new_ids], task_type="retrieval_document"
+        )
+    report("storing", chunks_unchanged=len(stored_ids), chunks_embedded=sum(1 for e in embeddings if e))
     
-    # Generate embeddings and store in Pinecone
-    for i, chunk in enumerate(all_chunks):
-        embedding = await generate_embedding(chunk)
-        if embedding:
-            # Store in Pinecone
-            metadata = {
-                "company_name": company_name,
-                "company_symbol": company_symbol,
-                "text": chunk,
-                "chunk_id": i,
-                "timestamp": datetime.now().isoformat()
-            }
-            
-            key = f"{company_name.lower().replace(' ', '_')}_{i}_{datetime.now().timestamp()}"
-            success = store_memory(pinecone_index, key, embedding, metadata)
-            
-            if success:
-                logger.info(f"Successfully stored embedding {i+1}/{len(all_chunks)} for {company_name}")
+    def chunk_metadata(cid):
+        return {
+            "company_name": company_name,
+            "company_symbol": company_symbol or "",
+            "text": chunks_by_id[cid],
+            "chunk_id": cid,
+            "timestamp": datetime.now().isoformat()
+        }
+    
+    upsert_started = time.perf_counter()
+    async with BulkUpsertWriter(pinecone_index) as writer:
+        for cid, embedding in zip(new_ids, embeddings):
+            if embedding:
+                # Queue for a batched write to Pinecone
+                writer.add(cid, embedding, chunk_metadata(cid))
             else:
-                logger.error(f"Failed to store embedding {i+1}/{len(all_chunks)} for {company_name}")
-        else:
-            logger.error(f"Failed to generate embedding for chunk {i+1}/{len(all_chunks)}")
+                logger.error(f"Failed to generate embedding for chunk {cid}")
+    # Unchanged chunks are re-recorded too, so older entries pick up their source
+    await asyncio.to_thread(manifest.add, company_name, [*writer.written_ids, *stored_ids], chunk_sources)
+    
+    # Keep the lexical index in step with the vector index, including
+    # unchanged chunks it doesn't have yet
+    bm25_index = await asyncio.to_thread(get_bm25_index)
+    await asyncio.to_thread(bm25_index.add_many, [
+        (cid, chunks_by_id[cid], chunk_metadata(cid))
+        for cid in [*writer.written_ids, *(cid for cid in stored_ids if cid not in bm25_index)]
+    ])
+    
+    # Remove chunks that disappeared from the sources, and the copies stored
+    # under the legacy name. A failed source's chunks would look like they
+    # disappeared, so those are kept for now, as are chunks of unknown source
+    # (and legacy copies) whenever anything failed.
+    kept = {
+        cid for cid in stale_ids
+        if existing_sources[cid] in failed_sources or (existing_sources[cid] is None and failed_sources)
+    }
+    if failed_sources:
+        kept |= legacy_ids
+    if kept:
+        logger.warning(
+            f"Keeping {len(kept)} unmatched chunks for {company_name}: "
+            f"{', '.join(sorted(failed_sources))} failed"
+        )
+    removed = 0
+    for owner, ids in ((company_name, sorted(stale_ids - kept)), (legacy_name, sorted(legacy_ids - kept))):
+        if not ids:
+            continue
+        removed += await asyncio.to_thread(_delete_chunks, pinecone_index, manifest, bm25_index, owner, ids)
+    INGEST_STAGE_SECONDS.observe(time.perf_counter() - upsert_started, stage="upsert")
+    INGEST_CHUNKS.inc(removed, result="removed")
+    
+    # Cached answers about this company may no longer match what is stored
+    if writer.written_ids or removed:
+        answer_cache.invalidate(company_name)
+    
+    summary = writer.summary()
+    report("stored", chunks_stored=summary["vectors_written"], chunks_deleted=removed)
+    logger.info(
+        f"Stored {summary['vectors_written']}/{len(new_ids)} new embeddings and removed {removed} stale chunks "
+        f"for {company_name} in {summary['batches']} batches "
+        f"({summary['failed_batches']} failed, {summary['retries']} retries)"
+    )
     
     return len(all_chunks)
\ No newline at end of file
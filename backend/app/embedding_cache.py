@@ -0,0 +1,179 @@
+# backend/app/embedding_cache.py
+import hashlib
+import logging
+import re
+import sqlite3
+import threading
+import time
+from array import array
+from backend.app.config import EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_MAX_ENTRIES
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+def normalize_text(text):
+    """Collapse whitespace so trivially different copies of a text share a key."""
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+def cache_key(model, task_type, text):
+    """Content-addressed key for an embedding: hash of model, task type and text."""
+    raw = f"{model}\x00{task_type}\x00{normalize_text(text)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+# Hits whose last-used time is held in memory before being written back
+TOUCH_FLUSH_SIZE = 256
+TOUCH_FLUSH_INTERVAL = 60.0
+
+# Share of max_entries left after an eviction, so eviction runs in batches
+EVICT_TO = 0.9
+
+class EmbeddingCache:
+    """SQLite-backed LRU cache of embeddings keyed by content hash.
+
+    Vectors are stored as float32 blobs. Once the table grows past
+    ``max_entries``, the least recently used rows are evicted down to
+    ``EVICT_TO`` of the limit. Reads never write: last-used times of hits are
+    batched in memory and written back every ``TOUCH_FLUSH_SIZE`` hits or
+    ``TOUCH_FLUSH_INTERVAL`` seconds, and on the next write. The row count is
+    kept as a running total rather than counted on every write.
+
+    Calls block on SQLite, so async code should run them in a worker thread.
+    """
+
+    def __init__(self, path=EMBEDDING_CACHE_PATH, max_entries=EMBEDDING_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._touched = {}
+        self._last_flush = time.monotonic()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used)")
+        self._conn.commit()
+        self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    @staticmethod
+    def _encode(vector):
+        return array("f", vector).tobytes()
+
+    @staticmethod
+    def _decode(blob):
+        vector = array("f")
+        vector.frombytes(blob)
+        return vector.tolist()
+
+    def get_many(self, keys):
+        """Look up several keys at once. Returns a dict of the keys that were found."""
+        if not keys:
+            return {}
+        found = {}
+        with self._lock:
+            unique_keys = list(dict.fromkeys(keys))
+            # Stay well under SQLite's bound-parameter limit
+            for i in range(0, len(unique_keys), 500):
+                chunk = unique_keys[i:i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = self._decode(blob)
+            if found:
+                now = time.time()
+                self._touched.update((key, now) for key in found)
+                if (len(self._touched) >= TOUCH_FLUSH_SIZE
+                        or time.monotonic() - self._last_flush >= TOUCH_FLUSH_INTERVAL):
+                    self._flush_touched()
+                    self._conn.commit()
+            hits = sum(1 for key in keys if key in found)
+            self.hits += hits
+            self.misses += len(keys) - hits
+        return found
+
+    def get(self, key):
+        """Return the cached embedding for a key, or None."""
+        return self.get_many([key]).get(key)
+
+    def _flush_touched(self):
+        """Write batched last-used times back; the caller holds the lock and commits."""
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                [(used, key) for key, used in self._touched.items()]
+            )
+            self._touched.clear()
+        self._last_flush = time.monotonic()
+
+    def put_many(self, items):
+        """Store (key, vector) pairs and evict least recently used rows if over the limit."""
+        items = [(key, vector) for key, vector in items if vector is not None]
+        if not items:
+            return
+        now = time.time()
+        with self._lock:
+            # Keys are content hashes, so an existing row already holds the same vector
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                [(key, self._encode(vector), now) for key, vector in items]
+            )
+            self._count += self._conn.total_changes - before
+            self._flush_touched()
+            if self._count > self.max_entries:
+                target = int(self.max_entries * EVICT_TO)
+                before = self._conn.total_changes
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE key IN "
+                    "(SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+                    (self._count - target,)
+                )
+                self._count -= self._conn.total_changes - before
+            self._conn.commit()
+
+    def put(self, key, vector):
+        """Store a single embedding."""
+        self.put_many([(key, vector)])
+
+    def clear(self):
+        """Remove every cached embedding and reset the counters."""
+        with self._lock:
+            self._conn.execute("DELETE FROM embeddings")
+            self._conn.commit()
+            self._touched.clear()
+            self._count = 0
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """Return hit/miss counters and the current number of entries."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": self._count,
+            "max_entries": self.max_entries
+        }
+
+_cache = None
+
+def get_embedding_cache():
+    """Return the process-wide embedding cache, opening it on first use."""
+    global _cache
+    if _cache is None:
+        _cache = EmbeddingCache()
+        logger.info(f"Opened embedding cache at {EMBEDDING_CACHE_PATH}")
+    return _cache
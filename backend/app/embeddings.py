@@ -1,42 +1,135 @@
 # backend/app/embeddings.py
 import google.generativeai as genai
+import asyncio
 import logging
-from backend.app.config import GEMINI_API_KEY
+from backend.app.config import (
+    GEMINI_API_KEY,
+    EMBEDDING_MODEL,
+    EMBEDDING_BATCH_SIZE,
+    EMBEDDING_MAX_CONCURRENCY
+)
+from backend.app.embedding_cache import get_embedding_cache, cache_key
+from backend.app.rate_limit import retry_async
+from backend.app.singleflight import get_group
 
 logger = logging.getLogger(__name__)
 
-# Initialize Gemini API
+# Initialize Gemini API once per process
 genai.configure(api_key=GEMINI_API_KEY)
 
-# Update the model name in the generate_embedding function
-async def generate_embedding(text):
+# The cache is SQLite-backed, so it is read and written from a worker thread
+async def _cache_lookup(keys):
+    """Read embeddings from the persistent cache; a cache failure counts as a miss."""
+    try:
+        return await asyncio.to_thread(lambda: get_embedding_cache().get_many(keys))
+    except Exception as e:
+        logger.error(f"Error reading embedding cache: {e}")
+        return {}
+
+async def _cache_store(items):
+    """Write embeddings to the persistent cache, ignoring cache failures."""
+    try:
+        await asyncio.to_thread(lambda: get_embedding_cache().put_many(items))
+    except Exception as e:
+        logger.error(f"Error writing embedding cache: {e}")
+
+async def generate_embedding(text, task_type="retrieval_query"):
+    """Generate an embedding for a text, serving repeats from the embedding cache."""
+    key = cache_key(EMBEDDING_MODEL, task_type, text)
+    cached = (await _cache_lookup([key])).get(key)
+    if cached is not None:
+        return cached
+    
+    # Concurrent requests for the same text share one API call
+    return await get_group("embedding").do(key, _embed_and_cache, key, text, task_type)
+
+async def cached_embedding(text, task_type="retrieval_query"):
+    """Return a text's embedding if it is already cached, without calling the API."""
+    key = cache_key(EMBEDDING_MODEL, task_type, text)
+    return (await _cache_lookup([key])).get(key)
+
+async def _embed_and_cache(key, text, task_type):
+    embedding = await _generate_embedding_uncached(text, task_type)
+    if embedding is not None:
+        await _cache_store([(key, embedding)])
+    return embedding
+
+async def _generate_embedding_uncached(text, task_type):
     """Generate an embedding for a text using Google's Gemini API."""
     try:
-        genai.configure(api_key=GEMINI_API_KEY)
-        
-        # Use the embedding model
-        embedding_model = "models/embedding-001"  # This is likely a dedicated embedding model, so we don't change it
-        
-        # Generate embedding
-        embedding_result = embedding_model.embed_content(
+        # The Gemini client is synchronous, so keep it off the event loop
+        embedding_result = await retry_async(
+            asyncio.to_thread,
+            genai.embed_content,
+            upstream="gemini",
+            model=EMBEDDING_MODEL,
             content=text,
-            task_type="retrieval_query"
+            task_type=task_type
         )
         
         # Return the embedding values
-        return embedding_result.embedding
+        return embedding_result["embedding"]
     except Exception as e:
         logger.error(f"Error generating embedding: {e}")
         return None
 
-async def batch_generate_embeddings(texts):
-    """Generate embeddings for multiple texts."""
-    embeddings = []
-    for text in texts:
-        embedding = await generate_embedding(text)
-        if embedding:
-            embeddings.append(embedding)
-    return embeddings
-
-# If there are any other instances of the Gemini model being used for text generation
-# in this file, update those as well
\ No newline at end of file
+async def _embed_batch(texts, task_type, semaphore):
+    """Embed one batch in a single API call; fall back to per-text calls on failure."""
+    async with semaphore:
+        try:
+            result = await retry_async(
+                asyncio.to_thread,
+                genai.embed_content,
+                upstream="gemini",
+                model=EMBEDDING_MODEL,
+                content=texts,
+                task_type=task_type
+            )
+            embeddings = result["embedding"]
+            if len(embeddings) != len(texts):
+                raise ValueError(f"Expected {len(texts)} embeddings, got {len(embeddings)}")
+            return embeddings
+        except Exception as e:
+            logger.error(f"Error generating batch of {len(texts)} embeddings: {e}")
+    
+    # Retry individually so one bad text does not fail the whole batch
+    return [await _generate_embedding_uncached(text, task_type) for text in texts]
+
+async def batch_generate_embeddings(texts, task_type="retrieval_query",
+                                    batch_size=EMBEDDING_BATCH_SIZE,
+                                    max_concurrency=EMBEDDING_MAX_CONCURRENCY):
+    """Generate embeddings for multiple texts.
+    
+    Cached texts are served from the embedding cache. The rest are sent to
+    Gemini in batches of ``batch_size``, with at most ``max_concurrency``
+    batches in flight. The result is aligned with ``texts``: entry ``i`` is the
+    embedding for ``texts[i]``, or None if it failed.
+    """
+    texts = list(texts)
+    if not texts:
+        return []
+    
+    keys = [cache_key(EMBEDDING_MODEL, task_type, text) for text in texts]
+    cached = await _cache_lookup(keys)
+    
+    # Embed each distinct uncached text once
+    pending = {}
+    for key, text in zip(keys, texts):
+        if key not in cached and key not in pending:
+            pending[key] = text
+    
+    if pending:
+        pending_keys = list(pending.keys())
+        pending_texts = list(pending.values())
+        semaphore = asyncio.Semaphore(max_concurrency)
+        batches = [pending_texts[i:i + batch_size] for i in range(0, len(pending_texts), batch_size)]
+        results = await asyncio.gather(*(_embed_batch(batch, task_type, semaphore) for batch in batches))
+        
+        fresh = []
+        for batch_result in results:
+            fresh.extend(batch_result)
+        new_items = list(zip(pending_keys, fresh))
+        await _cache_store(new_items)
+        cached.update((key, vector) for key, vector in new_items if vector is not None)
+    
+    return [cached.get(key) for key in keys]
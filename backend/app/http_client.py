@@ -0,0 +1,60 @@
+# backend/app/http_client.py
+import aiohttp
+import logging
+from backend.app.config import (
+    HTTP_POOL_LIMIT,
+    HTTP_POOL_LIMIT_PER_HOST,
+    HTTP_DNS_CACHE_TTL,
+    HTTP_KEEPALIVE_TIMEOUT,
+    HTTP_TOTAL_TIMEOUT,
+    HTTP_CONNECT_TIMEOUT
+)
+
+logger = logging.getLogger(__name__)
+
+# One pooled session shared by all outbound HTTP calls for the app lifetime
+_session = None
+
+def _build_session():
+    """Create a ClientSession backed by a keep-alive connection pool."""
+    connector = aiohttp.TCPConnector(
+        limit=HTTP_POOL_LIMIT,
+        limit_per_host=HTTP_POOL_LIMIT_PER_HOST,
+        ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+        keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT
+    )
+    timeout = aiohttp.ClientTimeout(
+        total=HTTP_TOTAL_TIMEOUT,
+        connect=HTTP_CONNECT_TIMEOUT
+    )
+    return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+async def open_http_session():
+    """Open the shared HTTP session. Called on application startup."""
+    global _session
+    if _session is None or _session.closed:
+        _session = _build_session()
+        logger.info(
+            f"Opened shared HTTP session (limit={HTTP_POOL_LIMIT}, "
+            f"per_host={HTTP_POOL_LIMIT_PER_HOST})"
+        )
+    return _session
+
+async def close_http_session():
+    """Close the shared HTTP session. Called on application shutdown."""
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+        logger.info("Closed shared HTTP session")
+    _session = None
+
+def get_http_session():
+    """Return the shared HTTP session, opening it lazily if needed.
+
+    The lazy path covers scripts and the CLI, which run without the
+    FastAPI startup hook.
+    """
+    global _session
+    if _session is None or _session.closed:
+        _session = _build_session()
+    return _session
@@ -0,0 +1,302 @@
+# backend/app/ingest_jobs.py
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+from backend.app.config import INGEST_WORKERS, INGEST_QUEUE_SIZE, INGEST_JOB_DB
+from backend.app.data_ingestion import process_company_data
+
+logger = logging.getLogger(__name__)
+
+class QueueFullError(Exception):
+    """The ingestion queue is at capacity."""
+
+class JobLedger:
+    """SQLite record of every ingestion job, so queued work survives restarts."""
+
+    def __init__(self, path=INGEST_JOB_DB):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS ingest_jobs (
+                id TEXT PRIMARY KEY,
+                company_name TEXT NOT NULL,
+                company_symbol TEXT,
+                status TEXT NOT NULL,
+                stage TEXT,
+                progress TEXT NOT NULL,
+                error TEXT,
+                result TEXT,
+                created_at TEXT NOT NULL,
+                started_at TEXT,
+                finished_at TEXT
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_ingest_jobs_status ON ingest_jobs(status)")
+        self._conn.commit()
+
+    @staticmethod
+    def _to_dict(row):
+        job = dict(row)
+        job["progress"] = json.loads(job["progress"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def create(self, company_name, company_symbol):
+        job = {
+            "id": str(uuid.uuid4()),
+            "company_name": company_name,
+            "company_symbol": company_symbol,
+            "status": "queued",
+            "stage": None,
+            "progress": {"chunks_fetched": 0, "chunks_embedded": 0, "chunks_stored": 0},
+            "error": None,
+            "result": None,
+            "created_at": datetime.now().isoformat(),
+            "started_at": None,
+            "finished_at": None
+        }
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO ingest_jobs (id, company_name, company_symbol, status, progress, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (job["id"], company_name, company_symbol, "queued", json.dumps(job["progress"]), job["created_at"])
+            )
+            self._conn.commit()
+        return job
+
+    def update(self, job_id, **fields):
+        if "progress" in fields:
+            fields["progress"] = json.dumps(fields["progress"])
+        if "result" in fields:
+            fields["result"] = json.dumps(fields["result"])
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._conn.execute(f"UPDATE ingest_jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+            self._conn.commit()
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM ingest_jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def list(self, status=None, limit=50):
+        query = "SELECT * FROM ingest_jobs"
+        params = []
+        if status:
+            query += " WHERE status = ?"
+            params.append(status)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def unfinished(self):
+        """Jobs that were queued or running when the process last stopped, oldest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM ingest_jobs WHERE status IN ('queued', 'running') ORDER BY created_at"
+            ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+class _ProgressWriter:
+    """Writes a running job's progress reports to the ledger off the event loop.
+
+    Reports only update memory; one background task at a time writes the
+    latest state from a worker thread, so a burst of reports costs one or
+    two ledger commits rather than one each.
+    """
+
+    def __init__(self, ledger, job_id, progress):
+        self.ledger = ledger
+        self.job_id = job_id
+        self.stage = None
+        self.progress = progress
+        self._dirty = False
+        self._task = None
+
+    def report(self, stage, **counts):
+        self.stage = stage
+        self.progress.update(counts)
+        self._dirty = True
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._write())
+
+    async def _write(self):
+        while self._dirty:
+            self._dirty = False
+            try:
+                await asyncio.to_thread(
+                    self.ledger.update, self.job_id, stage=self.stage, progress=dict(self.progress)
+                )
+            except Exception as e:
+                logger.error(f"Error recording progress for ingestion job {self.job_id}: {str(e)}")
+
+    async def drain(self):
+        """Wait for the pending write, so it can't land after the job's final update."""
+        if self._task is not None:
+            await asyncio.gather(self._task, return_exceptions=True)
+
+class IngestJobManager:
+    """Bounded queue of ingestion jobs drained by a pool of worker tasks.
+
+    The ledger is synchronous SQLite, so every ledger call is made from a
+    worker thread.
+    """
+
+    def __init__(self, workers=INGEST_WORKERS, queue_size=INGEST_QUEUE_SIZE, ledger=None):
+        self.worker_count = workers
+        self.queue_size = queue_size
+        self.ledger = ledger
+        self._queue = None
+        self._workers = []
+        self._running = {}
+        self._progress = {}
+        self._cancelled = set()
+        self._stopping = False
+
+    async def start(self):
+        """Open the ledger, start the workers and re-queue jobs left over from a restart."""
+        if self.ledger is None:
+            self.ledger = await asyncio.to_thread(JobLedger)
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._workers = [asyncio.ensure_future(self._worker(i)) for i in range(self.worker_count)]
+        resumed = 0
+        for job in await asyncio.to_thread(self.ledger.unfinished):
+            if self._queue.full():
+                await asyncio.to_thread(self.ledger.update, job["id"], status="failed",
+                                        error="Queue full on restart", finished_at=datetime.now().isoformat())
+                continue
+            await asyncio.to_thread(self.ledger.update, job["id"], status="queued", stage=None)
+            self._queue.put_nowait(job["id"])
+            resumed += 1
+        logger.info(f"Started {self.worker_count} ingestion workers ({resumed} jobs resumed)")
+
+    async def stop(self):
+        """Stop the workers. Interrupted jobs stay "running" in the ledger and resume on restart."""
+        self._stopping = True
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._stopping = False
+
+    async def submit(self, company_name, company_symbol=None):
+        """Queue an ingestion and return its job record."""
+        if self._queue is None:
+            raise RuntimeError("Ingestion job manager is not running")
+        if self._queue.full():
+            raise QueueFullError(f"Ingestion queue is full ({self.queue_size} jobs)")
+        job = await asyncio.to_thread(self.ledger.create, company_name, company_symbol)
+        try:
+            self._queue.put_nowait(job["id"])
+        except asyncio.QueueFull:
+            # Other submissions filled the queue while the job was being recorded
+            await asyncio.to_thread(self.ledger.update, job["id"], status="failed", error="Queue full",
+                                    finished_at=datetime.now().isoformat())
+            raise QueueFullError(f"Ingestion queue is full ({self.queue_size} jobs)")
+        return job
+
+    def _with_live_progress(self, job):
+        # A running job's latest progress may not have reached the ledger yet
+        writer = self._progress.get(job["id"])
+        if writer is not None and job["status"] == "running":
+            job["stage"] = writer.stage or job["stage"]
+            job["progress"] = dict(writer.progress)
+        return job
+
+    async def get(self, job_id):
+        job = await asyncio.to_thread(self.ledger.get, job_id)
+        if job:
+            self._with_live_progress(job)
+            job["queue_depth"] = self._queue.qsize() if self._queue else 0
+        return job
+
+    async def list(self, status=None, limit=50):
+        jobs = await asyncio.to_thread(self.ledger.list, status=status, limit=limit)
+        return [self._with_live_progress(job) for job in jobs]
+
+    def stats(self):
+        """Jobs waiting in the queue and running right now."""
+        return {"queued": self._queue.qsize() if self._queue else 0, "running": len(self._running)}
+
+    async def cancel(self, job_id):
+        """Cancel a queued or running job. Returns the updated job, or None if unknown."""
+        job = await asyncio.to_thread(self.ledger.get, job_id)
+        if job is None or job["status"] not in ("queued", "running"):
+            return job
+        self._cancelled.add(job_id)
+        task = self._running.get(job_id)
+        if task is not None:
+            task.cancel()
+            # Let the job record its cancellation before reading it back
+            await asyncio.gather(task, return_exceptions=True)
+        else:
+            await asyncio.to_thread(self.ledger.update, job_id, status="cancelled",
+                                    finished_at=datetime.now().isoformat())
+        return await asyncio.to_thread(self.ledger.get, job_id)
+
+    async def _worker(self, number):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                if job_id in self._cancelled:
+                    self._cancelled.discard(job_id)
+                    continue
+                job = await asyncio.to_thread(self.ledger.get, job_id)
+                if job is None or job["status"] != "queued":
+                    continue
+                task = asyncio.ensure_future(self._run(job))
+                self._running[job_id] = task
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    # A cancelled job ends only that job; a cancelled worker stops the loop
+                    if self._stopping:
+                        raise
+                finally:
+                    self._running.pop(job_id, None)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job):
+        job_id = job["id"]
+        writer = _ProgressWriter(self.ledger, job_id, dict(job["progress"]))
+        self._progress[job_id] = writer
+        try:
+            await asyncio.to_thread(self.ledger.update, job_id, status="running",
+                                    started_at=datetime.now().isoformat())
+            # Ingestion is incremental, so existing data stays queryable throughout
+            chunks_processed = await process_company_data(
+                job["company_name"], job["company_symbol"], progress=writer.report
+            )
+            await writer.drain()
+            await asyncio.to_thread(
+                self.ledger.update, job_id, status="succeeded", stage="done", progress=writer.progress,
+                result={"chunks_processed": chunks_processed},
+                finished_at=datetime.now().isoformat()
+            )
+        except asyncio.CancelledError:
+            await writer.drain()
+            if job_id in self._cancelled:
+                self._cancelled.discard(job_id)
+                await asyncio.to_thread(self.ledger.update, job_id, status="cancelled",
+                                        finished_at=datetime.now().isoformat())
+            raise
+        except Exception as e:
+            logger.error(f"Ingestion job {job_id} failed: {str(e)}")
+            await writer.drain()
+            await asyncio.to_thread(self.ledger.update, job_id, status="failed", error=str(e),
+                                    finished_at=datetime.now().isoformat())
+        finally:
+            self._progress.pop(job_id, None)
+
+ingest_jobs = IngestJobManager()
@@ -1,15 +1,18 @@
-from fastapi import FastAPI, HTTPException, Query, Body
+from fastapi import FastAPI, HTTPException, Query, Body, Request
 import asyncio
-import uuid
 import time
-import random
+import uuid
 import os
 import sys
 from typing import List, Optional
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, Response
 # Fix the import statement
-from backend.app.agent.company_agent import generate_response, check_query_relevance
-from .tools.company_tools import get_stock_price, compare_stocks
+from backend.app.agent.company_agent import generate_response, stream_response, check_query_relevance, warm_up_llm_clients
+from backend.app.agent.llm_registry import health_check as llm_health_check
+from .tools.company_tools import get_stock_price_async, compare_stocks_async
+from .tools.market_cache import market_cache
+from .singleflight import singleflight_stats
 import json
 from pathlib import Path
 from datetime import datetime
@@ -17,6 +20,12 @@ from .embeddings import generate_embedding, batch_generate_embeddings
 from .memory import initialize_pinecone, store_memory, query_similar
 from .data_ingestion import process_company_data
 from .memory import initialize_pinecone, delete_company_data
+from .http_client import open_http_session, close_http_session
+from .rate_limit import retry_async, is_rate_limit_error
+from .ingest_jobs import ingest_jobs, QueueFullError
+from .chat_store import get_chat_store
+from .answer_cache import answer_cache
+from .metrics import render_metrics, CONTENT_TYPE, HTTP_REQUESTS_IN_FLIGHT, HTTP_REQUEST_SECONDS
 
 # Add this import to get CHAT_DIR from config
 from backend.app.config import CHAT_DIR
@@ -44,6 +53,9 @@ CHAT_DIR.mkdir(parents=True, exist_ok=True)
 # Initialize FastAPI app
 app = FastAPI()
 
+# Chat histories live in SQLite; legacy per-chat JSON files are imported on startup
+chat_store = get_chat_store()
+
 # Add logging for better error tracking
 import logging
 logging.basicConfig(level=logging.INFO)
@@ -61,14 +73,62 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+async def startup_event():
+    """Open the HTTP pool, warm the LLM clients, start ingestion workers and import legacy chat files."""
+    await open_http_session()
+    warm_up_llm_clients()
+    await ingest_jobs.start()
+    await asyncio.to_thread(chat_store.migrate_json_chats)
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the ingestion workers and close the shared HTTP connection pool."""
+    await ingest_jobs.stop()
+    await close_http_session()
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Track in-flight requests and per-route latency for /metrics."""
+    start = time.perf_counter()
+    status = 500
+    HTTP_REQUESTS_IN_FLIGHT.inc()
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        HTTP_REQUESTS_IN_FLIGHT.dec()
+        # Label by route template, not raw path, so chat and job ids don't explode the series count
+        route = request.scope.get("route")
+        HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - start,
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),
+            status=str(status)
+        )
+
 @app.get("/")
 async def root():
     return {"message": "Company Research Chatbot API is running."}
 
+@app.get("/metrics")
+async def metrics():
+    """Pipeline, ingestion, upstream and cache metrics in the Prometheus text format."""
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE)
+
+@app.get("/api/health/llm")
+async def llm_health(live: bool = Query(False, description="Also send a test prompt to the chat model")):
+    """Report the shared LLM clients and, optionally, check the model responds."""
+    status = await llm_health_check(live=live)
+    if status["status"] != "ok":
+        raise HTTPException(status_code=503, detail=status)
+    return status
+
 @app.get("/api/stock/{symbol}")
 async def stock_price(symbol: str):
     """Get the latest stock price for a company symbol."""
-    result = get_stock_price(symbol)
+    result = await get_stock_price_async(symbol)
     if "error" in result:
         raise HTTPException(status_code=404, detail=result["error"])
     return result
@@ -77,32 +137,93 @@ async def stock_price(symbol: str):
 async def compare_stock_prices(symbols: str = Query(..., description="Comma-separated list of stock symbols")):
     """Compare stock prices for multiple companies."""
     symbol_list = [s.strip() for s in symbols.split(',')]
-    result = compare_stocks(symbol_list)
+    result = await compare_stocks_async(symbol_list)
     if "error" in result:
         raise HTTPException(status_code=404, detail=result["error"])
     return result
 
+@app.get("/api/admin/cache")
+async def inspect_market_cache():
+    """Inspect the market data cache: per-namespace hit rates and every entry."""
+    return {**market_cache.snapshot(), "singleflight": singleflight_stats()}
+
+@app.delete("/api/admin/cache")
+async def purge_market_cache(
+    namespace: Optional[str] = Query(None, description="quote, overview, financials or symbol_search"),
+    key: Optional[str] = Query(None, description="Symbol or normalized company name")
+):
+    """Purge market data cache entries, optionally by namespace and key."""
+    if key is None:
+        return {"purged": market_cache.purge(namespace=namespace)}
+    # Symbols are cached upper-case, company names lower-case
+    keys = {key.strip().upper(), " ".join(key.lower().split())}
+    return {"purged": sum(market_cache.purge(namespace=namespace, key=k) for k in keys)}
+
+@app.get("/api/admin/answer-cache")
+async def inspect_answer_cache():
+    """Semantic answer cache hit rate and size."""
+    return answer_cache.stats()
+
+@app.delete("/api/admin/answer-cache")
+async def purge_answer_cache(company_name: Optional[str] = Query(None, description="Only this company's answers")):
+    """Drop cached answers, for one company or all of them."""
+    return {"purged": answer_cache.invalidate(company_name)}
+
 # Update the chat endpoint to handle the new query relevance types
 @app.post("/api/chat/")
 async def chat(request: dict):
-    """Generate a response to a user query."""
+    """Generate a response to a user query.
+    
+    Set ``bypass_cache`` to true to skip the semantic answer cache.
+    """
     user_id = request.get("user_id", str(uuid.uuid4()))
     query = request.get("query")
+    use_cache = not request.get("bypass_cache", False)
     
     if not query:
         raise HTTPException(status_code=400, detail="Query is required")
     
     try:
         # Generate response with retry mechanism
-        response = await retry_with_backoff(generate_response, user_id, query)
+        response = await retry_with_backoff(generate_response, user_id, query, use_cache=use_cache)
         return {"response": response, "user_id": user_id}
     except Exception as e:
         logger.error(f"Error in chat endpoint: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/api/ingest-company/")
+def format_sse(event: str, data) -> str:
+    """Format one Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/api/chat/stream")
+async def chat_stream(request: dict):
+    """Stream a response to a user query as Server-Sent Events.
+    
+    Emits ``stage`` events for each pipeline stage, ``token`` events with
+    generated text as it arrives, and a final ``done`` (or ``error``) event.
+    Set ``bypass_cache`` to true to skip the semantic answer cache.
+    """
+    user_id = request.get("user_id", str(uuid.uuid4()))
+    query = request.get("query")
+    use_cache = not request.get("bypass_cache", False)
+    
+    if not query:
+        raise HTTPException(status_code=400, detail="Query is required")
+    
+    async def event_stream():
+        yield format_sse("start", {"user_id": user_id})
+        async for event, data in stream_response(user_id, query, use_cache=use_cache):
+            yield format_sse(event, data)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/api/ingest-company/", status_code=202)
 async def ingest_company_data(data: dict = Body(...)):
-    """Ingest data for a specific company."""
+    """Queue ingestion for a specific company and return its job."""
     company_name = data.get("company_name")
     company_symbol = data.get("company_symbol")
     
@@ -110,33 +231,81 @@ async def ingest_company_data(data: dict = Body(...)):
         raise HTTPException(status_code=400, detail="Company name is required")
     
     try:
-        # Delete existing data for this company
-        delete_company_data(pinecone_index, company_name)
-        
-        # Process and store new data
-        chunks_processed = await process_company_data(company_name, company_symbol)
-        
-        return {
-            "success": True, 
-            "company_name": company_name,
-            "chunks_processed": chunks_processed
-        }
-    except Exception as e:
-        logger.error(f"Error ingesting company data: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
+        job = await ingest_jobs.submit(company_name, company_symbol)
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    
+    return {
+        "success": True,
+        "job_id": job["id"],
+        "company_name": company_name,
+        "status": job["status"]
+    }
+
+@app.post("/api/ingest-jobs/", status_code=202)
+async def create_ingest_jobs(data: dict = Body(...)):
+    """Queue ingestion for a list of companies, e.g. a watchlist re-ingest.
+    
+    Expects ``{"companies": [{"company_name": ..., "company_symbol": ...}, ...]}``.
+    Companies that do not fit in the queue are reported as rejected.
+    """
+    companies = data.get("companies") or []
+    if not companies:
+        raise HTTPException(status_code=400, detail="At least one company is required")
+    
+    jobs, rejected = [], []
+    for company in companies:
+        company_name = company.get("company_name")
+        if not company_name:
+            rejected.append({"company": company, "error": "Company name is required"})
+            continue
+        try:
+            job = await ingest_jobs.submit(company_name, company.get("company_symbol"))
+            jobs.append({"job_id": job["id"], "company_name": company_name})
+        except QueueFullError as e:
+            rejected.append({"company": company, "error": str(e)})
+    
+    return {"jobs": jobs, "rejected": rejected}
+
+@app.get("/api/ingest-jobs/")
+async def list_ingest_jobs(
+    status: Optional[str] = Query(None, description="queued, running, succeeded, failed or cancelled"),
+    limit: int = Query(50, ge=1, le=500)
+):
+    """List recent ingestion jobs, newest first."""
+    return {"jobs": await ingest_jobs.list(status=status, limit=limit)}
+
+@app.get("/api/ingest-jobs/{job_id}")
+async def get_ingest_job(job_id: str):
+    """Get an ingestion job's status and progress."""
+    job = await ingest_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
+
+@app.delete("/api/ingest-jobs/{job_id}")
+async def cancel_ingest_job(job_id: str):
+    """Cancel a queued or running ingestion job."""
+    job = await ingest_jobs.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
 
 # Chat history management endpoints
 @app.get("/api/chats/")
-async def get_chats():
-    """Get all chat histories."""
-    chats = []
+async def get_chats(
+    limit: Optional[int] = Query(None, ge=1, le=500, description="Page size; all chats when omitted"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    summary: bool = Query(False, description="Return id, title, timestamps and messageCount only")
+):
+    """List chat histories, most recently updated first."""
     try:
-        logger.info(f"Fetching chats from {CHAT_DIR}")
-        for chat_file in CHAT_DIR.glob("*.json"):
-            with open(chat_file, "r") as f:
-                chat = json.load(f)
-                chats.append(chat)
-        return {"chats": chats}
+        chats, next_cursor = await asyncio.to_thread(
+            chat_store.list_chats, limit=limit, cursor=cursor, summaries_only=summary
+        )
+        return {"chats": chats, "next_cursor": next_cursor}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error fetching chats: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -144,16 +313,13 @@ async def get_chats():
 @app.get("/api/chats/{chat_id}")
 async def get_chat(chat_id: str):
     """Get a specific chat history."""
-    chat_path = CHAT_DIR / f"{chat_id}.json"
-    if not chat_path.exists():
-        raise HTTPException(status_code=404, detail="Chat not found")
-    
     try:
-        with open(chat_path, "r") as f:
-            chat = json.load(f)
-        return {"chat": chat}
+        chat = await asyncio.to_thread(chat_store.get_chat, chat_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    if chat is None:
+        raise HTTPException(status_code=404, detail="Chat not found")
+    return {"chat": chat}
 
 @app.put("/api/chats/{chat_id}")
 async def save_chat(chat_id: str, chat_data: dict = Body(...)):
@@ -163,9 +329,7 @@ async def save_chat(chat_id: str, chat_data: dict = Body(...)):
         raise HTTPException(status_code=400, detail="Chat data is required")
     
     try:
-        chat_path = CHAT_DIR / f"{chat_id}.json"
-        with open(chat_path, "w") as f:
-            json.dump(chat, f)
+        await asyncio.to_thread(chat_store.save_chat, chat_id, chat)
         return {"success": True}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -173,15 +337,13 @@ async def save_chat(chat_id: str, chat_data: dict = Body(...)):
 @app.delete("/api/chats/{chat_id}")
 async def delete_chat(chat_id: str):
     """Delete a chat history."""
-    chat_path = CHAT_DIR / f"{chat_id}.json"
-    if not chat_path.exists():
-        raise HTTPException(status_code=404, detail="Chat not found")
-    
     try:
-        os.remove(chat_path)
-        return {"success": True}
+        deleted = await asyncio.to_thread(chat_store.delete_chat, chat_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Chat not found")
+    return {"success": True}
 
 @app.patch("/api/chats/{chat_id}/title")
 async def update_chat_title(chat_id: str, title_data: dict = Body(...)):
@@ -190,86 +352,40 @@ async def update_chat_title(chat_id: str, title_data: dict = Body(...)):
     if not new_title:
         raise HTTPException(status_code=400, detail="Title is required")
     
-    chat_path = CHAT_DIR / f"{chat_id}.json"
-    if not chat_path.exists():
-        raise HTTPException(status_code=404, detail="Chat not found")
-    
     try:
-        with open(chat_path, "r") as f:
-            chat = json.load(f)
-        
-        chat["title"] = new_title
-        chat["updatedAt"] = datetime.now().isoformat()
-        
-        with open(chat_path, "w") as f:
-            json.dump(chat, f)
-        
-        return {"success": True}
+        updated = await asyncio.to_thread(chat_store.update_title, chat_id, new_title)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    if not updated:
+        raise HTTPException(status_code=404, detail="Chat not found")
+    return {"success": True}
 
 @app.post("/api/chats/{chat_id}/messages")
 async def add_message_to_chat(chat_id: str, message_data: dict = Body(...)):
-    """Add a message to a chat."""
+    """Add a message to a chat, creating the chat if it doesn't exist."""
     message = message_data.get("message")
     if not message:
         raise HTTPException(status_code=400, detail="Message is required")
     
-    chat_path = CHAT_DIR / f"{chat_id}.json"
-    
     try:
-        if chat_path.exists():
-            with open(chat_path, "r") as f:
-                chat = json.load(f)
-        else:
-            # Create a new chat if it doesn't exist
-            chat = {
-                "id": chat_id,
-                "title": "New Conversation",
-                "messages": [],
-                "createdAt": datetime.now().isoformat(),
-                "updatedAt": datetime.now().isoformat()
-            }
-        
-        # Update title if it's the first user message and title is default
-        if len(chat["messages"]) == 0 and message["role"] == "user" and chat["title"] == "New Conversation":
-            content = message["content"]
-            chat["title"] = content[:30] + "..." if len(content) > 30 else content
-        
-        chat["messages"].append(message)
-        chat["updatedAt"] = datetime.now().isoformat()
-        
-        with open(chat_path, "w") as f:
-            json.dump(chat, f)
-        
+        await asyncio.to_thread(chat_store.append_message, chat_id, message)
         return {"success": True}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 async def retry_with_backoff(func, *args, max_retries=5, base_delay=2, **kwargs):
-    """Retry a function with exponential backoff when rate limit errors occur."""
-    retries = 0
-    while True:
-        try:
-            return await func(*args, **kwargs)
-        except Exception as e:
-            error_message = str(e).lower()
-            if ("429" in error_message or 
-                "quota" in error_message or 
-                "resource exhausted" in error_message) and retries < max_retries:
-                
-                retries += 1
-                delay = base_delay * (2 ** (retries - 1)) + random.uniform(0, 1)
-                print(f"\nRate limit hit. Retrying in {delay:.2f} seconds... (Attempt {retries}/{max_retries})")
-                time.sleep(delay)
-            else:
-                # If it's not a rate limit error or we've exceeded max retries, raise the error
-                if retries >= max_retries:
-                    print(f"\nMaximum retries ({max_retries}) exceeded. Please try again later.")
-                    return f"I'm sorry, I'm currently experiencing high demand. Please try again in a few minutes."
-                else:
-                    print(f"\nError: {str(e)}")
-                    return f"I encountered an error: {str(e)}"
+    """Retry a function with exponential backoff when rate limit errors occur.
+    
+    Backoff uses asyncio.sleep, so other requests keep running while this one waits.
+    """
+    try:
+        return await retry_async(func, *args, max_retries=max_retries, base_delay=base_delay, **kwargs)
+    except Exception as e:
+        if is_rate_limit_error(e):
+            logger.warning(f"Maximum retries ({max_retries}) exceeded: {str(e)}")
+            return f"I'm sorry, I'm currently experiencing high demand. Please try again in a few minutes."
+        logger.error(f"Error: {str(e)}")
+        return f"I encountered an error: {str(e)}"
 
 async def main():
     print("Company Research Agent")
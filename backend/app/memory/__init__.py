@@ -1,12 +1,21 @@
 # backend/app/memory/__init__.py
 from pinecone import Pinecone
 import logging
-from backend.app.config import PINECONE_API_KEY, PINECONE_ENV, PINECONE_INDEX, EMBEDDING_DIMENSION
+from backend.app.config import PINECONE_API_KEY, PINECONE_ENV, PINECONE_INDEX, EMBEDDING_DIMENSION, VECTOR_BACKEND
+from backend.app.memory.manifest import get_chunk_manifest
+from backend.app.memory.bm25 import get_bm25_index
 
 logger = logging.getLogger(__name__)
 
 def initialize_pinecone():
-    """Initialize Pinecone and return the index."""
+    """Initialize Pinecone and return the index.
+    
+    With VECTOR_BACKEND=local, returns the shared in-process index instead.
+    """
+    if VECTOR_BACKEND == "local":
+        from backend.app.memory.local_index import get_local_index
+        return get_local_index()
+    
     try:
         # Create a Pinecone client instance
         pc = Pinecone(api_key=PINECONE_API_KEY)
@@ -75,6 +84,8 @@ def delete_company_data(index, company_name: str):
         index.delete(
             filter={"company_name": company_name}
         )
+        get_chunk_manifest().clear(company_name)
+        get_bm25_index().remove_company(company_name)
         return True
     except Exception as e:
         logger.error(f"Error deleting company data: {str(e)}")
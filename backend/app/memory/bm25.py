@@ -0,0 +1,195 @@
+# backend/app/memory/bm25.py
+import json
+import logging
+import math
+import re
+import sqlite3
+import threading
+from collections import Counter, defaultdict
+from backend.app.config import BM25_INDEX_DB, BM25_K1, BM25_B
+from backend.app.singleflight import normalize_name
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[.&][a-z0-9]+)*")
+_POSSESSIVE_RE = re.compile(r"['’]s\b")
+
+STOPWORDS = {
+    "a", "about", "an", "and", "are", "as", "at", "be", "by", "can", "could", "did", "do", "does", "for",
+    "from", "has", "have", "how", "i", "in", "is", "it", "its", "me", "of", "on", "or", "tell", "that",
+    "the", "their", "this", "to", "was", "were", "what", "when", "where", "which", "who", "whom", "why",
+    "will", "with", "would", "you", "your"
+}
+
+_SUFFIXES = ("ing", "ed", "es", "s")
+
+def _stem(token):
+    """Strip a common inflection so "launched" and "launch" share a term."""
+    if len(token) > 4 and token.isalpha():
+        for suffix in _SUFFIXES:
+            if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+                return token[:-len(suffix)]
+    return token
+
+def tokenize(text):
+    """Lower-case, lightly stemmed word tokens without stopwords. Tickers like "brk.b" stay whole."""
+    text = _POSSESSIVE_RE.sub("", str(text).lower())
+    return [_stem(token) for token in _TOKEN_RE.findall(text) if token not in STOPWORDS]
+
+class BM25Index:
+    """In-process BM25 inverted index over chunk text, kept in sync with the vector index.
+
+    Postings live in memory; the chunks themselves are persisted in SQLite so
+    the index is rebuilt on startup without re-ingesting.
+    """
+
+    def __init__(self, path=BM25_INDEX_DB, k1=BM25_K1, b=BM25_B):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._docs = {}
+        self._postings = defaultdict(dict)
+        self._by_company = defaultdict(set)
+        self._total_length = 0
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS bm25_docs (
+                id TEXT PRIMARY KEY,
+                company TEXT NOT NULL,
+                text TEXT NOT NULL,
+                metadata TEXT
+            )
+            """
+        )
+        self._conn.commit()
+        for doc_id, text, metadata in self._conn.execute("SELECT id, text, metadata FROM bm25_docs"):
+            self._index(doc_id, text, json.loads(metadata) if metadata else {})
+        logger.info(f"Loaded {len(self._docs)} chunks into the BM25 index")
+
+    def __contains__(self, doc_id):
+        return doc_id in self._docs
+
+    def __len__(self):
+        return len(self._docs)
+
+    def _index(self, doc_id, text, metadata):
+        if doc_id in self._docs:
+            self._unindex(doc_id)
+        terms = Counter(tokenize(text))
+        company = normalize_name(metadata.get("company_name"))
+        self._docs[doc_id] = {"text": text, "metadata": metadata, "company": company,
+                              "length": sum(terms.values()), "terms": terms}
+        for term, tf in terms.items():
+            self._postings[term][doc_id] = tf
+        self._by_company[company].add(doc_id)
+        self._total_length += self._docs[doc_id]["length"]
+
+    def _unindex(self, doc_id):
+        doc = self._docs.pop(doc_id, None)
+        if doc is None:
+            return
+        for term in doc["terms"]:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[term]
+        self._by_company[doc["company"]].discard(doc_id)
+        if not self._by_company[doc["company"]]:
+            del self._by_company[doc["company"]]
+        self._total_length -= doc["length"]
+
+    def add_many(self, docs):
+        """Index ``(doc_id, text, metadata)`` tuples, replacing existing ids."""
+        docs = list(docs)
+        if not docs:
+            return
+        with self._lock:
+            for doc_id, text, metadata in docs:
+                self._index(doc_id, text, metadata)
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO bm25_docs (id, company, text, metadata) VALUES (?, ?, ?, ?)",
+                [(doc_id, normalize_name(metadata.get("company_name")), text, json.dumps(metadata))
+                 for doc_id, text, metadata in docs]
+            )
+            self._conn.commit()
+
+    def remove_many(self, doc_ids):
+        doc_ids = list(doc_ids)
+        with self._lock:
+            for doc_id in doc_ids:
+                self._unindex(doc_id)
+            self._conn.executemany("DELETE FROM bm25_docs WHERE id = ?", [(doc_id,) for doc_id in doc_ids])
+            self._conn.commit()
+
+    def remove_company(self, company_name):
+        """Drop every chunk for a company. Returns how many were removed."""
+        company = normalize_name(company_name)
+        with self._lock:
+            doc_ids = list(self._by_company.get(company, ()))
+            for doc_id in doc_ids:
+                self._unindex(doc_id)
+            self._conn.execute("DELETE FROM bm25_docs WHERE company = ?", (company,))
+            self._conn.commit()
+        return len(doc_ids)
+
+    def search(self, query, company_name=None, top_k=5):
+        """Score chunks against a query with BM25, optionally within one company.
+
+        Returns up to ``top_k`` ``{"id", "score", "text", "metadata",
+        "matched_terms", "query_terms"}`` dicts, best first.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        with self._lock:
+            if not terms or not self._docs:
+                return []
+            allowed = self._by_company.get(normalize_name(company_name), set()) if company_name else None
+            if allowed is not None and not allowed:
+                return []
+            doc_count = len(self._docs)
+            avg_length = self._total_length / doc_count
+            scores = defaultdict(float)
+            matched = defaultdict(int)
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, tf in postings.items():
+                    if allowed is not None and doc_id not in allowed:
+                        continue
+                    length_norm = 1 - self.b + self.b * self._docs[doc_id]["length"] / avg_length
+                    scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + self.k1 * length_norm)
+                    matched[doc_id] += 1
+            best = sorted(scores, key=scores.get, reverse=True)[:top_k]
+            return [
+                {
+                    "id": doc_id,
+                    "score": scores[doc_id],
+                    "text": self._docs[doc_id]["text"],
+                    "metadata": self._docs[doc_id]["metadata"],
+                    "matched_terms": matched[doc_id],
+                    "query_terms": len(terms)
+                }
+                for doc_id in best
+            ]
+
+    def document_frequency(self, term):
+        """Fraction of indexed chunks containing ``term``."""
+        with self._lock:
+            return len(self._postings.get(term, ())) / len(self._docs) if self._docs else 0.0
+
+    def stats(self):
+        with self._lock:
+            return {"documents": len(self._docs), "terms": len(self._postings), "companies": len(self._by_company)}
+
+_bm25_index = None
+
+def get_bm25_index():
+    """Return the process-wide BM25 index, loading persisted chunks on first use."""
+    global _bm25_index
+    if _bm25_index is None:
+        _bm25_index = BM25Index()
+    return _bm25_index
@@ -0,0 +1,122 @@
+# backend/app/memory/bulk_upsert.py
+import asyncio
+import logging
+import random
+import time
+from backend.app.config import UPSERT_BATCH_SIZE, UPSERT_MAX_CONCURRENCY, UPSERT_MAX_RETRIES
+
+logger = logging.getLogger(__name__)
+
+class BulkUpsertWriter:
+    """Buffer vectors and write them to the index in concurrent batches.
+
+    Vectors added with ``add`` are collected until ``batch_size`` is reached,
+    then written with a single ``index.upsert`` call. At most
+    ``max_concurrency`` batches are in flight at once, and a failed batch is
+    retried with exponential backoff. Call ``close`` (or use ``async with``)
+    to flush the remainder and wait for all writes to finish. Leaving an
+    ``async with`` block with an exception (including cancellation) drops
+    the buffer and cancels batches not yet written instead.
+    """
+
+    def __init__(self, index, batch_size=UPSERT_BATCH_SIZE,
+                 max_concurrency=UPSERT_MAX_CONCURRENCY, max_retries=UPSERT_MAX_RETRIES):
+        self.index = index
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.batch_stats = []
+        self.written_ids = []
+        self._buffer = []
+        self._tasks = []
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.abort()
+            return
+        await self.close()
+
+    def add(self, key: str, vector: list, metadata: dict = None):
+        """Queue one vector; a full buffer is flushed in the background."""
+        self._buffer.append((key, vector, metadata or {}))
+        if len(self._buffer) >= self.batch_size:
+            self._flush_buffer()
+
+    def _flush_buffer(self):
+        if not self._buffer:
+            return
+        batch = self._buffer
+        self._buffer = []
+        batch_number = len(self._tasks) + 1
+        self._tasks.append(asyncio.ensure_future(self._write_batch(batch_number, batch)))
+
+    async def _write_batch(self, batch_number, batch):
+        """Upsert one batch, retrying with backoff. Records a stats entry either way."""
+        async with self._semaphore:
+            start = time.perf_counter()
+            attempts = 0
+            error = None
+            while attempts <= self.max_retries:
+                attempts += 1
+                try:
+                    # The Pinecone client is synchronous, so keep it off the event loop
+                    await asyncio.to_thread(self.index.upsert, vectors=batch)
+                    error = None
+                    break
+                except Exception as e:
+                    error = str(e)
+                    logger.warning(f"Upsert batch {batch_number} failed (attempt {attempts}): {error}")
+                    if attempts <= self.max_retries:
+                        await asyncio.sleep(0.5 * (2 ** (attempts - 1)) + random.uniform(0, 0.25))
+
+            stats = {
+                "batch": batch_number,
+                "size": len(batch),
+                "attempts": attempts,
+                "seconds": round(time.perf_counter() - start, 4),
+                "success": error is None,
+                "error": error
+            }
+            self.batch_stats.append(stats)
+            if error is None:
+                self.written_ids.extend(key for key, _, _ in batch)
+                logger.info(f"Upserted batch {batch_number} ({len(batch)} vectors) in {stats['seconds']}s")
+            else:
+                logger.error(f"Giving up on upsert batch {batch_number} ({len(batch)} vectors): {error}")
+            return stats
+
+    async def flush(self):
+        """Write any buffered vectors and wait for every in-flight batch."""
+        self._flush_buffer()
+        if self._tasks:
+            await asyncio.gather(*self._tasks)
+
+    def abort(self):
+        """Drop buffered vectors and cancel batches that haven't finished.
+
+        A batch already inside ``index.upsert`` runs in a thread and still
+        completes; its ids are not added to ``written_ids``.
+        """
+        self._buffer = []
+        for task in self._tasks:
+            task.cancel()
+
+    async def close(self):
+        """Flush and return the summary of all batches written by this writer."""
+        await self.flush()
+        return self.summary()
+
+    def summary(self):
+        """Aggregate the per-batch stats."""
+        succeeded = [s for s in self.batch_stats if s["success"]]
+        return {
+            "batches": len(self.batch_stats),
+            "failed_batches": len(self.batch_stats) - len(succeeded),
+            "vectors_written": sum(s["size"] for s in succeeded),
+            "vectors_failed": sum(s["size"] for s in self.batch_stats if not s["success"]),
+            "retries": sum(s["attempts"] - 1 for s in self.batch_stats),
+            "batch_stats": sorted(self.batch_stats, key=lambda s: s["batch"])
+        }
@@ -0,0 +1,315 @@
+# backend/app/memory/local_index.py
+import json
+import logging
+import threading
+from collections import defaultdict
+import numpy as np
+from backend.app.config import EMBEDDING_DIMENSION, LOCAL_INDEX_STORAGE
+
+logger = logging.getLogger(__name__)
+
+class QueryMatch:
+    """A single query hit. Supports attribute and item access like Pinecone's."""
+
+    def __init__(self, id, score, metadata=None, values=None):
+        self.id = id
+        self.score = score
+        self.metadata = metadata or {}
+        self.values = values or []
+
+    def __getitem__(self, key):
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def to_dict(self):
+        return {"id": self.id, "score": self.score, "metadata": self.metadata, "values": self.values}
+
+class QueryResponse:
+    """Query result container with ``matches`` and ``namespace``."""
+
+    def __init__(self, matches, namespace=""):
+        self.matches = matches
+        self.namespace = namespace
+
+    def __getitem__(self, key):
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def to_dict(self):
+        return {"matches": [m.to_dict() for m in self.matches], "namespace": self.namespace}
+
+def _index_key(value):
+    """Dict key for a metadata value; lists and dicts are keyed by their JSON."""
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        return ("json", json.dumps(value, sort_keys=True, default=str))
+
+class _MetadataIndex:
+    """Per-field map from metadata value to the rows holding it.
+
+    A field is indexed the first time a filter uses it and kept up to date
+    as rows change, so a filter's mask is built from the matching rows
+    rather than by testing every row's metadata.
+    """
+
+    def __init__(self):
+        self._fields = {}
+
+    def _field(self, field, metadata):
+        index = self._fields.get(field)
+        if index is None:
+            index = defaultdict(set)
+            for row, meta in enumerate(metadata):
+                index[_index_key(meta.get(field))].add(row)
+            self._fields[field] = index
+        return index
+
+    def add(self, row, meta):
+        for field, index in self._fields.items():
+            index[_index_key(meta.get(field))].add(row)
+
+    def remove(self, row, meta):
+        for field, index in self._fields.items():
+            key = _index_key(meta.get(field))
+            rows = index.get(key)
+            if rows is not None:
+                rows.discard(row)
+                if not rows:
+                    del index[key]
+
+    def mask(self, metadata, filter):
+        """Boolean mask of rows whose metadata satisfies every field in ``filter``.
+
+        Supports Pinecone's ``$eq``, ``$ne``, ``$in`` and ``$nin``; a bare
+        value means ``$eq``.
+        """
+        size = len(metadata)
+        mask = np.ones(size, dtype=bool)
+        for field, condition in filter.items():
+            index = self._field(field, metadata)
+
+            def rows_with(values):
+                rows = set().union(*(index.get(_index_key(value), ()) for value in values))
+                matched = np.zeros(size, dtype=bool)
+                matched[np.fromiter(rows, dtype=np.int64, count=len(rows))] = True
+                return matched
+
+            if not isinstance(condition, dict):
+                condition = {"$eq": condition}
+            for op, operand in condition.items():
+                if op == "$eq":
+                    mask &= rows_with([operand])
+                elif op == "$ne":
+                    mask &= ~rows_with([operand])
+                elif op == "$in":
+                    mask &= rows_with(operand)
+                elif op == "$nin":
+                    mask &= ~rows_with(operand)
+        return mask
+
+class _Namespace:
+    """Vectors of one namespace in a contiguous float32 matrix plus their norms."""
+
+    def __init__(self, dimension):
+        self.dimension = dimension
+        self.matrix = np.zeros((0, dimension), dtype=np.float32)
+        self.norms = np.zeros(0, dtype=np.float32)
+        self.size = 0
+        self.ids = []
+        self.metadata = []
+        self.metadata_index = _MetadataIndex()
+        self.positions = {}
+
+    def _reserve(self, count):
+        capacity = self.matrix.shape[0]
+        if self.size + count <= capacity:
+            return
+        new_capacity = max(self.size + count, capacity * 2, 64)
+        matrix = np.zeros((new_capacity, self.dimension), dtype=np.float32)
+        matrix[:self.size] = self.matrix[:self.size]
+        norms = np.zeros(new_capacity, dtype=np.float32)
+        norms[:self.size] = self.norms[:self.size]
+        self.matrix, self.norms = matrix, norms
+
+    def upsert(self, records):
+        self._reserve(len(records))
+        for vector_id, values, metadata in records:
+            row = self.positions.get(vector_id)
+            if row is None:
+                row = self.size
+                self.size += 1
+                self.ids.append(vector_id)
+                self.metadata.append(metadata)
+                self.positions[vector_id] = row
+            else:
+                self.metadata_index.remove(row, self.metadata[row])
+                self.metadata[row] = metadata
+            self.metadata_index.add(row, metadata)
+            self.matrix[row] = np.asarray(values, dtype=np.float32)
+            self.norms[row] = np.linalg.norm(self.matrix[row])
+
+    def delete_rows(self, rows):
+        # Swap-remove from the highest row down so earlier rows stay valid
+        for row in sorted(set(rows), reverse=True):
+            last = self.size - 1
+            removed_id = self.ids[row]
+            self.metadata_index.remove(row, self.metadata[row])
+            if row != last:
+                self.metadata_index.remove(last, self.metadata[last])
+                self.metadata_index.add(row, self.metadata[last])
+                self.matrix[row] = self.matrix[last]
+                self.norms[row] = self.norms[last]
+                self.ids[row] = self.ids[last]
+                self.metadata[row] = self.metadata[last]
+                self.positions[self.ids[row]] = row
+            self.ids.pop()
+            self.metadata.pop()
+            del self.positions[removed_id]
+            self.size -= 1
+
+class LocalVectorIndex:
+    """In-process vector index that implements the subset of the Pinecone
+    ``Index`` API used by ``backend.app.memory``: ``upsert``, ``query``,
+    ``fetch``, ``delete`` and ``describe_index_stats``.
+
+    Scores are cosine similarities computed with one matrix-vector product,
+    and top-k selection uses ``argpartition``.
+    """
+
+    def __init__(self, dimension=EMBEDDING_DIMENSION):
+        self.dimension = dimension
+        self._namespaces = {}
+        self._lock = threading.RLock()
+
+    def _namespace(self, namespace, create=False):
+        ns = self._namespaces.get(namespace)
+        if ns is None and create:
+            ns = self._namespaces[namespace] = _Namespace(self.dimension)
+        return ns
+
+    @staticmethod
+    def _normalize_record(vector):
+        if isinstance(vector, dict):
+            return vector["id"], vector["values"], dict(vector.get("metadata") or {})
+        if len(vector) == 3:
+            vector_id, values, metadata = vector
+            return vector_id, values, dict(metadata or {})
+        vector_id, values = vector
+        return vector_id, values, {}
+
+    def upsert(self, vectors, namespace=""):
+        """Insert or overwrite vectors given as (id, values[, metadata]) tuples or dicts."""
+        records = [self._normalize_record(v) for v in vectors]
+        for vector_id, values, _ in records:
+            if len(values) != self.dimension:
+                raise ValueError(
+                    f"Vector {vector_id} has dimension {len(values)}, expected {self.dimension}"
+                )
+        with self._lock:
+            self._namespace(namespace, create=True).upsert(records)
+        return {"upserted_count": len(records)}
+
+    def query(self, vector, top_k=10, namespace="", include_metadata=True,
+              include_values=False, filter=None):
+        """Return the ``top_k`` vectors most cosine-similar to ``vector``."""
+        with self._lock:
+            ns = self._namespace(namespace)
+            if ns is None or ns.size == 0 or top_k <= 0:
+                return QueryResponse([], namespace)
+
+            query = np.asarray(vector, dtype=np.float32)
+            norm = np.linalg.norm(query)
+            if norm > 0:
+                query = query / norm
+
+            norms = ns.norms[:ns.size]
+            scores = (ns.matrix[:ns.size] @ query) / np.where(norms > 0, norms, 1.0)
+            candidates = np.arange(ns.size)
+            if filter:
+                mask = ns.metadata_index.mask(ns.metadata, filter)
+                candidates = candidates[mask]
+                scores = scores[mask]
+            if candidates.size == 0:
+                return QueryResponse([], namespace)
+
+            k = min(top_k, candidates.size)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+
+            matches = []
+            for position in top:
+                row = candidates[position]
+                matches.append(QueryMatch(
+                    id=ns.ids[row],
+                    score=float(scores[position]),
+                    metadata=dict(ns.metadata[row]) if include_metadata else None,
+                    values=ns.matrix[row].tolist() if include_values else None
+                ))
+            return QueryResponse(matches, namespace)
+
+    def fetch(self, ids, namespace=""):
+        """Return stored vectors by id."""
+        vectors = {}
+        with self._lock:
+            ns = self._namespace(namespace)
+            if ns is not None:
+                for vector_id in ids:
+                    row = ns.positions.get(vector_id)
+                    if row is not None:
+                        vectors[vector_id] = {
+                            "id": vector_id,
+                            "values": ns.matrix[row].tolist(),
+                            "metadata": dict(ns.metadata[row])
+                        }
+        return {"vectors": vectors, "namespace": namespace}
+
+    def delete(self, ids=None, delete_all=False, namespace="", filter=None):
+        """Delete vectors by id, by metadata filter, or all of a namespace."""
+        with self._lock:
+            ns = self._namespace(namespace)
+            if ns is None:
+                return {}
+            if delete_all:
+                del self._namespaces[namespace]
+                return {}
+            rows = []
+            if ids:
+                rows.extend(ns.positions[i] for i in ids if i in ns.positions)
+            if filter:
+                rows.extend(np.nonzero(ns.metadata_index.mask(ns.metadata, filter))[0].tolist())
+            ns.delete_rows(rows)
+        return {}
+
+    def describe_index_stats(self):
+        """Vector counts per namespace, shaped like Pinecone's response."""
+        with self._lock:
+            namespaces = {name: {"vector_count": ns.size} for name, ns in self._namespaces.items()}
+        return {
+            "dimension": self.dimension,
+            "namespaces": namespaces,
+            "total_vector_count": sum(ns["vector_count"] for ns in namespaces.values())
+        }
+
+_local_index = None
+
+def get_local_index():
+    """Return the process-wide local vector index.
+    
+    With LOCAL_INDEX_STORAGE=disk this is the persistent, quantized
+    SegmentedVectorIndex; otherwise a purely in-memory LocalVectorIndex.
+    """
+    global _local_index
+    if _local_index is None:
+        if LOCAL_INDEX_STORAGE == "disk":
+            from backend.app.memory.segment_store import SegmentedVectorIndex
+            _local_index = SegmentedVectorIndex()
+        else:
+            _local_index = LocalVectorIndex()
+        logger.info(f"Using in-process local vector index ({LOCAL_INDEX_STORAGE})")
+    return _local_index
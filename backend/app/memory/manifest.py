@@ -0,0 +1,109 @@
+# backend/app/memory/manifest.py
+import hashlib
+import logging
+import sqlite3
+import threading
+from datetime import datetime
+from backend.app.config import CHUNK_MANIFEST_DB
+from backend.app.singleflight import normalize_name
+
+logger = logging.getLogger(__name__)
+
+def content_hash(text):
+    """Hash of a chunk's text with whitespace collapsed."""
+    return hashlib.sha256(" ".join(text.split()).encode("utf-8")).hexdigest()
+
+def chunk_id(company_name, text):
+    """Deterministic vector id for a chunk: the company slug plus the chunk's content hash.
+
+    The same text for the same company always maps to the same id, so
+    re-ingesting it overwrites rather than duplicates.
+    """
+    slug = normalize_name(company_name).replace(" ", "_")
+    return f"{slug}_{content_hash(text)[:32]}"
+
+class ChunkManifest:
+    """SQLite record of which chunk ids are stored in the index for each company.
+
+    Each chunk also records the source it came from ("news", "wikipedia",
+    ...), so a source that fails during an ingestion can keep its chunks.
+    """
+
+    def __init__(self, path=CHUNK_MANIFEST_DB):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS chunks (
+                company TEXT NOT NULL,
+                chunk_id TEXT NOT NULL,
+                updated_at TEXT NOT NULL,
+                source TEXT,
+                PRIMARY KEY (company, chunk_id)
+            )
+            """
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(chunks)")}
+        if "source" not in columns:
+            # Manifests written before sources were recorded
+            self._conn.execute("ALTER TABLE chunks ADD COLUMN source TEXT")
+        self._conn.commit()
+
+    def has_company(self, company_name):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM chunks WHERE company = ? LIMIT 1", (normalize_name(company_name),)
+            ).fetchone()
+        return row is not None
+
+    def chunk_ids(self, company_name):
+        """The set of chunk ids recorded for a company."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT chunk_id FROM chunks WHERE company = ?", (normalize_name(company_name),)
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def chunk_sources(self, company_name):
+        """``{chunk_id: source}`` for a company; the source is None for chunks recorded without one."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT chunk_id, source FROM chunks WHERE company = ?", (normalize_name(company_name),)
+            ).fetchall()
+        return dict(rows)
+
+    def add(self, company_name, chunk_ids, sources=None):
+        """Record chunk ids for a company, with their source from the ``sources`` mapping if given."""
+        now = datetime.now().isoformat()
+        company = normalize_name(company_name)
+        sources = sources or {}
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunks (company, chunk_id, updated_at, source) VALUES (?, ?, ?, ?)",
+                [(company, cid, now, sources.get(cid)) for cid in chunk_ids]
+            )
+            self._conn.commit()
+
+    def remove(self, company_name, chunk_ids):
+        company = normalize_name(company_name)
+        with self._lock:
+            self._conn.executemany(
+                "DELETE FROM chunks WHERE company = ? AND chunk_id = ?",
+                [(company, cid) for cid in chunk_ids]
+            )
+            self._conn.commit()
+
+    def clear(self, company_name):
+        with self._lock:
+            self._conn.execute("DELETE FROM chunks WHERE company = ?", (normalize_name(company_name),))
+            self._conn.commit()
+
+_manifest = None
+
+def get_chunk_manifest():
+    """Return the process-wide chunk manifest."""
+    global _manifest
+    if _manifest is None:
+        _manifest = ChunkManifest()
+    return _manifest
@@ -0,0 +1,526 @@
+# backend/app/memory/segment_store.py
+"""Persistent, quantized storage for the local vector backend.
+
+On-disk layout of ``LOCAL_INDEX_DIR``::
+
+    manifest.json                  ordered list of live segments and the next sequence number
+    deletes.jsonl                  append-only log of deleted ids
+    <segment>.codes.npy            (n, dim) float16 or int8 vector codes, memory-mapped
+    <segment>.scales.npy           (n,) float32 per-vector scale (1.0 for float16)
+    <segment>.norms.npy            (n,) float32 norm of each dequantized vector
+    <segment>.meta.jsonl           one {"ns", "id", "metadata"} record per row, without the text
+    <segment>.text.bin             each row's metadata "text", UTF-8, concatenated
+    <segment>.text_spans.npy       (n, 2) int64 byte range of each row's text (-1 when it has none)
+
+Segments are immutable and written once per ``upsert`` call. A later segment
+overrides an earlier one for the same id. A delete applies to rows in segments
+whose sequence number is at most the one recorded with it. Chunk text is read
+from disk only for the rows a query returns.
+
+Compaction is size-tiered: segments are grouped by live row count into tiers
+``LOCAL_INDEX_MERGE_FACTOR`` times apart, and a background thread merges a
+tier once it holds that many segments. Each row is rewritten about once per
+tier rather than on every merge. Past ``LOCAL_INDEX_MAX_SEGMENTS`` the
+smallest segments are merged regardless.
+"""
+import json
+import logging
+import os
+import threading
+import uuid
+import numpy as np
+from backend.app.config import (
+    EMBEDDING_DIMENSION,
+    LOCAL_INDEX_DIR,
+    LOCAL_INDEX_QUANTIZATION,
+    LOCAL_INDEX_MERGE_FACTOR,
+    LOCAL_INDEX_MAX_SEGMENTS
+)
+from backend.app.memory.local_index import (
+    QueryMatch,
+    QueryResponse,
+    LocalVectorIndex,
+    _MetadataIndex
+)
+
+logger = logging.getLogger(__name__)
+
+_SEGMENT_FILES = ("codes.npy", "scales.npy", "norms.npy", "meta.jsonl", "text.bin", "text_spans.npy")
+
+def quantize(vectors, quantization):
+    """Encode float32 vectors as (codes, scales) for the given quantization."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if quantization == "int8":
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        safe = np.where(scales > 0, scales, 1.0)
+        codes = np.clip(np.rint(vectors / safe[:, None]), -127, 127).astype(np.int8)
+        return codes, scales.astype(np.float32)
+    if quantization == "float16":
+        return vectors.astype(np.float16), np.ones(len(vectors), dtype=np.float32)
+    raise ValueError(f"Unsupported quantization: {quantization}")
+
+def dequantize(codes, scales):
+    """Decode codes back to float32 vectors."""
+    return codes.astype(np.float32) * np.asarray(scales, dtype=np.float32)[:, None]
+
+class _Segment:
+    """One immutable, memory-mapped segment plus its in-memory liveness mask."""
+
+    def __init__(self, directory, name, seq):
+        self.directory = directory
+        self.name = name
+        self.seq = seq
+        self.codes = np.load(self._path("codes.npy"), mmap_mode="r")
+        self.scales = np.load(self._path("scales.npy"), mmap_mode="r")
+        self.norms = np.load(self._path("norms.npy"), mmap_mode="r")
+        self.ids = []
+        namespaces = []
+        self.metadata = []
+        with open(self._path("meta.jsonl"), "r", encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                namespaces.append(record["ns"])
+                self.ids.append(record["id"])
+                self.metadata.append(record["metadata"])
+        self.namespaces = np.array(namespaces, dtype=object)
+        self.metadata_index = _MetadataIndex()
+        self.live = np.ones(len(self.ids), dtype=bool)
+        # Segments written before text moved to its own file keep it in the metadata
+        self.text_spans = None
+        self.text = None
+        if os.path.exists(self._path("text_spans.npy")):
+            self.text_spans = np.load(self._path("text_spans.npy"), mmap_mode="r")
+            # An empty file can't be memory-mapped
+            if os.path.getsize(self._path("text.bin")) > 0:
+                self.text = np.memmap(self._path("text.bin"), dtype=np.uint8, mode="r")
+            else:
+                self.text = np.zeros(0, dtype=np.uint8)
+
+    def _path(self, suffix):
+        return os.path.join(self.directory, f"{self.name}.{suffix}")
+
+    def __len__(self):
+        return len(self.ids)
+
+    def vectors(self, rows):
+        return dequantize(self.codes[rows], self.scales[rows])
+
+    def live_count(self):
+        return int(np.count_nonzero(self.live))
+
+    def row_metadata(self, row):
+        """A row's full metadata, with its text read back from disk."""
+        metadata = dict(self.metadata[row])
+        if self.text_spans is not None:
+            start, end = (int(offset) for offset in self.text_spans[row])
+            if start >= 0:
+                metadata["text"] = bytes(self.text[start:end]).decode("utf-8")
+        return metadata
+
+    def release(self):
+        """Drop the memory maps so the files can be removed (required on Windows)."""
+        self.codes = self.scales = self.norms = None
+        self.text = self.text_spans = None
+
+    def remove_files(self):
+        self.release()
+        for suffix in _SEGMENT_FILES:
+            try:
+                os.remove(self._path(suffix))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Could not remove {self._path(suffix)}: {e}")
+
+    @classmethod
+    def write(cls, directory, seq, dimension, quantization, parts, total):
+        """Write a segment from ``parts``: an iterable of (vectors, records) pairs.
+
+        ``vectors`` is a float32 array and ``records`` a matching list of
+        (namespace, id, metadata) tuples. Codes are written straight into a
+        memory-mapped output file, so a merge never holds all vectors in RAM.
+        """
+        name = f"seg-{seq:08d}-{uuid.uuid4().hex[:8]}"
+        path = lambda suffix: os.path.join(directory, f"{name}.{suffix}")
+        dtype = np.int8 if quantization == "int8" else np.float16
+        codes_out = np.lib.format.open_memmap(path("codes.npy"), mode="w+", dtype=dtype, shape=(total, dimension))
+        scales_out = np.empty(total, dtype=np.float32)
+        norms_out = np.empty(total, dtype=np.float32)
+        spans_out = np.full((total, 2), -1, dtype=np.int64)
+        offset = 0
+        text_offset = 0
+        with open(path("meta.jsonl"), "w", encoding="utf-8") as meta_file, open(path("text.bin"), "wb") as text_file:
+            for vectors, records in parts:
+                if not records:
+                    continue
+                codes, scales = quantize(vectors, quantization)
+                end = offset + len(records)
+                codes_out[offset:end] = codes
+                scales_out[offset:end] = scales
+                norms_out[offset:end] = np.linalg.norm(dequantize(codes, scales), axis=1)
+                for row, (namespace, vector_id, metadata) in enumerate(records, start=offset):
+                    if "text" in metadata:
+                        metadata = dict(metadata)
+                        text = str(metadata.pop("text")).encode("utf-8")
+                        text_file.write(text)
+                        spans_out[row] = (text_offset, text_offset + len(text))
+                        text_offset += len(text)
+                    meta_file.write(json.dumps({"ns": namespace, "id": vector_id, "metadata": metadata}) + "\n")
+                offset = end
+        codes_out.flush()
+        del codes_out
+        np.save(path("scales.npy"), scales_out)
+        np.save(path("norms.npy"), norms_out)
+        np.save(path("text_spans.npy"), spans_out)
+        return cls(directory, name, seq)
+
+class SegmentedVectorIndex:
+    """Persistent local vector index over quantized, memory-mapped segments.
+
+    Exposes the same ``upsert``/``query``/``fetch``/``delete`` calls as
+    ``LocalVectorIndex``. Only ids and metadata other than the text are kept
+    in RAM; vector codes and text are paged in from disk by the OS as
+    queries touch them.
+    """
+
+    def __init__(self, directory=LOCAL_INDEX_DIR, dimension=EMBEDDING_DIMENSION,
+                 quantization=LOCAL_INDEX_QUANTIZATION, merge_factor=LOCAL_INDEX_MERGE_FACTOR,
+                 max_segments=LOCAL_INDEX_MAX_SEGMENTS):
+        self.directory = str(directory)
+        self.dimension = dimension
+        self.quantization = quantization
+        self.merge_factor = max(2, merge_factor)
+        self.max_segments = max_segments
+        self._lock = threading.RLock()
+        self._compacting = False
+        self._compaction_thread = None
+        self._segments = []
+        self._locations = {}
+        self._next_seq = 1
+        os.makedirs(self.directory, exist_ok=True)
+        self._load()
+
+    # -- persistence ---------------------------------------------------------
+
+    def _manifest_path(self):
+        return os.path.join(self.directory, "manifest.json")
+
+    def _deletes_path(self):
+        return os.path.join(self.directory, "deletes.jsonl")
+
+    def _save_manifest(self):
+        manifest = {
+            "version": 1,
+            "dimension": self.dimension,
+            "next_seq": self._next_seq,
+            "segments": [{"name": s.name, "seq": s.seq} for s in self._segments]
+        }
+        tmp_path = self._manifest_path() + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._manifest_path())
+
+    def _load(self):
+        manifest = {"next_seq": 1, "segments": []}
+        if os.path.exists(self._manifest_path()):
+            with open(self._manifest_path(), "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest.get("dimension", self.dimension) != self.dimension:
+                raise ValueError(
+                    f"Index at {self.directory} has dimension {manifest['dimension']}, expected {self.dimension}"
+                )
+        self._next_seq = manifest["next_seq"]
+
+        for entry in sorted(manifest["segments"], key=lambda e: e["seq"]):
+            segment = _Segment(self.directory, entry["name"], entry["seq"])
+            self._attach(segment)
+
+        if os.path.exists(self._deletes_path()):
+            with open(self._deletes_path(), "r", encoding="utf-8") as f:
+                for line in f:
+                    entry = json.loads(line)
+                    key = (entry["ns"], entry["id"])
+                    location = self._locations.get(key)
+                    if location and location[0].seq <= entry["seq"]:
+                        location[0].live[location[1]] = False
+                        del self._locations[key]
+
+        self._remove_orphans({s.name for s in self._segments})
+        logger.info(
+            f"Loaded local vector index from {self.directory}: "
+            f"{len(self._segments)} segments, {len(self._locations)} live vectors"
+        )
+
+    def _remove_orphans(self, live_names):
+        """Delete segment files left behind by a crash or a failed removal."""
+        for filename in os.listdir(self.directory):
+            if filename.startswith("seg-") and filename.split(".", 1)[0] not in live_names:
+                try:
+                    os.remove(os.path.join(self.directory, filename))
+                except OSError:
+                    pass
+
+    def _attach(self, segment):
+        """Add a segment on top of the others, superseding older rows with the same id."""
+        self._segments.append(segment)
+        for row, (namespace, vector_id) in enumerate(zip(segment.namespaces, segment.ids)):
+            key = (namespace, vector_id)
+            previous = self._locations.get(key)
+            if previous is not None:
+                previous[0].live[previous[1]] = False
+            self._locations[key] = (segment, row)
+
+    # -- Pinecone-style API --------------------------------------------------
+
+    def upsert(self, vectors, namespace=""):
+        """Insert or overwrite vectors; each call is written as one new segment."""
+        records = [LocalVectorIndex._normalize_record(v) for v in vectors]
+        if not records:
+            return {"upserted_count": 0}
+        for vector_id, values, _ in records:
+            if len(values) != self.dimension:
+                raise ValueError(
+                    f"Vector {vector_id} has dimension {len(values)}, expected {self.dimension}"
+                )
+        matrix = np.asarray([values for _, values, _ in records], dtype=np.float32)
+        rows = [(namespace, vector_id, metadata) for vector_id, _, metadata in records]
+
+        with self._lock:
+            seq = self._next_seq
+            segment = _Segment.write(
+                self.directory, seq, self.dimension, self.quantization, [(matrix, rows)], len(rows)
+            )
+            self._next_seq += 1
+            self._attach(segment)
+            self._save_manifest()
+        self.maybe_compact()
+        return {"upserted_count": len(records)}
+
+    def query(self, vector, top_k=10, namespace="", include_metadata=True,
+              include_values=False, filter=None):
+        """Return the ``top_k`` vectors most cosine-similar to ``vector``."""
+        query = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm > 0:
+            query = query / norm
+        if top_k <= 0:
+            return QueryResponse([], namespace)
+
+        with self._lock:
+            all_scores, owners = [], []
+            for segment in self._segments:
+                mask = segment.live & (segment.namespaces == namespace)
+                if filter:
+                    mask &= segment.metadata_index.mask(segment.metadata, filter)
+                rows = np.nonzero(mask)[0]
+                if rows.size == 0:
+                    continue
+                norms = segment.norms[rows]
+                scores = (segment.codes[rows].astype(np.float32) @ query) * segment.scales[rows]
+                scores /= np.where(norms > 0, norms, 1.0)
+                all_scores.append(scores)
+                owners.append((segment, rows))
+
+            if not all_scores:
+                return QueryResponse([], namespace)
+
+            scores = np.concatenate(all_scores)
+            offsets = np.cumsum([rows.size for _, rows in owners])
+            k = min(top_k, scores.size)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+
+            matches = []
+            for position in top:
+                owner = int(np.searchsorted(offsets, position, side="right"))
+                segment, rows = owners[owner]
+                row = int(rows[position - (offsets[owner - 1] if owner else 0)])
+                matches.append(QueryMatch(
+                    id=segment.ids[row],
+                    score=float(scores[position]),
+                    metadata=segment.row_metadata(row) if include_metadata else None,
+                    values=segment.vectors([row])[0].tolist() if include_values else None
+                ))
+            return QueryResponse(matches, namespace)
+
+    def fetch(self, ids, namespace=""):
+        """Return stored (dequantized) vectors by id."""
+        vectors = {}
+        with self._lock:
+            for vector_id in ids:
+                location = self._locations.get((namespace, vector_id))
+                if location is not None:
+                    segment, row = location
+                    vectors[vector_id] = {
+                        "id": vector_id,
+                        "values": segment.vectors([row])[0].tolist(),
+                        "metadata": segment.row_metadata(row)
+                    }
+        return {"vectors": vectors, "namespace": namespace}
+
+    def delete(self, ids=None, delete_all=False, namespace="", filter=None):
+        """Delete vectors by id, by metadata filter, or all of a namespace."""
+        with self._lock:
+            keys = set()
+            if delete_all:
+                keys.update(k for k in self._locations if k[0] == namespace)
+            if ids:
+                keys.update((namespace, i) for i in ids if (namespace, i) in self._locations)
+            if filter:
+                for segment in self._segments:
+                    mask = segment.live & (segment.namespaces == namespace) & segment.metadata_index.mask(segment.metadata, filter)
+                    keys.update((namespace, segment.ids[row]) for row in np.nonzero(mask)[0])
+            if not keys:
+                return {}
+
+            seq = self._next_seq - 1
+            with open(self._deletes_path(), "a", encoding="utf-8") as f:
+                for key in keys:
+                    f.write(json.dumps({"ns": key[0], "id": key[1], "seq": seq}) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            for key in keys:
+                segment, row = self._locations.pop(key)
+                segment.live[row] = False
+        return {}
+
+    def describe_index_stats(self):
+        """Vector counts per namespace, shaped like Pinecone's response."""
+        with self._lock:
+            counts = {}
+            for namespace, _ in self._locations:
+                counts[namespace] = counts.get(namespace, 0) + 1
+            segments = len(self._segments)
+        return {
+            "dimension": self.dimension,
+            "namespaces": {name: {"vector_count": count} for name, count in counts.items()},
+            "total_vector_count": sum(counts.values()),
+            "segments": segments,
+            "quantization": self.quantization
+        }
+
+    # -- compaction ----------------------------------------------------------
+
+    def _merge_candidates(self):
+        """The segments due for merging, or [] when none are. Call with the lock held."""
+        tiers = {}
+        for segment in self._segments:
+            # Tier t holds segments of merge_factor**t to merge_factor**(t + 1) live rows
+            size, tier = segment.live_count(), 0
+            while size >= self.merge_factor:
+                size //= self.merge_factor
+                tier += 1
+            tiers.setdefault(tier, []).append(segment)
+        for tier in sorted(tiers):
+            if len(tiers[tier]) >= self.merge_factor:
+                return tiers[tier]
+        if len(self._segments) > self.max_segments:
+            smallest = sorted(self._segments, key=lambda s: s.live_count())
+            return smallest[:self.merge_factor]
+        return []
+
+    def maybe_compact(self):
+        """Start a background compaction if a size tier is full or there are too many segments."""
+        with self._lock:
+            if self._compacting or not self._merge_candidates():
+                return False
+            self._compacting = True
+        self._compaction_thread = threading.Thread(target=self._compact_in_background, daemon=True)
+        self._compaction_thread.start()
+        return True
+
+    def _compact_in_background(self):
+        try:
+            # A merge can fill the next tier up, so keep going until nothing is due
+            while True:
+                with self._lock:
+                    candidates = self._merge_candidates()
+                if not candidates:
+                    break
+                self.compact(candidates)
+        except Exception as e:
+            logger.error(f"Error compacting local vector index: {str(e)}")
+        finally:
+            with self._lock:
+                self._compacting = False
+
+    def compact(self, segments=None):
+        """Merge the live rows of ``segments`` (default: all segments) into one new segment.
+
+        The new segment takes the newest source's sequence number. The merge
+        is written without holding the lock, so queries and writes continue
+        meanwhile. Rows deleted or overwritten during the merge are
+        reconciled when the new segment is swapped in.
+        """
+        with self._lock:
+            sources = list(self._segments if segments is None else segments)
+            if len(sources) <= 1:
+                return
+            live_rows = [(segment, np.nonzero(segment.live)[0]) for segment in sources]
+            seq = max(segment.seq for segment in sources)
+
+        total = sum(rows.size for _, rows in live_rows)
+        if total == 0:
+            with self._lock:
+                source_set = set(id(s) for s in sources)
+                self._segments = [s for s in self._segments if id(s) not in source_set]
+                self._save_manifest()
+                self._trim_delete_log()
+            for segment in sources:
+                segment.remove_files()
+            return
+
+        def parts():
+            for segment, rows in live_rows:
+                for start in range(0, rows.size, 4096):
+                    chunk = rows[start:start + 4096]
+                    records = [(segment.namespaces[r], segment.ids[r], segment.row_metadata(r)) for r in chunk]
+                    yield segment.vectors(chunk), records
+
+        origins = [(segment, row) for segment, rows in live_rows for row in rows]
+        merged = _Segment.write(self.directory, seq, self.dimension, self.quantization, parts(), total)
+
+        with self._lock:
+            source_set = set(id(s) for s in sources)
+            for row, (segment, source_row) in enumerate(origins):
+                key = (merged.namespaces[row], merged.ids[row])
+                location = self._locations.get(key)
+                if location is not None and location[0] is segment and location[1] == source_row:
+                    self._locations[key] = (merged, row)
+                else:
+                    merged.live[row] = False
+            remaining = [s for s in self._segments if id(s) not in source_set]
+            self._segments = sorted(remaining + [merged], key=lambda s: s.seq)
+            self._save_manifest()
+            self._trim_delete_log()
+
+        for segment in sources:
+            segment.remove_files()
+        logger.info(f"Compacted {len(sources)} segments into {merged.name} ({total} vectors)")
+
+    def _trim_delete_log(self):
+        """Drop delete entries older than every segment, which can no longer apply to any row.
+        Call with the lock held."""
+        path = self._deletes_path()
+        if not os.path.exists(path):
+            return
+        oldest = min((s.seq for s in self._segments), default=self._next_seq)
+        with open(path, "r", encoding="utf-8") as f:
+            kept = [line for line in f if json.loads(line)["seq"] >= oldest]
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.writelines(kept)
+        os.replace(tmp_path, path)
+
+    def close(self):
+        """Wait for any running compaction and release the memory maps."""
+        thread = self._compaction_thread
+        if thread is not None:
+            thread.join()
+        with self._lock:
+            for segment in self._segments:
+                segment.release()
+            self._segments = []
+            self._locations = {}
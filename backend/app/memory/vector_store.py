@@ -2,6 +2,7 @@
 import google.generativeai as genai
 from ..config import PINECONE_API_KEY, PINECONE_ENV, PINECONE_INDEX, GEMINI_API_KEY, EMBEDDING_DIMENSION
 import uuid
+from .local_index import LocalVectorIndex, get_local_index
 
 # Initialize Gemini for embeddings
 genai.configure(api_key=GEMINI_API_KEY)
@@ -33,35 +34,11 @@ def init_pinecone():
             
     except Exception as e:
         print(f"Error initializing Pinecone: {str(e)}")
-        print("Using mock vector store for testing...")
-        return MockPineconeIndex()
+        print("Using local in-process vector store...")
+        return get_local_index()
 
-class MockPineconeIndex:
-    """Mock Pinecone index for testing without a connection."""
-    
-    def __init__(self):
-        self.vectors = {}
-    
-    def upsert(self, vectors, namespace=""):
-        """Mock upsert method."""
-        if namespace not in self.vectors:
-            self.vectors[namespace] = {}
-        
-        for vector in vectors:
-            self.vectors[namespace][vector['id']] = {
-                'id': vector['id'],
-                'values': vector['values'],
-                'metadata': vector.get('metadata', {})
-            }
-        
-        return {"upserted_count": len(vectors)}
-    
-    def query(self, vector, top_k=10, namespace="", include_metadata=True):
-        """Mock query method."""
-        return {
-            "matches": [],
-            "namespace": namespace
-        }
+# Kept for backwards compatibility; the local index answers queries for real
+MockPineconeIndex = LocalVectorIndex
 
 def get_embedding(text):
     """Get embedding for text using Gemini."""
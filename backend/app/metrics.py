@@ -0,0 +1,288 @@
+# backend/app/metrics.py
+import logging
+import math
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Seconds; covers everything from a cache lookup to a slow LLM generation
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+def _number(value):
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(_Metric):
+    """Monotonically increasing count, per label set."""
+
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def render(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, key)} {_number(value)}" for key, value in items]
+
+class Gauge(Counter):
+    """Value that goes up and down, per label set."""
+
+    kind = "gauge"
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    @contextmanager
+    def track(self, **labels):
+        """Count the wrapped block as in progress while it runs."""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+class Histogram(_Metric):
+    """Cumulative bucket counts, sum and count of observations, per label set."""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * len(self.buckets), 0.0)
+            counts[bisect_left(self.buckets, value)] += 1
+            self._values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe how long the wrapped block takes, including when it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels):
+        entry = self._values.get(self._key(labels))
+        return sum(entry[0]) if entry else 0
+
+    def render(self):
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        lines = []
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(
+                    f"{self.name}_bucket{_labels(self.labelnames, key, [('le', _number(float(bound)))])} {cumulative}"
+                )
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+class Registry:
+    """Metrics and scrape-time collectors, rendered in the Prometheus text format.
+
+    A collector is a callable returning ``(name, kind, documentation,
+    samples)`` tuples, where samples are ``(labels_dict, value)`` pairs. It
+    is used for numbers other components already keep, such as cache stats.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+        return metric
+
+    def register_collector(self, collector):
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self):
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.header())
+            lines.extend(metric.render())
+        for collector in list(self._collectors):
+            try:
+                families = list(collector())
+            except Exception as e:
+                logger.error(f"Error collecting metrics from {getattr(collector, '__name__', collector)}: {str(e)}")
+                continue
+            for name, kind, documentation, samples in families:
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_labels(list(labels), list(labels.values()))} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+def counter(name, documentation, labelnames=()):
+    return registry.register(Counter(name, documentation, labelnames))
+
+def gauge(name, documentation, labelnames=()):
+    return registry.register(Gauge(name, documentation, labelnames))
+
+def histogram(name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+    return registry.register(Histogram(name, documentation, labelnames, buckets))
+
+# HTTP server
+HTTP_REQUESTS_IN_FLIGHT = gauge("http_requests_in_flight", "HTTP requests currently being handled")
+HTTP_REQUEST_SECONDS = histogram(
+    "http_request_duration_seconds", "Time to the response headers, by route", ("method", "route", "status")
+)
+
+# Answer pipeline (prepare_response / generate_response / stream_response)
+PIPELINE_IN_FLIGHT = gauge("pipeline_requests_in_flight", "Answer pipelines currently running", ("mode",))
+PIPELINE_STAGE_SECONDS = histogram(
+    "pipeline_stage_duration_seconds", "Duration of each answer pipeline stage", ("stage",)
+)
+PIPELINE_ROUTES = counter(
+    "pipeline_routes_total", "Queries by type and by what classified them", ("query_type", "source")
+)
+RETRIEVAL_MODE = counter("retrieval_requests_total", "Company retrievals by mode", ("mode",))
+VECTOR_QUERY_SECONDS = histogram(
+    "vector_query_duration_seconds", "Duration of each vector index query", ("filtered", "outcome")
+)
+EXTERNAL_TOOL_SECONDS = histogram(
+    "external_tool_duration_seconds", "Duration of each external source fetch", ("tool", "outcome")
+)
+CONTEXT_TOKENS = histogram(
+    "context_tokens", "Estimated tokens in the packed answer context", buckets=(250, 500, 1000, 1500, 2000, 3000, 4000, 8000)
+)
+GENERATION_FIRST_TOKEN_SECONDS = histogram(
+    "generation_first_token_seconds", "Time from starting streamed generation to the first token"
+)
+
+# Ingestion (process_company_data)
+INGEST_STAGE_SECONDS = histogram(
+    "ingest_stage_duration_seconds", "Duration of each ingestion stage", ("stage",)
+)
+INGEST_SOURCE_SECONDS = histogram(
+    "ingest_source_duration_seconds", "Duration of each ingestion source fetch", ("source", "outcome")
+)
+INGEST_CHUNKS = counter("ingest_chunks_total", "Chunks seen by ingestion, by what happened to them", ("result",))
+
+# Upstreams
+UPSTREAM_RESPONSES = counter(
+    "upstream_responses_total", "HTTP responses from upstream APIs by status class", ("upstream", "status")
+)
+UPSTREAM_RATE_LIMITED = counter(
+    "upstream_rate_limited_total", "Rate-limit (429 or equivalent) errors from upstreams", ("upstream",)
+)
+UPSTREAM_ERRORS = counter(
+    "upstream_errors_total", "Failed upstream calls other than rate limits", ("upstream",)
+)
+
+def status_class(status):
+    """"429" for rate limits, otherwise "2xx", "4xx", "5xx" and so on."""
+    return "429" if status == 429 else f"{status // 100}xx"
+
+def _cache_samples(name, stats, keys):
+    """Lookup counts and hit ratio (bypassed lookups excluded) for one cache from its stats dict."""
+    lookups = [({"cache": name, "result": key}, stats.get(key, 0)) for key in keys]
+    hits = stats.get("hits", 0) + stats.get("stale_hits", 0)
+    counted = sum(stats.get(key, 0) for key in keys if key != "bypassed")
+    return lookups, ({"cache": name}, round(hits / counted, 4) if counted else 0.0)
+
+def collect_app_metrics():
+    """Cache hit rates, single-flight sharing and ingestion queue depth, read at scrape time."""
+    # Imported here to avoid circular imports
+    from backend.app.answer_cache import answer_cache
+    from backend.app.embeddings import get_embedding_cache
+    from backend.app.tools.market_cache import market_cache
+    from backend.app.data_ingestion import url_content_cache
+    from backend.app.singleflight import singleflight_stats
+    from backend.app.ingest_jobs import ingest_jobs
+
+    lookups, ratios = [], []
+    caches = [("answer", answer_cache.stats(), ("hits", "misses", "bypassed"))]
+    embedding_cache = get_embedding_cache()
+    caches.append(("embedding", {"hits": embedding_cache.hits, "misses": embedding_cache.misses}, ("hits", "misses")))
+    for prefix, cache in (("market", market_cache), ("url_content", url_content_cache)):
+        for namespace, stats in cache.snapshot()["stats"].items():
+            caches.append((f"{prefix}:{namespace}", stats, ("hits", "stale_hits", "misses")))
+    for name, stats, keys in caches:
+        samples, ratio = _cache_samples(name, stats, keys)
+        lookups.extend(samples)
+        ratios.append(ratio)
+
+    flights = singleflight_stats()
+    jobs = ingest_jobs.stats()
+    return [
+        ("cache_lookups_total", "counter", "Cache lookups by cache and result", lookups),
+        ("cache_hit_ratio", "gauge", "Share of cache lookups served from the cache", ratios),
+        ("singleflight_calls_total", "counter", "Calls started per single-flight group",
+         [({"group": name}, stats["calls"]) for name, stats in flights.items()]),
+        ("singleflight_shared_total", "counter", "Calls that joined an in-flight call per group",
+         [({"group": name}, stats["shared"]) for name, stats in flights.items()]),
+        ("singleflight_in_flight", "gauge", "Calls in flight per single-flight group",
+         [({"group": name}, stats["in_flight"]) for name, stats in flights.items()]),
+        ("ingest_jobs", "gauge", "Ingestion jobs queued and running in this process",
+         [({"status": status}, count) for status, count in jobs.items()]),
+    ]
+
+registry.register_collector(collect_app_metrics)
+
+def render_metrics():
+    """All metrics in the Prometheus text exposition format."""
+    return registry.render()
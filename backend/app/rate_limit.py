@@ -0,0 +1,152 @@
+# backend/app/rate_limit.py
+import asyncio
+import logging
+import random
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from backend.app.config import RATE_LIMITS, RETRY_MAX_ATTEMPTS, RETRY_BASE_DELAY, RETRY_MAX_DELAY
+from backend.app.metrics import UPSTREAM_RESPONSES, UPSTREAM_RATE_LIMITED, UPSTREAM_ERRORS, status_class
+
+logger = logging.getLogger(__name__)
+
+class RateLimitError(Exception):
+    """An upstream answered 429 (or an equivalent quota error)."""
+
+    def __init__(self, upstream, retry_after=None, message=None):
+        self.upstream = upstream
+        self.retry_after = retry_after
+        super().__init__(message or f"Rate limited by {upstream}" + (
+            f" (retry after {retry_after:.1f}s)" if retry_after is not None else ""
+        ))
+
+class TokenBucket:
+    """Async token bucket: ``rate`` tokens per second, holding at most ``capacity``.
+
+    Waiters queue on a lock, so tokens are handed out in arrival order. After a
+    429, ``block_for`` pauses the whole bucket until the upstream's
+    Retry-After has passed.
+    """
+
+    def __init__(self, name, rate, capacity):
+        self.name = name
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        """Wait until a request may be sent, then take one token."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.blocked_until:
+                    await asyncio.sleep(self.blocked_until - now)
+                    continue
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def block_for(self, seconds):
+        """Hold back every request to this upstream for ``seconds``."""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+
+_buckets = {
+    name: TokenBucket(name, limits["rate"], limits["burst"])
+    for name, limits in RATE_LIMITS.items()
+}
+
+def get_bucket(upstream):
+    """Return the token bucket for an upstream."""
+    return _buckets[upstream]
+
+async def acquire(upstream):
+    """Throttle before sending a request to ``upstream``."""
+    await _buckets[upstream].acquire()
+
+def parse_retry_after(value):
+    """Parse a Retry-After header (delta-seconds or HTTP-date) into seconds."""
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+        if retry_at.tzinfo is None:
+            retry_at = retry_at.replace(tzinfo=timezone.utc)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+def raise_for_rate_limit(upstream, response):
+    """Raise RateLimitError for a 429 response and pause that upstream's bucket."""
+    UPSTREAM_RESPONSES.inc(upstream=upstream, status=status_class(response.status))
+    if response.status != 429:
+        return
+    UPSTREAM_RATE_LIMITED.inc(upstream=upstream)
+    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+    _buckets[upstream].block_for(retry_after if retry_after is not None else RETRY_BASE_DELAY)
+    raise RateLimitError(upstream, retry_after)
+
+def is_rate_limit_error(error):
+    """Whether an exception means "slow down" rather than a hard failure."""
+    if isinstance(error, RateLimitError):
+        return True
+    for attr in ("status", "status_code", "code"):
+        if getattr(error, attr, None) == 429:
+            return True
+    # LLM client libraries often re-wrap the original error, so check the cause chain
+    cause = error.__cause__ or error.__context__
+    if cause is not None and cause is not error:
+        return is_rate_limit_error(cause)
+    message = str(error).lower()
+    return "429" in message and ("quota" in message or "resource exhausted" in message or "rate" in message)
+
+def backoff_delay(attempt, base_delay=RETRY_BASE_DELAY, max_delay=RETRY_MAX_DELAY):
+    """Exponential backoff with full jitter for the given 1-based attempt."""
+    return random.uniform(0, min(max_delay, base_delay * (2 ** (attempt - 1))))
+
+async def retry_async(func, *args, upstream=None, max_retries=RETRY_MAX_ATTEMPTS,
+                      base_delay=RETRY_BASE_DELAY, max_delay=RETRY_MAX_DELAY, **kwargs):
+    """Await ``func(*args, **kwargs)``, retrying rate-limit errors without blocking the loop.
+
+    With ``upstream`` set, each attempt first takes a token from that
+    upstream's bucket. The wait honours Retry-After when the upstream sent
+    one, and otherwise uses jittered exponential backoff. Other errors, and
+    rate limits after ``max_retries`` retries, are re-raised.
+    """
+    attempt = 0
+    while True:
+        if upstream:
+            await acquire(upstream)
+        try:
+            return await func(*args, **kwargs)
+        except Exception as e:
+            rate_limited = is_rate_limit_error(e)
+            # RateLimitErrors were counted where the 429 was seen
+            if upstream and not isinstance(e, RateLimitError):
+                (UPSTREAM_RATE_LIMITED if rate_limited else UPSTREAM_ERRORS).inc(upstream=upstream)
+            if not rate_limited or attempt >= max_retries:
+                raise
+            attempt += 1
+            retry_after = getattr(e, "retry_after", None)
+            delay = min(max_delay, retry_after) if retry_after is not None else backoff_delay(attempt, base_delay, max_delay)
+            if upstream and retry_after is None:
+                _buckets[upstream].block_for(delay)
+            logger.warning(
+                f"Rate limited{f' by {upstream}' if upstream else ''}; "
+                f"retrying in {delay:.2f}s (attempt {attempt}/{max_retries})"
+            )
+            await asyncio.sleep(delay)
@@ -0,0 +1,843 @@
+# backend/app/scripts/benchmark.py
+"""Offline end-to-end latency benchmark for the FastAPI app.
+
+Starts ``backend.app.main:app`` under uvicorn against local stand-ins for
+every upstream (Gemini chat and embeddings, Pinecone, Alpha Vantage,
+NewsAPI, Serper, Jina, MediaWiki and the web pages Jina reads), drives the
+chat, ingestion, stock comparison and chat history endpoints at fixed
+concurrency levels, and writes p50/p95/p99 latency, throughput and
+event-loop lag as JSON.
+
+    python -m backend.app.scripts.benchmark --concurrency 1,8,32 --output bench.json
+    python -m backend.app.scripts.benchmark --baseline bench.json --output new.json
+
+Upstream latency is lognormal, given as a median and a p95 per upstream, with
+an optional error rate and status; ``--profile`` takes a JSON file of
+overrides such as ``{"jina": {"median_ms": 2000, "p95_ms": 6000, "error_rate": 0.05}}``.
+The Gemini and Pinecone stand-ins block their calling thread like the real
+synchronous clients do, so a call that sneaks onto the event loop shows up
+as event-loop lag. With ``--baseline``, the run exits non-zero if p95
+latency or p99 event-loop lag regressed by more than ``--regression-threshold``.
+
+Client-side upstream rate limits are lifted unless ``--keep-rate-limits`` is
+given; set any other config variable in the environment as usual.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import math
+import os
+import platform
+import random
+import re
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import warnings
+import zlib
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import urlsplit, urlunsplit
+
+# Allow running as a file as well as with -m
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+
+import aiohttp
+import numpy as np
+from aiohttp import web
+from yarl import URL
+
+logger = logging.getLogger("benchmark")
+
+SCENARIOS = ("chat", "ingest", "compare", "chat_history")
+
+DEFAULT_PROFILES = {
+    "gemini_chat": {"median_ms": 900, "p95_ms": 2500},
+    "gemini_embed": {"median_ms": 120, "p95_ms": 300},
+    "pinecone": {"median_ms": 60, "p95_ms": 150},
+    "alpha_vantage": {"median_ms": 250, "p95_ms": 700},
+    "newsapi": {"median_ms": 300, "p95_ms": 800},
+    "serper": {"median_ms": 400, "p95_ms": 1000},
+    "jina": {"median_ms": 1200, "p95_ms": 3000},
+    "mediawiki": {"median_ms": 150, "p95_ms": 400},
+    "web": {"median_ms": 80, "p95_ms": 200},
+}
+
+UPSTREAM_HOSTS = {
+    "www.alphavantage.co": "alpha_vantage",
+    "newsapi.org": "newsapi",
+    "google.serper.dev": "serper",
+    "api.jina.ai": "jina",
+    "en.wikipedia.org": "mediawiki",
+}
+
+MEDIAWIKI_URL = "https://en.wikipedia.org/w/api.php"
+
+_WORDS = (
+    "revenue growth margin guidance quarter annual customers market share product launch platform cloud "
+    "services segment operating income expansion strategy acquisition partnership regulatory outlook demand "
+    "supply chain pricing investment research development headcount dividend buyback valuation earnings"
+).split()
+
+class UpstreamProfile:
+    """Latency and error distribution for one stand-in upstream."""
+
+    def __init__(self, name, median_ms, p95_ms, error_rate=0.0, error_status=503, scale=1.0, rng=None):
+        self.name = name
+        self.median = median_ms / 1000 * scale
+        # Lognormal with the given median and 95th percentile
+        self.sigma = math.log(max(p95_ms, median_ms) / median_ms) / 1.645 if median_ms > 0 else 0.0
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.rng = rng or random.Random()
+        self.calls = 0
+        self.errors = 0
+
+    def latency(self):
+        self.calls += 1
+        return self.median * math.exp(self.sigma * self.rng.gauss(0, 1)) if self.median else 0.0
+
+    def fails(self):
+        failed = self.rng.random() < self.error_rate
+        self.errors += failed
+        return failed
+
+    def to_dict(self):
+        return {"calls": self.calls, "errors": self.errors}
+
+def build_profiles(overrides, scale, seed):
+    rng = random.Random(seed)
+    profiles = {}
+    for name, defaults in DEFAULT_PROFILES.items():
+        settings = {**defaults, **overrides.get(name, {})}
+        profiles[name] = UpstreamProfile(name, scale=scale, rng=random.Random(rng.random()), **settings)
+    return profiles
+
+def percentile(values, p):
+    """Linearly interpolated percentile of a sorted list."""
+    if not values:
+        return None
+    k = (len(values) - 1) * p / 100
+    lower, upper = math.floor(k), math.ceil(k)
+    return values[lower] + (values[upper] - values[lower]) * (k - lower)
+
+def summarize_ms(seconds):
+    values = sorted(s * 1000 for s in seconds)
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "p50": round(percentile(values, 50), 2),
+        "p95": round(percentile(values, 95), 2),
+        "p99": round(percentile(values, 99), 2),
+        "mean": round(sum(values) / len(values), 2),
+        "max": round(values[-1], 2),
+    }
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+# -- Generated upstream content ----------------------------------------------
+
+def _rng_for(*parts):
+    return random.Random(zlib.crc32("|".join(str(p) for p in parts).encode("utf-8")))
+
+def _paragraph(name, *seed, sentences=6):
+    rng = _rng_for(name, *seed)
+    out = []
+    for _ in range(sentences):
+        words = " ".join(rng.choice(_WORDS) for _ in range(rng.randint(8, 16)))
+        out.append(f"{name} {words} {rng.randint(1, 99)}%.")
+    return " ".join(out)
+
+def _symbol_for(name):
+    return re.sub(r"[^A-Z]", "", str(name).upper())[:4] or "ACME"
+
+def alpha_vantage_response(params):
+    function = params.get("function")
+    symbol = params.get("symbol", "ACME")
+    rng = _rng_for("av", function, symbol)
+    if function == "GLOBAL_QUOTE":
+        price = rng.uniform(10, 900)
+        return {"Global Quote": {
+            "01. symbol": symbol, "05. price": f"{price:.2f}", "06. volume": str(rng.randint(10**5, 10**8)),
+            "07. latest trading day": datetime.now().strftime("%Y-%m-%d"),
+            "09. change": f"{rng.uniform(-5, 5):.2f}", "10. change percent": f"{rng.uniform(-3, 3):.2f}%"
+        }}
+    if function == "OVERVIEW":
+        return {
+            "Symbol": symbol, "Name": f"{symbol} Inc", "Exchange": "NASDAQ", "Sector": "TECHNOLOGY",
+            "Industry": "SOFTWARE", "Description": _paragraph(symbol, "overview"),
+            "MarketCapitalization": str(rng.randint(10**9, 3 * 10**12)), "PERatio": f"{rng.uniform(5, 60):.2f}",
+            "EPS": f"{rng.uniform(-2, 20):.2f}", "RevenueTTM": str(rng.randint(10**8, 4 * 10**11)),
+            "ProfitMargin": f"{rng.uniform(-0.1, 0.4):.3f}", "52WeekHigh": f"{rng.uniform(100, 900):.2f}",
+            "52WeekLow": f"{rng.uniform(10, 100):.2f}", "DividendYield": "None"
+        }
+    if function == "INCOME_STATEMENT":
+        return {"symbol": symbol, "annualReports": [{
+            "fiscalDateEnding": f"{datetime.now().year - 1}-12-31", "reportedCurrency": "USD",
+            "totalRevenue": str(rng.randint(10**8, 4 * 10**11)), "grossProfit": str(rng.randint(10**7, 10**11)),
+            "operatingIncome": str(rng.randint(10**7, 10**11)), "netIncome": str(rng.randint(10**6, 10**11))
+        }]}
+    if function == "SYMBOL_SEARCH":
+        keywords = params.get("keywords", "")
+        return {"bestMatches": [{"1. symbol": _symbol_for(keywords), "2. name": keywords, "4. region": "United States"}]}
+    return {"Information": f"Unknown function {function}"}
+
+def newsapi_response(params):
+    name = params.get("q", "")
+    return {"status": "ok", "totalResults": 5, "articles": [
+        {
+            "source": {"name": f"Wire {i}"}, "title": f"{name} news item {i}",
+            "description": _paragraph(name, "news", i, sentences=2), "content": _paragraph(name, "news-body", i),
+            "url": f"https://news.example.com/{_symbol_for(name).lower()}/{i}",
+            "publishedAt": datetime.now().isoformat()
+        }
+        for i in range(5)
+    ]}
+
+def serper_response(payload):
+    name = str(payload.get("q", "")).replace(" company information", "")
+    slug = _symbol_for(name).lower()
+    return {"organic": [
+        {"title": f"{name} overview {i}", "link": f"https://pages.example.com/{slug}/{i}",
+         "snippet": _paragraph(name, "snippet", i, sentences=2)}
+        for i in range(int(payload.get("num", 5)))
+    ]}
+
+def jina_response(payload):
+    url = str(payload.get("url", ""))
+    name = url.rstrip("/").split("/")[-2] if url.count("/") > 3 else url
+    return {"text": _paragraph(name.upper(), "page", url, sentences=30), "metadata": {"title": f"Page about {name}"}}
+
+def mediawiki_response(params):
+    if params.get("list") == "search":
+        title = params.get("srsearch", "").replace(" company", "")
+        return {"query": {"search": [{"pageid": zlib.crc32(title.encode("utf-8")) % 10**7, "title": title}]}}
+    title = params.get("titles")
+    pageid = params.get("pageids") or str(zlib.crc32(str(title).encode("utf-8")) % 10**7)
+    title = title or f"Page {pageid}"
+    return {"query": {"pages": {str(pageid): {
+        "pageid": int(pageid), "title": title, "extract": _paragraph(title, "wiki", sentences=40)
+    }}}}
+
+# -- Upstream stand-ins ------------------------------------------------------
+
+class StubUpstreamServer:
+    """One local HTTP server answering for every HTTP upstream, in its own thread.
+
+    Outbound requests are rewritten to it with the original host in an
+    ``X-Upstream-Host`` header; unknown hosts are served as plain web pages.
+    """
+
+    def __init__(self, profiles):
+        self.profiles = profiles
+        self.port = _free_port()
+        self.base_url = f"http://127.0.0.1:{self.port}"
+        self._loop = None
+        self._ready = threading.Event()
+        self._stopped = None
+        self._thread = threading.Thread(target=self._run, name="stub-upstreams", daemon=True)
+
+    async def _handle(self, request):
+        host = request.headers.get("X-Upstream-Host", "")
+        upstream = UPSTREAM_HOSTS.get(host, "web")
+        profile = self.profiles[upstream]
+        await asyncio.sleep(profile.latency())
+        if profile.fails():
+            headers = {"Retry-After": "1"} if profile.error_status == 429 else {}
+            return web.json_response({"error": f"stub {upstream} error"}, status=profile.error_status, headers=headers)
+
+        params = dict(request.query)
+        if upstream == "alpha_vantage":
+            return web.json_response(alpha_vantage_response(params))
+        if upstream == "newsapi":
+            return web.json_response(newsapi_response(params))
+        if upstream == "mediawiki":
+            return web.json_response(mediawiki_response(params))
+        if upstream in ("serper", "jina"):
+            payload = await request.json() if request.can_read_body else {}
+            return web.json_response(serper_response(payload) if upstream == "serper" else jina_response(payload))
+        etag = f'"{zlib.crc32(request.path.encode("utf-8"))}"'
+        return web.Response(text=f"<html><body>{_paragraph(request.path, 'web')}</body></html>",
+                            content_type="text/html", headers={"ETag": etag})
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        app = web.Application()
+        app.router.add_route("*", "/{tail:.*}", self._handle)
+        runner = web.AppRunner(app, access_log=None)
+        self._loop.run_until_complete(runner.setup())
+        self._loop.run_until_complete(web.TCPSite(runner, "127.0.0.1", self.port).start())
+        self._stopped = asyncio.Event()
+        self._ready.set()
+        self._loop.run_until_complete(self._stopped.wait())
+        self._loop.run_until_complete(runner.cleanup())
+        self._loop.close()
+
+    def start(self):
+        self._thread.start()
+        self._ready.wait(10)
+        return self
+
+    def stop(self):
+        if self._loop is not None and self._stopped is not None:
+            self._loop.call_soon_threadsafe(self._stopped.set)
+            self._thread.join(10)
+
+def install_http_rewrites(stub_base_url):
+    """Send the app's aiohttp and requests traffic to the stub server."""
+    import requests
+    from backend.app import http_client
+
+    stub = URL(stub_base_url)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", DeprecationWarning)
+
+        class RewritingSession(aiohttp.ClientSession):
+            async def _request(self, method, str_or_url, **kwargs):
+                url = URL(str_or_url)
+                if url.host != stub.host or url.port != stub.port:
+                    kwargs["headers"] = {**dict(kwargs.get("headers") or {}), "X-Upstream-Host": url.host or ""}
+                    url = stub.with_path(url.path).with_query(url.query)
+                return await super()._request(method, url, **kwargs)
+
+    def build_rewriting_session():
+        connector = aiohttp.TCPConnector(limit=http_client.HTTP_POOL_LIMIT,
+                                         limit_per_host=http_client.HTTP_POOL_LIMIT_PER_HOST,
+                                         keepalive_timeout=http_client.HTTP_KEEPALIVE_TIMEOUT)
+        timeout = aiohttp.ClientTimeout(total=http_client.HTTP_TOTAL_TIMEOUT,
+                                        connect=http_client.HTTP_CONNECT_TIMEOUT)
+        return RewritingSession(connector=connector, timeout=timeout)
+
+    http_client._build_session = build_rewriting_session
+
+    original_request = requests.Session.request
+    stub_netloc = f"{stub.host}:{stub.port}"
+
+    def request(self, method, url, *args, **kwargs):
+        parts = urlsplit(url)
+        kwargs["headers"] = {**dict(kwargs.get("headers") or {}), "X-Upstream-Host": parts.hostname or ""}
+        return original_request(self, method, urlunsplit(("http", stub_netloc, parts.path, parts.query, "")),
+                                *args, **kwargs)
+
+    requests.Session.request = request
+
+class StubEmbeddings:
+    """Stand-in for ``genai.embed_content``: hashed bag-of-words vectors, so
+    texts sharing words are similar. Blocks the calling thread like the real client."""
+
+    def __init__(self, profile, dimension):
+        self.profile = profile
+        self.dimension = dimension
+        self._word_vectors = {}
+
+    def _word_vector(self, word):
+        vector = self._word_vectors.get(word)
+        if vector is None:
+            rng = np.random.default_rng(zlib.crc32(word.encode("utf-8")))
+            vector = self._word_vectors.setdefault(word, rng.standard_normal(self.dimension).astype(np.float32))
+        return vector
+
+    def _embed(self, text):
+        words = re.findall(r"\w+", str(text).lower()) or ["empty"]
+        vector = np.sum([self._word_vector(w) for w in words], axis=0)
+        return (vector / (np.linalg.norm(vector) or 1.0)).tolist()
+
+    def __call__(self, model=None, content=None, task_type=None, **kwargs):
+        time.sleep(self.profile.latency())
+        if self.profile.fails():
+            raise RuntimeError("stub gemini embedding error")
+        if isinstance(content, (list, tuple)):
+            return {"embedding": [self._embed(text) for text in content]}
+        return {"embedding": self._embed(content)}
+
+class SlowIndex:
+    """Wraps the in-process vector index with Pinecone-like blocking latency and errors."""
+
+    def __init__(self, index, profile):
+        self._index = index
+        self._profile = profile
+
+    def __getattr__(self, name):
+        attr = getattr(self._index, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            time.sleep(self._profile.latency())
+            if self._profile.fails():
+                raise RuntimeError(f"stub pinecone error in {name}")
+            return attr(*args, **kwargs)
+
+        return call
+
+def make_stub_chat_model(profile, answer_words=120, stream_chunks=12):
+    """A langchain chat model standing in for ChatGoogleGenerativeAI."""
+    from typing import Any, Optional
+    from langchain.chat_models.base import BaseChatModel
+    from langchain.schema import AIMessage, ChatGeneration, ChatResult
+    from langchain.schema.messages import AIMessageChunk
+    from langchain.schema.output import ChatGenerationChunk
+    from backend.app.tools.company_resolver import get_company_resolver
+
+    def reply(messages):
+        prompt = str(messages[-1].content)
+        match = re.search(r"Query:\s*(.*)", prompt)
+        query = match.group(1).strip() if match else ""
+        if "Classify the following query and extract" in prompt or "Extract the company name" in prompt:
+            listing = get_company_resolver().find_in_query(query, strict=False) or {}
+            if listing:
+                query_type = "COMPANY"
+            elif re.match(r"(hi|hello|hey)\b", query.lower()):
+                query_type = "GREETING"
+            else:
+                query_type = "GENERAL"
+            return json.dumps({"query_type": query_type, "company_name": listing.get("company_name"),
+                               "company_symbol": listing.get("company_symbol")})
+        if "Classify the following query into" in prompt:
+            return "COMPANY"
+        rng = _rng_for(prompt[-200:])
+        return " ".join(rng.choice(_WORDS) for _ in range(answer_words)) + "."
+
+    class StubChatModel(BaseChatModel):
+        model: str = "stub"
+        google_api_key: Optional[str] = None
+        temperature: float = 0.7
+        streaming: bool = False
+
+        @property
+        def _llm_type(self):
+            return "stub-gemini"
+
+        def _result(self, messages):
+            if profile.fails():
+                raise RuntimeError("stub gemini chat error")
+            return ChatResult(generations=[ChatGeneration(message=AIMessage(content=reply(messages)))])
+
+        def _generate(self, messages, stop=None, run_manager=None, **kwargs: Any):
+            time.sleep(profile.latency())
+            return self._result(messages)
+
+        async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs: Any):
+            await asyncio.sleep(profile.latency())
+            return self._result(messages)
+
+        async def _astream(self, messages, stop=None, run_manager=None, **kwargs: Any):
+            delay = profile.latency() / stream_chunks
+            if profile.fails():
+                raise RuntimeError("stub gemini chat error")
+            words = reply(messages).split(" ")
+            size = max(1, math.ceil(len(words) / stream_chunks))
+            for i in range(0, len(words), size):
+                await asyncio.sleep(delay)
+                yield ChatGenerationChunk(message=AIMessageChunk(content=" ".join(words[i:i + size]) + " "))
+
+    return StubChatModel
+
+def configure_environment(workdir, keep_rate_limits):
+    """Point every store at ``workdir`` and every upstream at the stand-ins. Runs before the app is imported."""
+    defaults = {
+        "GEMINI_API_KEY": "benchmark", "PINECONE_API_KEY": "benchmark", "NEWS_API_KEY": "benchmark",
+        "SERPER_API_KEY": "benchmark", "JINA_READER_API_KEY": "benchmark", "ALPHA_VANTAGE_API_KEY": "benchmark",
+        "MEDIAWIKI_API_ENDPOINT": MEDIAWIKI_URL,
+        "VECTOR_BACKEND": "local", "LOCAL_INDEX_STORAGE": "memory",
+        "LOCAL_INDEX_DIR": str(workdir / "vector_index"),
+        "EMBEDDING_CACHE_PATH": str(workdir / "embedding_cache.sqlite3"),
+        "INGEST_JOB_DB": str(workdir / "ingest_jobs.sqlite3"),
+        "CHUNK_MANIFEST_DB": str(workdir / "chunk_manifest.sqlite3"),
+        "CHAT_DB": str(workdir / "chats.sqlite3"),
+        "BM25_INDEX_DB": str(workdir / "bm25_index.sqlite3"),
+    }
+    if not keep_rate_limits:
+        for name in ("GEMINI", "ALPHA_VANTAGE", "NEWSAPI", "SERPER", "JINA", "MEDIAWIKI"):
+            defaults[f"{name}_RATE_PER_SEC"] = "100000"
+            defaults[f"{name}_BURST"] = "100000"
+    # Both the stand-ins and the stores are forced; tuning knobs stay overridable
+    forced = {k for k in defaults if k.endswith(("_API_KEY", "_DB", "_PATH", "_DIR")) or k in
+              ("MEDIAWIKI_API_ENDPOINT", "VECTOR_BACKEND", "LOCAL_INDEX_STORAGE")}
+    for key, value in defaults.items():
+        if key in forced:
+            os.environ[key] = value
+        else:
+            os.environ.setdefault(key, value)
+
+def install_stubs(profiles, stub_base_url, answer_words):
+    """Patch the app's upstream clients. Must run before ``backend.app.main`` is imported."""
+    import google.generativeai as genai
+    from backend.app.config import EMBEDDING_DIMENSION
+    from backend.app.memory import local_index
+    from backend.app.agent import llm_registry
+
+    install_http_rewrites(stub_base_url)
+    genai.embed_content = StubEmbeddings(profiles["gemini_embed"], EMBEDDING_DIMENSION)
+
+    get_local_index = local_index.get_local_index
+    slow_index = {}
+
+    def get_slow_index():
+        if "index" not in slow_index:
+            slow_index["index"] = SlowIndex(get_local_index(), profiles["pinecone"])
+        return slow_index["index"]
+
+    local_index.get_local_index = get_slow_index
+    llm_registry.ChatGoogleGenerativeAI = make_stub_chat_model(profiles["gemini_chat"], answer_words)
+
+class AppServer:
+    """The FastAPI app under uvicorn in its own thread, with an event-loop lag probe."""
+
+    def __init__(self, app, lag_interval=0.01):
+        import uvicorn
+
+        self.port = _free_port()
+        self.base_url = f"http://127.0.0.1:{self.port}"
+        self.lag_samples = []
+        self._lag_interval = lag_interval
+        self._probe = None
+        app.router.add_event_handler("startup", self._start_probe)
+        app.router.add_event_handler("shutdown", self._stop_probe)
+        config = uvicorn.Config(app, host="127.0.0.1", port=self.port, log_level="warning",
+                                access_log=False, lifespan="on")
+        self.server = uvicorn.Server(config)
+        self._thread = threading.Thread(target=self.server.run, name="app-server", daemon=True)
+
+    async def _probe_lag(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self._lag_interval)
+            self.lag_samples.append((time.monotonic(), max(0.0, loop.time() - start - self._lag_interval)))
+
+    async def _start_probe(self):
+        self._probe = asyncio.ensure_future(self._probe_lag())
+
+    async def _stop_probe(self):
+        if self._probe is not None:
+            self._probe.cancel()
+
+    def lag_between(self, start, end):
+        return [lag for at, lag in list(self.lag_samples) if start <= at <= end]
+
+    def start(self, timeout=60):
+        self._thread.start()
+        deadline = time.monotonic() + timeout
+        while not self.server.started:
+            if not self._thread.is_alive() or time.monotonic() > deadline:
+                raise RuntimeError("App server failed to start")
+            time.sleep(0.05)
+        return self
+
+    def stop(self):
+        self.server.should_exit = True
+        self._thread.join(30)
+
+# -- Load generation -----------------------------------------------------------
+
+class Recorder:
+    """Per-endpoint request latencies for one phase."""
+
+    def __init__(self):
+        self.samples = []
+
+    async def request(self, session, endpoint, method, url, **kwargs):
+        start = time.perf_counter()
+        try:
+            async with session.request(method, url, **kwargs) as response:
+                body = await response.read()
+                status = response.status
+        except Exception as e:
+            self.samples.append((endpoint, time.perf_counter() - start, False))
+            logger.debug(f"{endpoint} failed: {e}")
+            return None, None
+        self.samples.append((endpoint, time.perf_counter() - start, status < 400))
+        try:
+            return status, json.loads(body) if body else None
+        except ValueError:
+            return status, None
+
+class Workload:
+    """Builds one operation (one or more requests) per call for each scenario."""
+
+    def __init__(self, base_url, companies, use_answer_cache, seed):
+        self.base_url = base_url
+        self.companies = companies
+        self.use_answer_cache = use_answer_cache
+        self.rng = random.Random(seed)
+        self.job_ids = []
+
+    def company(self):
+        return self.rng.choice(self.companies)
+
+    async def chat(self, session, recorder):
+        company = self.company()
+        templates = (
+            "What is {name}'s revenue growth?", "Who is the CEO of {name}?", "Tell me about {name} stock",
+            "What products does {name} sell?", "How is {name} doing this quarter?", "{symbol} earnings outlook"
+        )
+        if self.rng.random() < 0.1:
+            query = "hello there"
+        else:
+            query = self.rng.choice(templates).format(name=company["company_name"], symbol=company["company_symbol"])
+        await recorder.request(session, "POST /api/chat/", "POST", f"{self.base_url}/api/chat/",
+                               json={"query": query, "user_id": "benchmark",
+                                     "bypass_cache": not self.use_answer_cache})
+
+    async def ingest(self, session, recorder):
+        company = self.company()
+        status, body = await recorder.request(
+            session, "POST /api/ingest-company/", "POST", f"{self.base_url}/api/ingest-company/",
+            json={"company_name": company["company_name"], "company_symbol": company["company_symbol"]}
+        )
+        if status == 202 and body:
+            self.job_ids.append(body["job_id"])
+
+    async def compare(self, session, recorder):
+        symbols = ",".join(c["company_symbol"] for c in self.rng.sample(self.companies, self.rng.randint(2, 4)))
+        await recorder.request(session, "GET /api/compare-stocks/", "GET",
+                               f"{self.base_url}/api/compare-stocks/", params={"symbols": symbols})
+
+    async def chat_history(self, session, recorder):
+        chat_id = f"bench-{self.rng.getrandbits(64):x}"
+        url = f"{self.base_url}/api/chats/{chat_id}"
+        now = datetime.now().isoformat()
+        await recorder.request(session, "PUT /api/chats/{id}", "PUT", url, json={
+            "id": chat_id, "title": "Benchmark", "createdAt": now, "updatedAt": now,
+            "messages": [{"role": "user", "content": "hello"}]
+        })
+        for role in ("user", "assistant"):
+            await recorder.request(session, "POST /api/chats/{id}/messages", "POST", f"{url}/messages",
+                                   json={"message": {"role": role, "content": _paragraph(chat_id, role, sentences=2)}})
+        await recorder.request(session, "GET /api/chats/", "GET", f"{self.base_url}/api/chats/",
+                               params={"limit": "20", "summary": "true"})
+        await recorder.request(session, "GET /api/chats/{id}", "GET", url)
+
+async def drain_jobs(session, base_url, job_ids, timeout):
+    """Wait for ingestion jobs to finish; returns their records (None for those still pending)."""
+    deadline = time.monotonic() + timeout
+    jobs = {}
+    pending = list(job_ids)
+    while pending and time.monotonic() < deadline:
+        still_pending = []
+        for job_id in pending:
+            async with session.get(f"{base_url}/api/ingest-jobs/{job_id}") as response:
+                job = await response.json() if response.status == 200 else None
+            if job and job["status"] in ("succeeded", "failed", "cancelled"):
+                jobs[job_id] = job
+            else:
+                still_pending.append(job_id)
+        pending = still_pending
+        if pending:
+            await asyncio.sleep(0.25)
+    return [jobs.get(job_id) for job_id in job_ids]
+
+def summarize_jobs(jobs):
+    def seconds(job, start, end):
+        if job.get(start) and job.get(end):
+            return (datetime.fromisoformat(job[end]) - datetime.fromisoformat(job[start])).total_seconds()
+        return None
+
+    finished = [job for job in jobs if job]
+    return {
+        "submitted": len(jobs),
+        "succeeded": sum(1 for job in finished if job["status"] == "succeeded"),
+        "failed": sum(1 for job in finished if job["status"] != "succeeded"),
+        "unfinished": len(jobs) - len(finished),
+        "queue_wait_ms": summarize_ms([s for s in (seconds(j, "created_at", "started_at") for j in finished) if s is not None]),
+        "run_ms": summarize_ms([s for s in (seconds(j, "started_at", "finished_at") for j in finished) if s is not None]),
+    }
+
+async def run_phase(session, server, workload, scenario, concurrency, operations, warmup, drain_timeout):
+    step = getattr(workload, scenario)
+    if warmup:
+        warm = Recorder()
+        await asyncio.gather(*(step(session, warm) for _ in range(warmup)))
+    workload.job_ids = []
+
+    recorder = Recorder()
+    counter = itertools.count()
+
+    async def worker():
+        while next(counter) < operations:
+            await step(session, recorder)
+
+    started_at = time.monotonic()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    finished_at = time.monotonic()
+    elapsed = finished_at - started_at
+
+    by_endpoint = {}
+    for endpoint, latency, ok in recorder.samples:
+        by_endpoint.setdefault(endpoint, []).append((latency, ok))
+    result = {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "operations": operations,
+        "requests": len(recorder.samples),
+        "errors": sum(1 for _, _, ok in recorder.samples if not ok),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(recorder.samples) / elapsed, 2) if elapsed else None,
+        "latency_ms": summarize_ms([latency for _, latency, _ in recorder.samples]),
+        "endpoints": {
+            endpoint: {**summarize_ms([l for l, _ in samples]), "errors": sum(1 for _, ok in samples if not ok)}
+            for endpoint, samples in sorted(by_endpoint.items())
+        },
+        "event_loop_lag_ms": summarize_ms(server.lag_between(started_at, finished_at)),
+    }
+    if scenario == "ingest":
+        jobs = await drain_jobs(session, server.base_url, workload.job_ids, drain_timeout)
+        result["jobs"] = summarize_jobs(jobs)
+        result["jobs"]["event_loop_lag_ms"] = summarize_ms(server.lag_between(finished_at, time.monotonic()))
+    return result
+
+async def run_benchmark(server, args, companies):
+    workload = Workload(server.base_url, companies, args.answer_cache, args.seed)
+    connector = aiohttp.TCPConnector(limit=0)
+    timeout = aiohttp.ClientTimeout(total=args.request_timeout)
+    results = []
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        for scenario in args.scenarios:
+            for concurrency in args.concurrency:
+                logger.info(f"Running {scenario} at concurrency {concurrency}")
+                result = await run_phase(session, server, workload, scenario, concurrency,
+                                         args.operations, args.warmup, args.drain_timeout)
+                latency, lag = result["latency_ms"], result["event_loop_lag_ms"]
+                logger.info(
+                    f"  {result['requests']} requests, {result['errors']} errors, "
+                    f"p50={latency.get('p50')}ms p95={latency.get('p95')}ms p99={latency.get('p99')}ms, "
+                    f"{result['throughput_rps']} req/s, loop lag p99={lag.get('p99')}ms max={lag.get('max')}ms"
+                )
+                results.append(result)
+    return results
+
+# -- Reporting -----------------------------------------------------------------
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              cwd=Path(__file__).resolve().parent, timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+def compare_results(baseline, current, threshold):
+    """Print p95 latency and p99 loop lag changes against a baseline run; returns the regressions."""
+    previous = {(r["scenario"], r["concurrency"]): r for r in baseline.get("results", [])}
+    regressions = []
+    print(f"{'scenario':<14}{'conc':>6}{'p95 ms':>12}{'change':>9}{'lag p99 ms':>13}{'change':>9}")
+    for result in current["results"]:
+        key = (result["scenario"], result["concurrency"])
+        before = previous.get(key)
+        if before is None:
+            continue
+        row = []
+        for metric, stat in (("latency_ms", "p95"), ("event_loop_lag_ms", "p99")):
+            old, new = before[metric].get(stat), result[metric].get(stat)
+            change = (new - old) / old if old and new is not None else None
+            row.append((new, change))
+            # Sub-millisecond lag is noise, not a regression
+            if change is not None and change > threshold and (metric == "latency_ms" or new > 1.0):
+                regressions.append({"scenario": key[0], "concurrency": key[1], "metric": f"{metric}.{stat}",
+                                    "baseline": old, "current": new, "change": round(change, 4)})
+        (p95, p95_change), (lag, lag_change) = row
+        fmt = lambda c: f"{c:+.1%}" if c is not None else "n/a"
+        print(f"{key[0]:<14}{key[1]:>6}{p95 or 0:>12.1f}{fmt(p95_change):>9}{lag or 0:>13.2f}{fmt(lag_change):>9}")
+    return regressions
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        help=f"Comma-separated subset of: {', '.join(SCENARIOS)}")
+    parser.add_argument("--concurrency", default="1,8,32", help="Comma-separated concurrency levels")
+    parser.add_argument("--operations", type=int, default=100, help="Operations per scenario and concurrency level")
+    parser.add_argument("--warmup", type=int, default=5, help="Unrecorded operations before each phase")
+    parser.add_argument("--profile", type=Path, help="JSON file of per-upstream latency/error overrides")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="Multiply every upstream latency")
+    parser.add_argument("--answer-words", type=int, default=120, help="Words in each stub chat answer")
+    parser.add_argument("--answer-cache", action="store_true", help="Let chat requests use the answer cache")
+    parser.add_argument("--keep-rate-limits", action="store_true", help="Keep the client-side upstream rate limits")
+    parser.add_argument("--request-timeout", type=float, default=120.0)
+    parser.add_argument("--drain-timeout", type=float, default=120.0, help="Seconds to wait for ingestion jobs")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--workdir", type=Path, help="Directory for the app's databases (default: a temp dir)")
+    parser.add_argument("--output", type=Path, default=Path("benchmark_results.json"))
+    parser.add_argument("--baseline", type=Path, help="Earlier results JSON to compare against")
+    parser.add_argument("--regression-threshold", type=float, default=0.2,
+                        help="Relative increase that counts as a regression (default 0.2 = 20%%)")
+    args = parser.parse_args(argv)
+    args.scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+    args.concurrency = [int(c) for c in args.concurrency.split(",") if c.strip()]
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    # The app logs every upstream call; keep the benchmark's own output readable
+    logging.getLogger("backend").setLevel(logging.WARNING)
+
+    workdir = args.workdir or Path(tempfile.mkdtemp(prefix="benchmark-"))
+    workdir.mkdir(parents=True, exist_ok=True)
+    overrides = json.loads(args.profile.read_text()) if args.profile else {}
+    profiles = build_profiles(overrides, args.latency_scale, args.seed)
+
+    configure_environment(workdir, args.keep_rate_limits)
+    stub_server = StubUpstreamServer(profiles).start()
+    app_server = None
+    try:
+        install_stubs(profiles, stub_server.base_url, args.answer_words)
+        from backend.app import main as app_main
+        from backend.app.tools.company_resolver import get_company_resolver
+
+        # Don't import (and rename) real legacy chat files into the benchmark database
+        app_main.chat_store.migrate_json_chats = lambda *a, **k: 0
+        companies = get_company_resolver().listings or [{"company_name": "Acme Corp", "company_symbol": "ACME"}]
+
+        app_server = AppServer(app_main.app).start()
+        started_at = datetime.now().isoformat()
+        results = asyncio.run(run_benchmark(app_server, args, companies))
+    finally:
+        if app_server is not None:
+            app_server.stop()
+        stub_server.stop()
+        if args.workdir is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "started_at": started_at,
+            "finished_at": datetime.now().isoformat(),
+            "git_commit": _git_commit(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "args": {k: str(v) if isinstance(v, Path) else v for k, v in vars(args).items()},
+            "profiles": {name: {**DEFAULT_PROFILES[name], **overrides.get(name, {})} for name in DEFAULT_PROFILES},
+            "upstream_calls": {name: profile.to_dict() for name, profile in profiles.items()},
+        },
+        "results": results,
+    }
+    args.output.write_text(json.dumps(report, indent=2))
+    logger.info(f"Wrote results to {args.output}")
+
+    if args.baseline:
+        regressions = compare_results(json.loads(args.baseline.read_text()), report, args.regression_threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) over {args.regression_threshold:.0%}:")
+            for regression in regressions:
+                print(f"  {regression['scenario']} @ {regression['concurrency']}: {regression['metric']} "
+                      f"{regression['baseline']} -> {regression['current']} ({regression['change']:+.1%})")
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,7 +8,7 @@ from pathlib import Path
 # Add the parent directory to the path so we can import our modules
 sys.path.append(str(Path(__file__).parent.parent.parent))
 
-from app.embeddings import generate_embedding
+from app.embeddings import batch_generate_embeddings
 from app.memory import initialize_pinecone, store_memory
 
 async def populate_pinecone_with_company_data():
@@ -86,10 +86,11 @@ async def populate_pinecone_with_company_data():
                 people_info += f"- {person}\n"
             chunks.append(people_info)
         
+        # Generate embeddings for all chunks in one batch
+        embeddings = await batch_generate_embeddings(chunks, task_type="retrieval_document")
+        
         # Process each chunk
-        for i, chunk in enumerate(chunks):
-            # Generate embedding
-            embedding = await generate_embedding(chunk)
+        for i, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
             if embedding:
                 # Store in Pinecone
                 metadata = {
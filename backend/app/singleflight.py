@@ -0,0 +1,86 @@
+# backend/app/singleflight.py
+import asyncio
+import functools
+import logging
+
+logger = logging.getLogger(__name__)
+
+class _Flight:
+    """One in-flight call and the number of callers waiting on it."""
+
+    def __init__(self, future):
+        self.future = future
+        self.waiters = 0
+        self.abandoned = False
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key into one in-flight call.
+
+    The first caller for a key starts the work. Callers arriving before it
+    finishes await the same future and get the same result or exception.
+    The future is shielded, so one caller being cancelled does not cancel
+    the work for the rest; once the last waiting caller is cancelled,
+    nobody wants the result and the work itself is cancelled.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.shared = 0
+        self._inflight = {}
+
+    async def do(self, key, func, *args, **kwargs):
+        flight = self._inflight.get(key)
+        if flight is None or flight.abandoned:
+            self.calls += 1
+            flight = _Flight(asyncio.ensure_future(func(*args, **kwargs)))
+            self._inflight[key] = flight
+            flight.future.add_done_callback(lambda _: self._forget(key, flight))
+        else:
+            self.shared += 1
+            logger.info(f"Joining in-flight {self.name} call for {key}")
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.future)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.future.done():
+                # Only reachable when the last waiter was cancelled
+                flight.abandoned = True
+                flight.future.cancel()
+                logger.info(f"Cancelled abandoned {self.name} call for {key}")
+
+    def _forget(self, key, flight):
+        if self._inflight.get(key) is flight:
+            del self._inflight[key]
+
+    def stats(self):
+        return {"calls": self.calls, "shared": self.shared, "in_flight": len(self._inflight)}
+
+_groups = {}
+
+def get_group(name):
+    """Return the named single-flight group, creating it on first use."""
+    group = _groups.get(name)
+    if group is None:
+        group = _groups[name] = SingleFlight(name)
+    return group
+
+def singleflight_stats():
+    """Calls started, calls that joined an in-flight one, and current in-flight count per group."""
+    return {name: group.stats() for name, group in _groups.items()}
+
+def coalesce(name, key):
+    """Decorator: concurrent calls whose ``key(*args, **kwargs)`` match share one execution."""
+    def decorator(func):
+        group = get_group(name)
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            return await group.do(key(*args, **kwargs), func, *args, **kwargs)
+        return wrapper
+    return decorator
+
+def normalize_name(name):
+    """Case- and whitespace-insensitive form of a company name for use in keys."""
+    return " ".join(str(name or "").lower().split())
@@ -0,0 +1,254 @@
+# backend/app/tools/company_resolver.py
+import bisect
+import csv
+import logging
+import re
+from collections import defaultdict
+from difflib import SequenceMatcher
+from backend.app.config import COMPANY_LISTINGS_PATH, RESOLVER_FUZZY_THRESHOLD
+
+logger = logging.getLogger(__name__)
+
+_POSSESSIVE_RE = re.compile(r"['’]s\b")
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+_WORD_RE = re.compile(r"[A-Za-z0-9][A-Za-z0-9&.'’\-]*")
+
+# Words dropped from the end (or start) of a company name before matching
+_SUFFIXES = {
+    "inc", "incorporated", "corp", "corporation", "co", "company", "companies", "ltd", "limited",
+    "plc", "llc", "lp", "sa", "se", "nv", "ag", "group", "holding", "holdings", "com", "class", "a", "b",
+    "and"
+}
+_PREFIXES = {"the"}
+
+# All-caps words that look like tickers but almost never are in a question
+_NOT_TICKERS = {
+    "AI", "API", "CEO", "CFO", "COO", "CTO", "EPS", "ETF", "EU", "GDP", "HR", "I", "IPO", "IT", "OK",
+    "PE", "PR", "Q1", "Q2", "Q3", "Q4", "ROI", "TV", "UK", "US", "USA", "USD", "YOY", "YTD"
+}
+
+# One-word company names that are also everyday words ("the Visa process",
+# "ask the Oracle"); in a query these only count next to a company cue
+_COMMON_WORD_NAMES = {
+    "amazon", "apple", "block", "chase", "coke", "eternal", "ford", "intel", "lilly", "meta", "oracle",
+    "reliance", "shell", "snowflake", "square", "target", "visa", "zoom"
+}
+
+# Words suggesting a query is about a company, for names that are also everyday words
+_COMPANY_CUES = {
+    "stock", "stocks", "share", "shares", "price", "revenue", "revenues", "earnings", "profit", "profits",
+    "company", "ceo", "cfo", "market", "cap", "valuation", "dividend", "dividends", "ipo", "financials",
+    "financial", "quarter", "quarterly", "annual", "results", "guidance", "competitors", "news", "invest",
+    "investing", "acquisition", "merger", "founded", "headquarters", "employees", "business", "sales"
+}
+
+def normalize_company(text):
+    """Match key for a company name or alias: lower-case, no punctuation, no corporate suffixes."""
+    text = _POSSESSIVE_RE.sub("", str(text).lower()).replace("&", " and ")
+    words = _NON_ALNUM_RE.sub(" ", text).split()
+    while len(words) > 1 and words[-1] in _SUFFIXES:
+        words.pop()
+    while len(words) > 1 and words[0] in _PREFIXES:
+        words.pop(0)
+    return " ".join(words)
+
+def _trigrams(key):
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class CompanyResolver:
+    """Offline lookup from company names, aliases and tickers to listings.
+
+    Names and aliases are held in an exact-match dict, a sorted key list for
+    prefix search, and a trigram index that narrows fuzzy matching to a few
+    candidates. Exact and prefix lookups take microseconds.
+    """
+
+    def __init__(self, listings=()):
+        self.listings = []
+        self._by_key = {}
+        self._by_symbol = {}
+        self._trigram_index = defaultdict(set)
+        self._sorted_keys = []
+        self.max_words = 1
+        for listing in listings:
+            self.add(listing["symbol"], listing["name"], listing.get("exchange", ""), listing.get("aliases", ()))
+        self._sorted_keys = sorted(self._by_key)
+
+    @classmethod
+    def from_csv(cls, path=COMPANY_LISTINGS_PATH):
+        """Load listings from our CSV format (symbol,name,exchange,aliases) or an
+        Alpha Vantage LISTING_STATUS export (non-stock and delisted rows are skipped)."""
+        listings = []
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                if row.get("assetType") and row["assetType"] != "Stock":
+                    continue
+                if row.get("status") and row["status"] != "Active":
+                    continue
+                if not row.get("symbol") or not row.get("name"):
+                    continue
+                listings.append({
+                    "symbol": row["symbol"].strip(),
+                    "name": row["name"].strip(),
+                    "exchange": (row.get("exchange") or "").strip(),
+                    "aliases": [a.strip() for a in (row.get("aliases") or "").split("|") if a.strip()]
+                })
+        resolver = cls(listings)
+        logger.info(f"Loaded {len(resolver.listings)} company listings from {path}")
+        return resolver
+
+    def add(self, symbol, name, exchange="", aliases=()):
+        listing = {"company_name": name, "company_symbol": symbol, "exchange": exchange}
+        self.listings.append(listing)
+        self._by_symbol.setdefault(symbol.upper(), listing)
+        for alias in (name, *aliases):
+            key = normalize_company(alias)
+            # The first listing to claim a name keeps it
+            if not key or key in self._by_key:
+                continue
+            self._by_key[key] = listing
+            self.max_words = max(self.max_words, len(key.split()))
+            for trigram in _trigrams(key):
+                self._trigram_index[trigram].add(key)
+
+    def _result(self, listing, method, score=1.0):
+        return {**listing, "method": method, "score": round(score, 3)}
+
+    def by_symbol(self, symbol):
+        """Listing for an exact ticker, or None."""
+        listing = self._by_symbol.get(str(symbol).strip().upper())
+        return self._result(listing, "symbol") if listing else None
+
+    def complete(self, prefix, limit=10):
+        """Listings whose name or alias starts with ``prefix``, in key order."""
+        prefix = normalize_company(prefix)
+        if not prefix:
+            return []
+        results, seen = [], set()
+        start = bisect.bisect_left(self._sorted_keys, prefix)
+        for key in self._sorted_keys[start:]:
+            if not key.startswith(prefix) or len(results) >= limit:
+                break
+            listing = self._by_key[key]
+            if listing["company_symbol"] not in seen:
+                seen.add(listing["company_symbol"])
+                results.append(self._result(listing, "prefix"))
+        return results
+
+    def fuzzy(self, text, threshold=RESOLVER_FUZZY_THRESHOLD, candidates=25):
+        """Closest listing by string similarity, or None below ``threshold``."""
+        key = normalize_company(text)
+        if not key:
+            return None
+        shared = defaultdict(int)
+        for trigram in _trigrams(key):
+            for candidate in self._trigram_index.get(trigram, ()):
+                shared[candidate] += 1
+        best, best_score = None, 0.0
+        for candidate in sorted(shared, key=shared.get, reverse=True)[:candidates]:
+            score = SequenceMatcher(None, key, candidate).ratio()
+            if score > best_score:
+                best, best_score = candidate, score
+        if best is None or best_score < threshold:
+            return None
+        return self._result(self._by_key[best], "fuzzy", best_score)
+
+    def resolve(self, text):
+        """Resolve a company name, alias or ticker to its listing, or None.
+
+        Only an exact name/alias match or an exact ticker counts. Prefix and
+        fuzzy matches ("Wells", "Amazonia") are too often a different company
+        to be trusted without confirmation; use ``suggest`` for those.
+        """
+        if not text or not str(text).strip():
+            return None
+        listing = self._by_key.get(normalize_company(text))
+        if listing:
+            return self._result(listing, "exact")
+        return self.by_symbol(text)
+
+    def suggest(self, text, limit=5):
+        """Listings a partial or misspelt name might mean: prefix matches, then the closest fuzzy match."""
+        suggestions = self.complete(text, limit=limit)
+        match = self.fuzzy(text)
+        if match and all(s["company_symbol"] != match["company_symbol"] for s in suggestions):
+            suggestions.append(match)
+        return suggestions[:limit]
+
+    def find_in_query(self, query, strict=True):
+        """Find the company a free-text question is about.
+
+        Scans the query's word n-grams, longest first, for exact name/alias
+        matches, and its all-caps words for tickers. Returns the listing when
+        exactly one company is found, or None when there is none or several
+        (those are left to the LLM). With ``strict``, a name match must be
+        capitalized in the query, and a bare one-word name needs a company
+        cue such as "stock" or "revenue" if it is at the very start or is
+        also an everyday word ("Visa", "Oracle") anywhere in the query.
+        """
+        words = _WORD_RE.findall(query)
+        if not words:
+            return None
+        lowered = {normalize_company(w) for w in words}
+        has_cue = bool(lowered & _COMPANY_CUES)
+        all_caps = all(w.isupper() for w in words if w.isalpha())
+
+        found = {}
+        i = 0
+        while i < len(words):
+            for n in range(min(self.max_words, len(words) - i), 0, -1):
+                span = words[i:i + n]
+                key = normalize_company(" ".join(span))
+                listing = self._by_key.get(key)
+                if listing is None:
+                    continue
+                if strict and not (span[0][0].isupper() or span[0][0].isdigit()):
+                    continue
+                if strict and " " not in key and not has_cue and len(words) > 1:
+                    if key in _COMMON_WORD_NAMES or (n == 1 and i == 0 and not all_caps):
+                        continue
+                found.setdefault(listing["company_symbol"], self._result(listing, "query"))
+                i += n - 1
+                break
+            else:
+                word = words[i].strip(".'’")
+                if not all_caps and word.isupper() and len(word) >= 2 and word not in _NOT_TICKERS:
+                    listing = self._by_symbol.get(word)
+                    if listing:
+                        found.setdefault(listing["company_symbol"], self._result(listing, "query_symbol"))
+            i += 1
+
+        if len(found) == 1:
+            return next(iter(found.values()))
+        return None
+
+_resolver = None
+
+def get_company_resolver():
+    """Return the process-wide resolver, loading the listings file on first use."""
+    global _resolver
+    if _resolver is None:
+        try:
+            _resolver = CompanyResolver.from_csv()
+        except Exception as e:
+            logger.error(f"Error loading company listings: {str(e)}")
+            _resolver = CompanyResolver()
+    return _resolver
+
+def canonical_company(company_name, company_symbol=None):
+    """The ``(company_name, company_symbol)`` to store and search a company under.
+
+    Known companies get their listing name, found by exact name/alias or
+    else by ticker, so "Apple" typed into ingestion and "Apple Inc." from
+    the chat router end up as the same company. Unknown names are returned
+    unchanged. A given symbol is kept; a missing one is filled in from the
+    listing.
+    """
+    resolver = get_company_resolver()
+    listing = resolver.resolve(company_name) if company_name else None
+    if listing is None and company_symbol:
+        listing = resolver.by_symbol(company_symbol)
+    if listing is None:
+        return company_name, company_symbol
+    return listing["company_name"], company_symbol or listing["company_symbol"]
@@ -2,15 +2,31 @@
 # Let's enhance the company_tools.py file to use all available APIs
 
 import requests
+import asyncio
 import logging
 import json
+import time
 from backend.app.config import (
     ALPHA_VANTAGE_API_KEY,
     NEWS_API_KEY,
     SERPER_API_KEY,
     JINA_READER_API_KEY,
-    MEDIAWIKI_API_ENDPOINT
+    MEDIAWIKI_API_ENDPOINT,
+    SOURCE_TIMEOUTS,
+    QUOTE_CACHE_TTL,
+    QUOTE_CACHE_STALE,
+    OVERVIEW_CACHE_TTL,
+    OVERVIEW_CACHE_STALE,
+    FINANCIALS_CACHE_TTL,
+    FINANCIALS_CACHE_STALE,
+    SYMBOL_CACHE_TTL
 )
+from backend.app.tools.market_cache import cached
+from backend.app.tools.company_resolver import get_company_resolver
+from backend.app.singleflight import coalesce, normalize_name
+from backend.app.http_client import get_http_session
+from backend.app.rate_limit import acquire, raise_for_rate_limit, retry_async, RateLimitError
+from backend.app.metrics import EXTERNAL_TOOL_SECONDS, UPSTREAM_RATE_LIMITED
 
 logger = logging.getLogger(__name__)
 
@@ -186,20 +202,295 @@ def extract_info_from_url(url):
         logger.error(f"Error in extract_info_from_url: {str(e)}")
         return {"error": f"Error extracting information from URL: {str(e)}"}
 
-async def search_company_symbol(company_name):
-    """Search for a company's stock symbol."""
+# Async versions of the tools above. They share the pooled HTTP session so the
+# agent can fan out to every source at once without blocking the event loop.
+
+def _symbol_key(symbol):
+    return (symbol.strip().upper(),)
+
+def _name_key(company_name):
+    return (normalize_name(company_name),)
+
+async def _request_json(method, upstream, url, **kwargs):
+    """Send one throttled request on the shared session and decode the JSON body."""
+    await acquire(upstream)
+    session = get_http_session()
+    async with session.request(method, url, **kwargs) as response:
+        raise_for_rate_limit(upstream, response)
+        data = await response.json(content_type=None)
+    # Alpha Vantage reports throttling as a 200 with a "Note"/"Information" message
+    if upstream == "alpha_vantage" and isinstance(data, dict):
+        notice = str(data.get("Note") or data.get("Information") or "")
+        if "call frequency" in notice or "rate limit" in notice.lower():
+            UPSTREAM_RATE_LIMITED.inc(upstream=upstream)
+            raise RateLimitError(upstream, message=notice)
+    return data
+
+async def _get_json(url, upstream, params=None):
+    """GET a URL and decode the JSON body, retrying when rate limited."""
+    return await retry_async(_request_json, "GET", upstream, url, params=params)
+
+async def _post_json(url, upstream, headers=None, payload=None):
+    """POST a JSON payload and decode the JSON body, retrying when rate limited."""
+    return await retry_async(_request_json, "POST", upstream, url, headers=headers, json=payload)
+
+@cached("quote", QUOTE_CACHE_TTL, QUOTE_CACHE_STALE, key=_symbol_key)
+@coalesce("quote", key=_symbol_key)
+async def get_stock_price_async(symbol):
+    """Get the latest stock price for a company symbol."""
+    try:
+        url = f"https://www.alphavantage.co/query?function=GLOBAL_QUOTE&symbol={symbol}&apikey={ALPHA_VANTAGE_API_KEY}"
+        data = await _get_json(url, "alpha_vantage")
+        
+        if "Global Quote" in data and data["Global Quote"]:
+            quote = data["Global Quote"]
+            return {
+                "symbol": quote.get("01. symbol", symbol),
+                "price": quote.get("05. price", "N/A"),
+                "change": quote.get("09. change", "N/A"),
+                "change_percent": quote.get("10. change percent", "N/A"),
+                "volume": quote.get("06. volume", "N/A"),
+                "latest_trading_day": quote.get("07. latest trading day", "N/A")
+            }
+        else:
+            logger.error(f"Error getting stock price for {symbol}: {data}")
+            return {"error": f"Could not retrieve stock price for {symbol}"}
+    except Exception as e:
+        logger.error(f"Error in get_stock_price_async: {str(e)}")
+        return {"error": f"Error retrieving stock price: {str(e)}"}
+
+@cached("overview", OVERVIEW_CACHE_TTL, OVERVIEW_CACHE_STALE, key=_symbol_key)
+@coalesce("overview", key=_symbol_key)
+async def get_company_overview_async(symbol):
+    """Get company overview information from Alpha Vantage."""
+    try:
+        url = f"https://www.alphavantage.co/query?function=OVERVIEW&symbol={symbol}&apikey={ALPHA_VANTAGE_API_KEY}"
+        data = await _get_json(url, "alpha_vantage")
+        
+        if "Symbol" in data:
+            return data
+        else:
+            logger.error(f"Error getting company overview for {symbol}: {data}")
+            return {"error": f"Could not retrieve company overview for {symbol}"}
+    except Exception as e:
+        logger.error(f"Error in get_company_overview_async: {str(e)}")
+        return {"error": f"Error retrieving company overview: {str(e)}"}
+
+@cached("financials", FINANCIALS_CACHE_TTL, FINANCIALS_CACHE_STALE, key=_symbol_key)
+@coalesce("financials", key=_symbol_key)
+async def get_company_financials_async(symbol):
+    """Get company financial data from Alpha Vantage."""
+    try:
+        url = f"https://www.alphavantage.co/query?function=INCOME_STATEMENT&symbol={symbol}&apikey={ALPHA_VANTAGE_API_KEY}"
+        data = await _get_json(url, "alpha_vantage")
+        
+        if "annualReports" in data:
+            return {
+                "income_statement": data["annualReports"][0] if data["annualReports"] else {}
+            }
+        else:
+            logger.error(f"Error getting financials for {symbol}: {data}")
+            return {"error": f"Could not retrieve financial data for {symbol}"}
+    except Exception as e:
+        logger.error(f"Error in get_company_financials_async: {str(e)}")
+        return {"error": f"Error retrieving financial data: {str(e)}"}
+
+async def compare_stocks_async(symbols):
+    """Compare stock prices for multiple companies, fetching quotes concurrently."""
+    quotes = await asyncio.gather(*(get_stock_price_async(symbol) for symbol in symbols))
+    return dict(zip(symbols, quotes))
+
+async def get_company_news_async(company_name):
+    """Get recent news about a company using News API."""
+    try:
+        url = f"https://newsapi.org/v2/everything?q={company_name}&sortBy=publishedAt&apiKey={NEWS_API_KEY}&pageSize=5"
+        data = await _get_json(url, "newsapi")
+        
+        if data.get("status") == "ok" and data.get("articles"):
+            return data.get("articles")
+        else:
+            logger.error(f"Error getting news for {company_name}: {data}")
+            return {"error": f"Could not retrieve news for {company_name}"}
+    except Exception as e:
+        logger.error(f"Error in get_company_news_async: {str(e)}")
+        return {"error": f"Error retrieving company news: {str(e)}"}
+
+async def search_company_info_async(company_name):
+    """Search for company information using Serper API."""
+    try:
+        headers = {
+            'X-API-KEY': SERPER_API_KEY,
+            'Content-Type': 'application/json'
+        }
+        payload = {
+            "q": f"{company_name} company information",
+            "num": 5
+        }
+        data = await _post_json('https://google.serper.dev/search', "serper", headers=headers, payload=payload)
+        
+        if "organic" in data:
+            return data["organic"]
+        else:
+            logger.error(f"Error searching for {company_name}: {data}")
+            return {"error": f"Could not find information for {company_name}"}
+    except Exception as e:
+        logger.error(f"Error in search_company_info_async: {str(e)}")
+        return {"error": f"Error searching company information: {str(e)}"}
+
+async def get_wikipedia_info_async(company_name):
+    """Get company information from Wikipedia."""
+    try:
+        # First search for the page
+        search_params = {
+            "action": "query",
+            "format": "json",
+            "list": "search",
+            "srsearch": f"{company_name} company",
+            "srlimit": 1
+        }
+        search_data = await _get_json(MEDIAWIKI_API_ENDPOINT, "mediawiki", params=search_params)
+        
+        if "query" in search_data and "search" in search_data["query"] and search_data["query"]["search"]:
+            page_title = search_data["query"]["search"][0]["title"]
+            
+            # Then get the page content
+            content_params = {
+                "action": "query",
+                "format": "json",
+                "prop": "extracts",
+                "exintro": "true",
+                "explaintext": "true",
+                "titles": page_title
+            }
+            content_data = await _get_json(MEDIAWIKI_API_ENDPOINT, "mediawiki", params=content_params)
+            
+            pages = content_data["query"]["pages"]
+            page_id = next(iter(pages))
+            
+            if "extract" in pages[page_id]:
+                return {
+                    "title": page_title,
+                    "extract": pages[page_id]["extract"]
+                }
+        
+        return {"error": f"No Wikipedia information found for {company_name}"}
+    except Exception as e:
+        logger.error(f"Error getting Wikipedia info: {str(e)}")
+        return {"error": f"Error retrieving Wikipedia information: {str(e)}"}
+
+async def extract_info_from_url_async(url):
+    """Extract information from a URL using Jina Reader API."""
+    try:
+        headers = {
+            "x-api-key": JINA_READER_API_KEY
+        }
+        payload = {
+            "url": url,
+            "include_metadata": True
+        }
+        data = await _post_json("https://api.jina.ai/v1/reader", "jina", headers=headers, payload=payload)
+        
+        if "text" in data:
+            return {
+                "title": data.get("metadata", {}).get("title", ""),
+                "text": data["text"]
+            }
+        else:
+            logger.error(f"Error extracting info from URL {url}: {data}")
+            return {"error": f"Could not extract information from {url}"}
+    except Exception as e:
+        logger.error(f"Error in extract_info_from_url_async: {str(e)}")
+        return {"error": f"Error extracting information from URL: {str(e)}"}
+
+@cached("symbol_search", SYMBOL_CACHE_TTL, key=_name_key)
+@coalesce("symbol_search", key=_name_key)
+async def search_company_symbol_async(company_name):
+    """Search for a company's stock symbol, offline first and via Alpha Vantage otherwise."""
+    listing = get_company_resolver().resolve(company_name)
+    if listing:
+        return listing["company_symbol"]
+    
     try:
-        # First try Alpha Vantage symbol search
         url = f"https://www.alphavantage.co/query?function=SYMBOL_SEARCH&keywords={company_name}&apikey={ALPHA_VANTAGE_API_KEY}"
-        response = requests.get(url)
-        data = response.json()
+        data = await _get_json(url, "alpha_vantage")
         
         if "bestMatches" in data and data["bestMatches"]:
-            # Return the symbol of the best match
             return data["bestMatches"][0]["1. symbol"]
         else:
             logger.warning(f"No symbol found for {company_name} via Alpha Vantage")
             return None
     except Exception as e:
         logger.error(f"Error searching company symbol: {str(e)}")
-        return None
\ No newline at end of file
+        return None
+
+async def _with_timeout(source, coro):
+    """Run one source fetch under its own deadline, returning None on failure."""
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        result = await asyncio.wait_for(coro, timeout=SOURCE_TIMEOUTS.get(source, SOURCE_TIMEOUTS["default"]))
+        # Tools report failures as {"error": ...} rather than raising
+        outcome = "error" if isinstance(result, dict) and "error" in result else "ok"
+        return result
+    except asyncio.TimeoutError:
+        outcome = "timeout"
+        logger.warning(f"Timed out fetching {source}")
+    except Exception as e:
+        logger.error(f"Error fetching {source}: {str(e)}")
+    finally:
+        EXTERNAL_TOOL_SECONDS.observe(time.perf_counter() - start, tool=source, outcome=outcome)
+    return None
+
+async def _search_with_url_content(company_name, max_links=3):
+    """Run the Serper search, then extract the top result URLs concurrently."""
+    search_results = await search_company_info_async(company_name)
+    if not search_results or "error" in search_results:
+        return search_results, []
+    
+    links = [result.get("link") for result in search_results[:max_links] if result.get("link")]
+    url_infos = await asyncio.gather(
+        *(_with_timeout("url", extract_info_from_url_async(link)) for link in links)
+    )
+    return search_results, [info for info in url_infos if info and "error" not in info]
+
+@coalesce("external_fetch", key=lambda company_name, company_symbol=None: normalize_name(company_name))
+async def fetch_company_data_concurrently(company_name, company_symbol=None):
+    """Fetch every external source for a company at once and merge what arrives.
+    
+    Name-based sources start immediately; symbol-based sources start as soon as
+    the symbol is known. Each source has its own timeout, and a failed or slow
+    source is simply left out of the result.
+    
+    Returns a tuple of (company_symbol, company_data).
+    """
+    name_tasks = {
+        "news": asyncio.ensure_future(_with_timeout("news", get_company_news_async(company_name))),
+        "search_results": asyncio.ensure_future(_with_timeout("search", _search_with_url_content(company_name))),
+        "wikipedia": asyncio.ensure_future(_with_timeout("wikipedia", get_wikipedia_info_async(company_name))),
+    }
+    
+    if not company_symbol:
+        company_symbol = await _with_timeout("symbol", search_company_symbol_async(company_name))
+        logger.info(f"Found symbol for {company_name}: {company_symbol}")
+    
+    symbol_tasks = {}
+    if company_symbol:
+        symbol_tasks = {
+            "overview": asyncio.ensure_future(_with_timeout("overview", get_company_overview_async(company_symbol))),
+            "financials": asyncio.ensure_future(_with_timeout("financials", get_company_financials_async(company_symbol))),
+            "stock_price": asyncio.ensure_future(_with_timeout("stock_price", get_stock_price_async(company_symbol))),
+        }
+    
+    tasks = {**name_tasks, **symbol_tasks}
+    results = await asyncio.gather(*tasks.values())
+    
+    company_data = {}
+    for key, result in zip(tasks.keys(), results):
+        if key == "search_results" and result:
+            result, url_infos = result
+            if url_infos:
+                company_data["url_content"] = url_infos
+        if result and not isinstance(result, str) and "error" not in result:
+            company_data[key] = result
+    
+    return company_symbol, company_data
@@ -0,0 +1,150 @@
+# backend/app/tools/market_cache.py
+import asyncio
+import functools
+import logging
+import time
+from collections import OrderedDict
+from backend.app.config import MARKET_CACHE_MAX_ENTRIES
+
+logger = logging.getLogger(__name__)
+
+class _Entry:
+    __slots__ = ("value", "stored_at", "ttl", "stale_ttl")
+
+    def __init__(self, value, ttl, stale_ttl):
+        self.value = value
+        self.stored_at = time.time()
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+
+    def state(self, now):
+        """"fresh", "stale" (servable while refreshing) or "expired"."""
+        if not self.ttl:
+            return "fresh"
+        age = now - self.stored_at
+        if age <= self.ttl:
+            return "fresh"
+        if age <= self.ttl + self.stale_ttl:
+            return "stale"
+        return "expired"
+
+class TTLCache:
+    """In-memory cache where every namespace has its own TTL and stale window.
+
+    Entries are kept in LRU order and capped at ``max_entries``. Keys are
+    ``(namespace, args)`` tuples.
+    """
+
+    def __init__(self, max_entries=MARKET_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._refreshing = {}
+        self._stats = {}
+
+    def _count(self, namespace, outcome):
+        stats = self._stats.setdefault(namespace, {"hits": 0, "stale_hits": 0, "misses": 0})
+        stats[outcome] += 1
+
+    def lookup(self, key):
+        """Return (entry, state) where state is "fresh", "stale" or "miss"."""
+        entry = self._entries.get(key)
+        state = entry.state(time.time()) if entry else "expired"
+        if state == "expired":
+            if entry:
+                del self._entries[key]
+            self._count(key[0], "misses")
+            return None, "miss"
+        self._entries.move_to_end(key)
+        self._count(key[0], "hits" if state == "fresh" else "stale_hits")
+        return entry, state
+
+    def store(self, key, value, ttl, stale_ttl=0):
+        self._entries[key] = _Entry(value, ttl, stale_ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def refresh_in_background(self, key, fetch, ttl, stale_ttl, cacheable):
+        """Re-fetch a stale key once, however many callers see it stale."""
+        if key in self._refreshing:
+            return
+
+        async def refresh():
+            try:
+                value = await fetch()
+                if cacheable(value):
+                    self.store(key, value, ttl, stale_ttl)
+            except Exception as e:
+                logger.error(f"Error refreshing cache entry {key}: {str(e)}")
+            finally:
+                self._refreshing.pop(key, None)
+
+        self._refreshing[key] = asyncio.ensure_future(refresh())
+
+    def purge(self, namespace=None, key=None):
+        """Remove entries, optionally limited to one namespace and/or key. Returns the count."""
+        doomed = [
+            k for k in self._entries
+            if (namespace is None or k[0] == namespace) and (key is None or key in k[1])
+        ]
+        for k in doomed:
+            del self._entries[k]
+        return len(doomed)
+
+    def snapshot(self):
+        """Stats per namespace plus a description of every entry."""
+        now = time.time()
+        return {
+            "stats": {name: dict(stats) for name, stats in self._stats.items()},
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "refreshing": len(self._refreshing),
+            "entries": [
+                {
+                    "namespace": k[0],
+                    "key": list(k[1]),
+                    "age_seconds": round(now - entry.stored_at, 1),
+                    "ttl": entry.ttl or None,
+                    "state": entry.state(now)
+                }
+                for k, entry in self._entries.items()
+            ]
+        }
+
+market_cache = TTLCache()
+
+def _is_cacheable(value):
+    """Only successful results are cached; error dicts and empty results are not."""
+    if value is None:
+        return False
+    if isinstance(value, dict) and "error" in value:
+        return False
+    return True
+
+def cached(namespace, ttl, stale_ttl=0, key=lambda *args: args):
+    """Cache an async tool's results in ``market_cache`` under ``namespace``.
+
+    Fresh entries are returned directly. Stale entries are returned immediately
+    while one background call refreshes them (stale-while-revalidate). ``key``
+    normalizes the call arguments. The undecorated function is available as
+    ``wrapper.uncached``.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args):
+            cache_key = (namespace, tuple(key(*args)))
+            entry, state = market_cache.lookup(cache_key)
+            if state == "fresh":
+                return entry.value
+            if state == "stale":
+                market_cache.refresh_in_background(
+                    cache_key, lambda: func(*args), ttl, stale_ttl, _is_cacheable
+                )
+                return entry.value
+            value = await func(*args)
+            if _is_cacheable(value):
+                market_cache.store(cache_key, value, ttl, stale_ttl)
+            return value
+        wrapper.uncached = func
+        return wrapper
+    return decorator
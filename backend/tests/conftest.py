@@ -0,0 +1,59 @@
+# backend/tests/conftest.py
+import asyncio
+import pytest
+from backend.app import data_ingestion
+from backend.app.memory.bm25 import BM25Index
+from backend.app.memory.manifest import ChunkManifest
+
+class FakeIndex:
+    """Stands in for the Pinecone index and records every write."""
+
+    def __init__(self):
+        self.upserted = []
+        self.vectors = {}
+
+    def upsert(self, vectors):
+        self.upserted.extend(vectors)
+        self.vectors.update((key, vector) for key, vector, _ in vectors)
+
+    def fetch(self, ids):
+        return {"vectors": {key: self.vectors[key] for key in ids if key in self.vectors}}
+
+    def delete(self, ids=None, filter=None):
+        for key in ids or ():
+            self.vectors.pop(key, None)
+
+@pytest.fixture
+def pipeline(tmp_path, monkeypatch):
+    """Run the real ingestion pipeline against fake sources and a fake index."""
+    index = FakeIndex()
+    manifest = ChunkManifest(tmp_path / "manifest.sqlite3")
+    bm25 = BM25Index(tmp_path / "bm25.sqlite3")
+    state = {"embedding_started": asyncio.Event(), "release": None, "embedding_calls": 0}
+
+    async def search_company_info(company_name):
+        return {"organic": [{"title": f"{company_name} overview", "snippet": "Makes widgets."}]}
+
+    async def fetch_wikipedia_info(company_name):
+        return f"{company_name} is a widget maker founded in 1999."
+
+    async def fetch_news(company_name):
+        return []
+
+    async def batch_generate_embeddings(texts, task_type="retrieval_query", **kwargs):
+        state["embedding_calls"] += 1
+        state["embedding_started"].set()
+        if state["release"] is not None:
+            await state["release"].wait()
+        return [[0.1, 0.2, 0.3] for _ in texts]
+
+    monkeypatch.setattr(data_ingestion, "search_company_info", search_company_info)
+    monkeypatch.setattr(data_ingestion, "fetch_wikipedia_info", fetch_wikipedia_info)
+    monkeypatch.setattr(data_ingestion, "fetch_news", fetch_news)
+    monkeypatch.setattr(data_ingestion, "canonical_company", lambda name, symbol=None: (name, symbol))
+    monkeypatch.setattr(data_ingestion, "initialize_pinecone", lambda: index)
+    monkeypatch.setattr(data_ingestion, "delete_company_data", lambda index, company_name: None)
+    monkeypatch.setattr(data_ingestion, "get_chunk_manifest", lambda: manifest)
+    monkeypatch.setattr(data_ingestion, "get_bm25_index", lambda: bm25)
+    monkeypatch.setattr(data_ingestion, "batch_generate_embeddings", batch_generate_embeddings)
+    return {"index": index, "manifest": manifest, "bm25": bm25, "state": state, "tmp_path": tmp_path}
@@ -0,0 +1,55 @@
+# backend/tests/test_answer_cache.py
+import time
+from backend.app.answer_cache import SemanticAnswerCache
+
+def _cache(**kwargs):
+    options = {"threshold": 0.9, "ttl": 3600, "max_per_company": 3, "max_companies": 2, "enabled": True}
+    return SemanticAnswerCache(**{**options, **kwargs})
+
+def test_similar_query_for_the_same_company_hits():
+    cache = _cache()
+    cache.store("Widget Co", "What is Widget Co's revenue?", [1.0, 0.0, 0.1], "About $1B.")
+
+    answer, similarity, cached_query = cache.lookup("widget co", [1.0, 0.05, 0.1])
+    assert answer == "About $1B."
+    assert similarity > 0.99
+    assert cached_query == "What is Widget Co's revenue?"
+    assert cache.lookup("Widget Co", [0.0, 1.0, 0.0]) is None
+    assert cache.lookup("Gadget Inc", [1.0, 0.0, 0.1]) is None
+    assert cache.lookup("Widget Co", [1.0, 0.0, 0.1], bypass=True) is None
+
+def test_equivalent_question_replaces_the_old_answer():
+    cache = _cache()
+    cache.store("Widget Co", "revenue?", [1.0, 0.0], "Old answer.")
+    cache.store("Widget Co", "what is the revenue?", [1.0, 0.01], "New answer.")
+    assert cache.stats()["entries"] == 1
+    assert cache.lookup("Widget Co", [1.0, 0.0])[0] == "New answer."
+
+def test_expired_answers_miss():
+    cache = _cache(ttl=0.01)
+    cache.store("Widget Co", "revenue?", [1.0, 0.0], "About $1B.")
+    time.sleep(0.02)
+    assert cache.lookup("Widget Co", [1.0, 0.0]) is None
+
+def test_invalidation_drops_answers_and_blocks_stale_stores():
+    cache = _cache()
+    started_at = time.time()
+    cache.store("Widget Co", "revenue?", [1.0, 0.0], "About $1B.")
+    assert cache.invalidate("Widget Co") == 1
+    assert cache.lookup("Widget Co", [1.0, 0.0]) is None
+    # An answer generated before the invalidation is not stored
+    assert not cache.store("Widget Co", "revenue?", [1.0, 0.0], "About $1B.", started_at=started_at - 1)
+    assert cache.store("Widget Co", "revenue?", [1.0, 0.0], "About $2B.", started_at=time.time() + 1)
+
+def test_companies_and_entries_are_capped():
+    cache = _cache()
+    for i, vector in enumerate(([1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0], [-1.0, 0.0, 0.0])):
+        cache.store("Widget Co", f"question {i}", vector, f"answer {i}")
+    assert cache.stats()["entries"] == 3
+    cache.store("Gadget Inc", "q", [1.0, 0.0, 0.0], "a")
+    cache.store("Sprocket Ltd", "q", [1.0, 0.0, 0.0], "a")
+
+    stats = cache.stats()
+    assert stats["companies"] == 2
+    assert cache.lookup("Widget Co", [1.0, 0.0, 0.0]) is None
+    assert cache.lookup("Sprocket Ltd", [1.0, 0.0, 0.0])[0] == "a"
@@ -0,0 +1,47 @@
+# backend/tests/test_bm25.py
+import pytest
+from backend.app.memory.bm25 import BM25Index, tokenize
+
+DOCS = [
+    ("w1", "Widget Co launched the Model X widget in 2024.", {"company_name": "Widget Co"}),
+    ("w2", "Widget Co revenue grew on strong widget sales.", {"company_name": "Widget Co"}),
+    ("w3", "The company is headquartered in Springfield.", {"company_name": "Widget Co"}),
+    ("g1", "Gadget Inc launched the Model X gadget.", {"company_name": "Gadget Inc"}),
+]
+
+@pytest.fixture
+def index(tmp_path):
+    index = BM25Index(tmp_path / "bm25.sqlite3")
+    index.add_many(DOCS)
+    return index
+
+def test_tokenize_drops_stopwords_and_stems():
+    assert tokenize("What did Apple's CEO say about launches?") == ["apple", "ceo", "say", "launch"]
+    assert tokenize("BRK.B and AT&T") == ["brk.b", "at&t"]
+
+def test_search_ranks_matching_chunks_within_a_company(index):
+    matches = index.search("Model X launch", company_name="widget co")
+    assert [m["id"] for m in matches] == ["w1"]
+    assert matches[0]["matched_terms"] == matches[0]["query_terms"] == 3
+
+    everywhere = index.search("Model X launch")
+    assert {m["id"] for m in everywhere} == {"w1", "g1"}
+    assert index.search("Model X", company_name="Nobody Ltd") == []
+
+def test_rare_terms_score_higher(index):
+    (best, *_) = index.search("widget Springfield", company_name="Widget Co")
+    assert best["id"] == "w3"
+
+def test_replace_and_remove(index):
+    index.add_many([("w1", "Widget Co opened a new plant.", {"company_name": "Widget Co"})])
+    assert not index.search("Model X", company_name="Widget Co")
+    index.remove_many(["w2"])
+    assert "w2" not in index
+    assert index.remove_company("Widget Co") == 2
+    assert len(index) == 1
+
+def test_index_reloads_from_disk(index, tmp_path):
+    reloaded = BM25Index(tmp_path / "bm25.sqlite3")
+    assert len(reloaded) == len(DOCS)
+    assert reloaded.search("Model X launch", company_name="Gadget Inc")[0]["id"] == "g1"
+    assert reloaded.document_frequency("model") == 0.5
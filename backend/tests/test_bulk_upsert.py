@@ -0,0 +1,95 @@
+# backend/tests/test_bulk_upsert.py
+import asyncio
+import threading
+import pytest
+from backend.app.memory.bulk_upsert import BulkUpsertWriter
+
+class RecordingIndex:
+    def __init__(self, failures=0, delay=0.0):
+        self.batches = []
+        self.failures = failures
+        self.delay = delay
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def upsert(self, vectors):
+        with self._lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            threading.Event().wait(self.delay)
+            with self._lock:
+                if self.failures:
+                    self.failures -= 1
+                    raise RuntimeError("upsert failed")
+                self.batches.append([key for key, _, _ in vectors])
+        finally:
+            with self._lock:
+                self.active -= 1
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    """Retry without waiting out the backoff."""
+    real_sleep = asyncio.sleep
+
+    async def sleep(seconds):
+        await real_sleep(0)
+    monkeypatch.setattr(asyncio, "sleep", sleep)
+
+def _fill(writer, count):
+    for i in range(count):
+        writer.add(f"v{i}", [0.1], {"i": i})
+
+def test_vectors_are_written_in_bounded_concurrent_batches():
+    index = RecordingIndex(delay=0.02)
+
+    async def main():
+        async with BulkUpsertWriter(index, batch_size=10, max_concurrency=2) as writer:
+            _fill(writer, 45)
+        return writer
+
+    writer = asyncio.run(main())
+    assert sorted(len(batch) for batch in index.batches) == [5, 10, 10, 10, 10]
+    assert index.max_active <= 2
+    assert sorted(writer.written_ids) == sorted(f"v{i}" for i in range(45))
+    summary = writer.summary()
+    assert summary["vectors_written"] == 45
+    assert summary["failed_batches"] == 0
+
+def test_failed_batches_are_retried_then_reported():
+    index = RecordingIndex(failures=1)
+
+    async def main():
+        writer = BulkUpsertWriter(index, batch_size=10, max_retries=2)
+        _fill(writer, 10)
+        return await writer.close()
+
+    summary = asyncio.run(main())
+    assert summary["vectors_written"] == 10
+    assert summary["retries"] == 1
+
+    index = RecordingIndex(failures=5)
+
+    async def give_up():
+        writer = BulkUpsertWriter(index, batch_size=10, max_retries=2)
+        _fill(writer, 10)
+        return await writer.close(), writer
+
+    summary, writer = asyncio.run(give_up())
+    assert summary["vectors_failed"] == 10
+    assert summary["batch_stats"][0]["attempts"] == 3
+    assert writer.written_ids == []
+
+def test_leaving_the_block_with_an_error_drops_the_buffer():
+    index = RecordingIndex()
+
+    async def main():
+        with pytest.raises(ValueError):
+            async with BulkUpsertWriter(index, batch_size=10) as writer:
+                _fill(writer, 5)
+                raise ValueError("embedding failed")
+        await asyncio.sleep(0)
+
+    asyncio.run(main())
+    assert index.batches == []
@@ -0,0 +1,71 @@
+# backend/tests/test_chat_store.py
+import json
+import pytest
+from backend.app.chat_store import ChatStore, DEFAULT_TITLE
+
+@pytest.fixture
+def store(tmp_path):
+    return ChatStore(tmp_path / "chats.sqlite3")
+
+def _save(store, chat_id, updated_at, messages=1):
+    store.save_chat(chat_id, {
+        "title": f"Chat {chat_id}",
+        "createdAt": updated_at,
+        "updatedAt": updated_at,
+        "messages": [{"role": "user", "content": f"message {i}"} for i in range(messages)]
+    })
+
+def test_pages_cover_every_chat_once_in_order(store):
+    # Several chats share an updated_at, so the cursor must break ties by id
+    for i in range(7):
+        _save(store, f"chat-{i}", f"2026-01-0{1 + i // 3}T00:00:00")
+
+    seen, cursor = [], None
+    while True:
+        chats, cursor = store.list_chats(limit=3, cursor=cursor, summaries_only=True)
+        seen.extend(chat["id"] for chat in chats)
+        if cursor is None:
+            break
+
+    everything, last_cursor = store.list_chats()
+    assert seen == [chat["id"] for chat in everything]
+    assert sorted(seen) == [f"chat-{i}" for i in range(7)]
+    assert last_cursor is None
+
+def test_summaries_carry_message_counts(store):
+    _save(store, "chat-a", "2026-01-01T00:00:00", messages=3)
+    (summary,), _ = store.list_chats(limit=5, summaries_only=True)
+    assert summary["messageCount"] == 3
+    assert "messages" not in summary
+    (full,), _ = store.list_chats(limit=5)
+    assert len(full["messages"]) == 3
+
+def test_invalid_cursor_is_rejected(store):
+    with pytest.raises(ValueError):
+        store.list_chats(limit=2, cursor="not-a-cursor")
+
+def test_append_message_creates_and_titles_a_chat(store):
+    store.append_message("chat-a", {"role": "user", "content": "What is Tesla's market cap right now?"})
+    store.append_message("chat-a", {"role": "assistant", "content": "About $800B."})
+
+    chat = store.get_chat("chat-a")
+    assert chat["title"] == "What is Tesla's market cap rig..."
+    assert [m["role"] for m in chat["messages"]] == ["user", "assistant"]
+    assert store.update_title("chat-a", "Tesla")
+    assert store.get_chat("chat-a")["title"] == "Tesla"
+    assert store.delete_chat("chat-a")
+    assert store.get_chat("chat-a") is None
+    assert not store.delete_chat("chat-a")
+
+def test_legacy_json_chats_are_migrated_once(store, tmp_path):
+    chat_dir = tmp_path / "legacy"
+    chat_dir.mkdir()
+    (chat_dir / "chat-a.json").write_text(json.dumps({
+        "id": "chat-a", "title": DEFAULT_TITLE, "messages": [{"role": "user", "content": "hi"}], "pinned": True
+    }))
+
+    assert store.migrate_json_chats(chat_dir) == 1
+    assert store.migrate_json_chats(chat_dir) == 0
+    chat = store.get_chat("chat-a")
+    assert chat["pinned"] is True
+    assert (chat_dir / "chat-a.json.migrated").exists()
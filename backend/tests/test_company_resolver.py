@@ -0,0 +1,63 @@
+# backend/tests/test_company_resolver.py
+import pytest
+from backend.app.tools import company_resolver
+from backend.app.tools.company_resolver import CompanyResolver, canonical_company, normalize_company
+
+LISTINGS = [
+    {"symbol": "AAPL", "name": "Apple Inc.", "exchange": "NASDAQ"},
+    {"symbol": "ORCL", "name": "Oracle Corporation", "exchange": "NYSE"},
+    {"symbol": "BRK.B", "name": "Berkshire Hathaway Inc.", "exchange": "NYSE", "aliases": ["Berkshire"]},
+    {"symbol": "WFC", "name": "Wells Fargo & Company", "exchange": "NYSE"},
+    {"symbol": "TSLA", "name": "Tesla, Inc.", "exchange": "NASDAQ"},
+]
+
+@pytest.fixture
+def resolver():
+    return CompanyResolver(LISTINGS)
+
+def test_normalize_company():
+    assert normalize_company("Apple Inc.") == "apple"
+    assert normalize_company("The Walt Disney Company") == "walt disney"
+    assert normalize_company("Wells Fargo & Company") == "wells fargo"
+    assert normalize_company("Apple's") == "apple"
+
+def test_resolve_is_exact_only(resolver):
+    assert resolver.resolve("apple")["company_symbol"] == "AAPL"
+    assert resolver.resolve("Berkshire")["company_symbol"] == "BRK.B"
+    assert resolver.resolve("brk.b")["method"] == "symbol"
+    assert resolver.resolve("Wells") is None
+    assert resolver.resolve("Tesler") is None
+    assert resolver.resolve("  ") is None
+
+def test_suggest_offers_prefix_and_fuzzy_matches(resolver):
+    assert [s["company_symbol"] for s in resolver.suggest("Wells")] == ["WFC"]
+    assert resolver.suggest("Berkshire Hathway")[0]["company_symbol"] == "BRK.B"
+    assert resolver.suggest("Zzzz") == []
+
+@pytest.mark.parametrize("query, symbol", [
+    ("What is Apple's revenue this year?", "AAPL"),
+    ("How is Berkshire Hathaway doing?", "BRK.B"),
+    ("Latest news on TSLA", "TSLA"),
+    ("Oracle stock price", "ORCL"),
+    ("WHAT IS TESLA'S MARKET CAP", "TSLA"),
+])
+def test_find_in_query_finds_one_company(resolver, query, symbol):
+    assert resolver.find_in_query(query)["company_symbol"] == symbol
+
+@pytest.mark.parametrize("query", [
+    "What did the Oracle tell Neo?",
+    "Ask THE ORACLE anything",
+    "Compare Apple and Tesla revenue",
+    "how do apple pies taste",
+    "What is the GDP of the US?",
+    "",
+])
+def test_find_in_query_leaves_ambiguous_queries_alone(resolver, query):
+    assert resolver.find_in_query(query) is None
+
+def test_canonical_company(resolver, monkeypatch):
+    monkeypatch.setattr(company_resolver, "_resolver", resolver)
+    assert canonical_company("apple") == ("Apple Inc.", "AAPL")
+    assert canonical_company("Apple Inc", "AAPL.X") == ("Apple Inc.", "AAPL.X")
+    assert canonical_company("Some Startup", None) == ("Some Startup", None)
+    assert canonical_company("Some Startup", "TSLA") == ("Tesla, Inc.", "TSLA")
@@ -0,0 +1,62 @@
+# backend/tests/test_context.py
+from backend.app.agent.context import (
+    compact_key_values,
+    compact_table,
+    estimate_tokens,
+    pack_context,
+    QUOTE_FIELDS
+)
+
+LOREM = (
+    "Widget Co designs and sells industrial widgets to manufacturers across Europe and Asia. "
+    "Its largest plant is in Springfield, where it employs about four thousand people. "
+)
+
+def test_near_duplicates_are_dropped():
+    passages = [
+        {"text": LOREM, "score": 0.9},
+        {"text": LOREM + " ", "score": 0.8},
+        {"text": LOREM[:120], "score": 0.7},
+        {"text": "Gadget Inc is a competitor based in Shelbyville.", "score": 0.6},
+    ]
+    context, stats = pack_context(passages, token_budget=1000)
+    assert stats["duplicates"] == 2
+    assert stats["packed"] == 2
+    assert context.count("industrial widgets") == 1
+    assert "Shelbyville" in context
+
+def test_budget_is_respected_and_last_passage_truncated():
+    passages = [f"Passage {i}. " + LOREM * 3 for i in range(10)]
+    context, stats = pack_context(passages, token_budget=250, dedup_threshold=1.1)
+    assert estimate_tokens(context) <= 250
+    assert stats["truncated"] == 1
+    assert context.endswith(" ...")
+
+def test_overlap_with_a_packed_chunk_is_trimmed():
+    first = "Chapter one. " + LOREM
+    second = LOREM[-80:] + "Revenue grew 12% in 2024 on strong demand for the Model X widget."
+    context, _ = pack_context([first, second], token_budget=1000, dedup_threshold=1.1)
+    assert context.count("four thousand people") == 1
+    assert "Revenue grew 12%" in context
+
+def test_mmr_prefers_a_different_source_over_a_similar_chunk():
+    passages = [
+        {"text": LOREM + "Founded in 1950.", "score": 0.95},
+        {"text": LOREM + "Founded in 1950 by the Smith family.", "score": 0.94},
+        {"text": "Stock Price: 123.45 USD, down 2% today.", "score": 0.5},
+    ]
+    context, stats = pack_context(passages, token_budget=80, dedup_threshold=1.1, min_tokens=1000)
+    assert stats["packed"] == 2
+    assert "Stock Price" in context
+    assert "Smith family" not in context
+
+def test_structured_data_is_compacted():
+    quote = {"symbol": "WDGT", "price": "123.45", "volume": "2950000000", "change": "None", "extra": "x"}
+    assert compact_table("Stock Price", quote, QUOTE_FIELDS) == (
+        "Stock Price:\nSymbol | WDGT\nPrice | 123.45\nVolume | 2.95B"
+    )
+    assert compact_table("Empty", {"price": "None"}, QUOTE_FIELDS) == ""
+
+    text = "Financial Information:\nMarketCapitalization: 2950000000000\nPERatio: None\nEPS: 6.1\nBeta: 1.2"
+    assert compact_key_values(text) == "Financial Information:\nMarketCapitalization: 2.95T\nEPS: 6.1\nBeta: 1.2"
+    assert compact_key_values("Just a sentence: with a colon.") == "Just a sentence: with a colon."
@@ -0,0 +1,74 @@
+# backend/tests/test_data_ingestion.py
+import asyncio
+from backend.app import data_ingestion
+from backend.app.data_ingestion import process_company_data, _ingestions
+
+def test_unchanged_data_is_not_written_twice(pipeline):
+    first = asyncio.run(process_company_data("Widget Co"))
+    written = len(pipeline["index"].upserted)
+    second = asyncio.run(process_company_data("Widget Co"))
+
+    assert first == second > 0
+    assert written > 0
+    assert len(pipeline["index"].upserted) == written
+
+def test_joined_ingestion_reports_progress_to_every_caller(pipeline):
+    state = pipeline["state"]
+
+    async def main():
+        state["release"] = asyncio.Event()
+        first_reports, second_reports = [], []
+        first = asyncio.ensure_future(process_company_data(
+            "Widget Co", progress=lambda stage, **counts: first_reports.append((stage, counts))
+        ))
+        await asyncio.wait_for(state["embedding_started"].wait(), 5)
+        second = asyncio.ensure_future(process_company_data(
+            "widget co", "WDGT", progress=lambda stage, **counts: second_reports.append((stage, counts))
+        ))
+        await asyncio.sleep(0.01)
+        # The joining caller first hears where the run is
+        assert second_reports == [("embedding", {"chunks_fetched": first_reports[-1][1]["chunks_fetched"]})]
+        state["release"].set()
+        return await asyncio.gather(first, second), first_reports, second_reports
+
+    (first_result, second_result), first_reports, second_reports = asyncio.run(main())
+    assert first_result == second_result
+    assert state["embedding_calls"] == 1
+    assert [stage for stage, _ in first_reports] == ["fetching", "embedding", "storing", "stored"]
+    assert [stage for stage, _ in second_reports] == ["embedding", "storing", "stored"]
+    assert second_reports[-1] == first_reports[-1]
+    # The joiner's symbol is not used
+    assert all(metadata["company_symbol"] == "" for _, _, metadata in pipeline["index"].upserted)
+    assert _ingestions == {}
+
+def test_changed_chunks_replace_old_ones(pipeline, monkeypatch):
+    asyncio.run(process_company_data("Widget Co"))
+    before = pipeline["manifest"].chunk_ids("Widget Co")
+
+    async def fetch_wikipedia_info(company_name):
+        return f"{company_name} now makes gadgets."
+
+    monkeypatch.setattr(data_ingestion, "fetch_wikipedia_info", fetch_wikipedia_info)
+    upserted = len(pipeline["index"].upserted)
+    asyncio.run(process_company_data("Widget Co"))
+    after = pipeline["manifest"].chunk_ids("Widget Co")
+
+    # Only the changed Wikipedia chunk is written; its old version is removed everywhere
+    assert len(pipeline["index"].upserted) == upserted + 1
+    assert len(after - before) == 1 and len(before - after) == 1
+    assert set(pipeline["index"].vectors) == after
+    assert len(pipeline["bm25"]) == len(after)
+
+def test_failed_source_keeps_its_chunks(pipeline, monkeypatch):
+    asyncio.run(process_company_data("Widget Co"))
+    before = pipeline["manifest"].chunk_sources("Widget Co")
+
+    async def fetch_wikipedia_info(company_name):
+        raise ValueError("Wikipedia is down")
+
+    monkeypatch.setattr(data_ingestion, "fetch_wikipedia_info", fetch_wikipedia_info)
+    asyncio.run(process_company_data("Widget Co"))
+
+    assert "wikipedia" in before.values()
+    assert pipeline["manifest"].chunk_sources("Widget Co") == before
+    assert set(pipeline["index"].vectors) == set(before)
@@ -0,0 +1,46 @@
+# backend/tests/test_embedding_cache.py
+import time
+from types import SimpleNamespace
+from backend.app import embedding_cache as embedding_cache_module
+from backend.app.embedding_cache import EmbeddingCache, cache_key
+
+def test_cache_key_ignores_whitespace_but_not_model_or_task():
+    key = cache_key("text-embedding-004", "retrieval_query", "What is  Apple's revenue?")
+    assert key == cache_key("text-embedding-004", "retrieval_query", " What is Apple's revenue? ")
+    assert key != cache_key("text-embedding-004", "retrieval_document", "What is Apple's revenue?")
+    assert key != cache_key("embedding-001", "retrieval_query", "What is Apple's revenue?")
+
+def test_round_trip_and_stats(tmp_path):
+    cache = EmbeddingCache(tmp_path / "embeddings.sqlite3", max_entries=10)
+    cache.put_many([("a", [0.5, -1.0]), ("b", [2.0, 0.25]), ("skipped", None)])
+
+    assert cache.get_many(["a", "b", "c", "a"]) == {"a": [0.5, -1.0], "b": [2.0, 0.25]}
+    assert cache.stats()["entries"] == 2
+    assert cache.stats()["hits"] == 3
+    assert cache.stats()["misses"] == 1
+    assert EmbeddingCache(tmp_path / "embeddings.sqlite3").get("b") == [2.0, 0.25]
+
+def test_least_recently_used_entries_are_evicted(tmp_path, monkeypatch):
+    clock = iter(range(1000, 2000))
+    monkeypatch.setattr(embedding_cache_module, "time", SimpleNamespace(time=lambda: next(clock), monotonic=time.monotonic))
+    monkeypatch.setattr(embedding_cache_module, "TOUCH_FLUSH_SIZE", 1)
+    cache = EmbeddingCache(tmp_path / "embeddings.sqlite3", max_entries=10)
+    for i in range(10):
+        cache.put(f"k{i}", [float(i)])
+    # Touch the two oldest so they survive
+    cache.get("k0")
+    cache.get("k1")
+    cache.put("k10", [10.0])
+
+    # Eviction trims down to 90% of the limit
+    assert cache.stats()["entries"] == 9
+    survivors = cache.get_many([f"k{i}" for i in range(11)])
+    assert {"k0", "k1", "k10"} <= set(survivors)
+    assert "k2" not in survivors and "k3" not in survivors
+
+def test_clear(tmp_path):
+    cache = EmbeddingCache(tmp_path / "embeddings.sqlite3")
+    cache.put("a", [1.0])
+    cache.clear()
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 0
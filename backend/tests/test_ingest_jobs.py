@@ -0,0 +1,125 @@
+# backend/tests/test_ingest_jobs.py
+import asyncio
+import pytest
+from backend.app.ingest_jobs import IngestJobManager, JobLedger, QueueFullError
+
+async def _wait_for_status(manager, job_id, statuses, timeout=5):
+    async def poll():
+        while True:
+            job = await manager.get(job_id)
+            if job["status"] in statuses:
+                return job
+            await asyncio.sleep(0.01)
+    return await asyncio.wait_for(poll(), timeout)
+
+def test_job_stores_vectors(pipeline):
+    async def main():
+        manager = IngestJobManager(workers=1, queue_size=4, ledger=JobLedger(pipeline["tmp_path"] / "jobs.sqlite3"))
+        await manager.start()
+        try:
+            job = await manager.submit("Widget Co")
+            return await _wait_for_status(manager, job["id"], {"succeeded", "failed"})
+        finally:
+            await manager.stop()
+
+    job = asyncio.run(main())
+    assert job["status"] == "succeeded"
+    assert job["progress"]["chunks_stored"] == len(pipeline["index"].upserted) > 0
+    assert pipeline["manifest"].has_company("Widget Co")
+
+def test_cancelled_job_writes_no_vectors(pipeline):
+    async def main():
+        state = pipeline["state"]
+        state["release"] = asyncio.Event()
+        manager = IngestJobManager(workers=1, queue_size=4, ledger=JobLedger(pipeline["tmp_path"] / "jobs.sqlite3"))
+        await manager.start()
+        try:
+            job = await manager.submit("Widget Co")
+            await asyncio.wait_for(state["embedding_started"].wait(), 5)
+            await manager.cancel(job["id"])
+            job = await _wait_for_status(manager, job["id"], {"cancelled", "succeeded", "failed"})
+            # Had the work carried on in the background, it would write once released
+            state["release"].set()
+            await asyncio.sleep(0.1)
+            return job
+        finally:
+            await manager.stop()
+
+    job = asyncio.run(main())
+    assert job["status"] == "cancelled"
+    assert pipeline["index"].upserted == []
+    assert not pipeline["manifest"].has_company("Widget Co")
+    assert len(pipeline["bm25"]) == 0
+
+def test_ledger_records_and_lists_jobs(tmp_path):
+    ledger = JobLedger(tmp_path / "jobs.sqlite3")
+    first = ledger.create("Widget Co", "WDGT")
+    second = ledger.create("Gadget Inc", None)
+    ledger.update(first["id"], status="running", stage="embedding", progress={"chunks_fetched": 12})
+    ledger.update(second["id"], status="succeeded", result={"chunks_processed": 3})
+
+    job = ledger.get(first["id"])
+    assert job["status"] == "running"
+    assert job["stage"] == "embedding"
+    assert job["progress"] == {"chunks_fetched": 12}
+    assert ledger.get(second["id"])["result"] == {"chunks_processed": 3}
+    assert ledger.get("missing") is None
+    assert [j["id"] for j in ledger.list(status="succeeded")] == [second["id"]]
+    assert [j["id"] for j in ledger.unfinished()] == [first["id"]]
+
+def test_unfinished_jobs_resume_on_restart(pipeline):
+    path = pipeline["tmp_path"] / "jobs.sqlite3"
+    ledger = JobLedger(path)
+    left_over = ledger.create("Widget Co", None)
+    ledger.update(left_over["id"], status="running", stage="embedding")
+
+    async def main():
+        manager = IngestJobManager(workers=1, queue_size=4, ledger=JobLedger(path))
+        await manager.start()
+        try:
+            return await _wait_for_status(manager, left_over["id"], {"succeeded", "failed"})
+        finally:
+            await manager.stop()
+
+    assert asyncio.run(main())["status"] == "succeeded"
+
+def test_submit_rejects_when_queue_is_full(tmp_path):
+    async def main():
+        manager = IngestJobManager(workers=0, queue_size=1, ledger=JobLedger(tmp_path / "jobs.sqlite3"))
+        await manager.start()
+        queued = await manager.submit("Widget Co")
+        with pytest.raises(QueueFullError):
+            await manager.submit("Gadget Inc")
+        cancelled = await manager.cancel(queued["id"])
+        await manager.stop()
+        return cancelled
+
+    assert asyncio.run(main())["status"] == "cancelled"
+
+def test_progress_reports_are_batched(pipeline, monkeypatch):
+    ledger = JobLedger(pipeline["tmp_path"] / "jobs.sqlite3")
+    updates = []
+    update = ledger.update
+    monkeypatch.setattr(ledger, "update", lambda job_id, **fields: (updates.append(fields), update(job_id, **fields)))
+
+    async def main():
+        manager = IngestJobManager(workers=1, queue_size=4, ledger=ledger)
+        job = ledger.create("Widget Co", None)
+        live_jobs = []
+
+        async def process_company_data(company_name, company_symbol=None, progress=None):
+            for i in range(100):
+                progress("embedding", chunks_embedded=i + 1)
+            live_jobs.append(await manager.get(job["id"]))
+            return 100
+
+        monkeypatch.setattr("backend.app.ingest_jobs.process_company_data", process_company_data)
+        await manager._run(job)
+        return live_jobs[0], ledger.get(job["id"])
+
+    live, final = asyncio.run(main())
+    # get() sees the latest report before it is written
+    assert live["progress"]["chunks_embedded"] == 100
+    assert final["status"] == "succeeded"
+    assert final["progress"]["chunks_embedded"] == 100
+    assert sum(1 for fields in updates if "stage" in fields and "status" not in fields) <= 2
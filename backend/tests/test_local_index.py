@@ -0,0 +1,70 @@
+# backend/tests/test_local_index.py
+import random
+import numpy as np
+from backend.app.memory.local_index import LocalVectorIndex, _MetadataIndex
+
+DIMENSION = 4
+COMPANIES = ["Widget Co", "Gadget Inc", "Sprocket Ltd", None]
+
+def _vector(i):
+    return np.random.default_rng(i).normal(size=DIMENSION).tolist()
+
+def _metadata(i):
+    company = COMPANIES[i % len(COMPANIES)]
+    metadata = {"text": f"chunk {i}", "tags": ["a", "b"] if i % 2 else ["a"]}
+    if company:
+        metadata["company_name"] = company
+    return metadata
+
+def _matches(meta, filter):
+    """Reference implementation: test each row's metadata directly."""
+    for field, condition in filter.items():
+        value = meta.get(field)
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        for op, operand in condition.items():
+            if op == "$eq" and value != operand:
+                return False
+            if op == "$ne" and value == operand:
+                return False
+            if op == "$in" and value not in operand:
+                return False
+            if op == "$nin" and value in operand:
+                return False
+    return True
+
+FILTERS = [
+    {"company_name": "Widget Co"},
+    {"company_name": {"$eq": "Gadget Inc"}},
+    {"company_name": {"$ne": "Widget Co"}},
+    {"company_name": {"$in": ["Widget Co", "Sprocket Ltd"]}},
+    {"company_name": {"$nin": ["Widget Co", None]}},
+    {"company_name": "Widget Co", "tags": ["a", "b"]},
+    {"company_name": "Nobody"},
+]
+
+def test_mask_matches_row_by_row_evaluation():
+    metadata = [_metadata(i) for i in range(50)]
+    index = _MetadataIndex()
+    for filter in FILTERS:
+        expected = [_matches(meta, filter) for meta in metadata]
+        assert index.mask(metadata, filter).tolist() == expected
+
+def test_filtered_query_stays_correct_as_rows_change():
+    index = LocalVectorIndex(dimension=DIMENSION)
+    index.upsert([(f"chunk-{i}", _vector(i), _metadata(i)) for i in range(40)])
+    # Build the field indexes, then change rows underneath them
+    index.query(_vector(0), top_k=5, filter={"company_name": "Widget Co"})
+    index.upsert([("chunk-0", _vector(0), {"company_name": "Gadget Inc"})])
+    index.delete(ids=[f"chunk-{i}" for i in random.Random(0).sample(range(1, 40), 15)])
+    index.delete(filter={"company_name": "Sprocket Ltd"})
+    index.upsert([(f"chunk-{i}", _vector(i), _metadata(i)) for i in range(40, 48)])
+
+    ns = index._namespaces[""]
+    for filter in FILTERS:
+        expected = {ns.ids[row] for row in range(ns.size) if _matches(ns.metadata[row], filter)}
+        response = index.query(_vector(0), top_k=100, filter=filter)
+        assert {match.id for match in response.matches} == expected
+    assert "chunk-0" in {m.id for m in index.query(_vector(0), top_k=100, filter={"company_name": "Gadget Inc"}).matches}
+    sprockets = index.query(_vector(0), top_k=100, filter={"company_name": "Sprocket Ltd"}).matches
+    assert {m.id for m in sprockets} == {"chunk-42", "chunk-46"}
@@ -0,0 +1,27 @@
+# backend/tests/test_manifest.py
+from backend.app.memory.manifest import ChunkManifest, chunk_id
+
+def test_chunk_id_is_deterministic_per_company():
+    assert chunk_id("Widget Co", "Some text") == chunk_id("widget co", "Some   text")
+    assert chunk_id("Widget Co", "Some text") != chunk_id("Widget Co", "Other text")
+    assert chunk_id("Widget Co", "Some text") != chunk_id("Gadget Inc", "Some text")
+    assert chunk_id("Widget Co", "Some text").startswith("widget_co_")
+
+def test_manifest_records_ids_and_sources(tmp_path):
+    manifest = ChunkManifest(tmp_path / "manifest.sqlite3")
+    assert not manifest.has_company("Widget Co")
+
+    manifest.add("Widget Co", ["a", "b"], {"a": "news"})
+    manifest.add("widget co", ["c"])
+    assert manifest.has_company("WIDGET CO")
+    assert manifest.chunk_ids("Widget Co") == {"a", "b", "c"}
+    assert manifest.chunk_sources("Widget Co") == {"a": "news", "b": None, "c": None}
+
+    manifest.remove("Widget Co", ["a"])
+    assert manifest.chunk_ids("Widget Co") == {"b", "c"}
+    manifest.clear("Widget Co")
+    assert not manifest.has_company("Widget Co")
+
+def test_manifest_persists(tmp_path):
+    ChunkManifest(tmp_path / "manifest.sqlite3").add("Widget Co", ["a"], {"a": "wikipedia"})
+    assert ChunkManifest(tmp_path / "manifest.sqlite3").chunk_sources("Widget Co") == {"a": "wikipedia"}
@@ -0,0 +1,93 @@
+# backend/tests/test_market_cache.py
+import asyncio
+import pytest
+from backend.app.tools import market_cache as market_cache_module
+from backend.app.tools.market_cache import TTLCache, cached
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(market_cache_module, "time", clock)
+    return clock
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = TTLCache(max_entries=3)
+    monkeypatch.setattr(market_cache_module, "market_cache", cache)
+    return cache
+
+def test_entries_go_stale_then_expire(clock):
+    cache = TTLCache()
+    key = ("quote", ("AAPL",))
+    cache.store(key, {"price": 1}, ttl=60, stale_ttl=30)
+
+    assert cache.lookup(key)[1] == "fresh"
+    clock.now += 61
+    assert cache.lookup(key)[1] == "stale"
+    clock.now += 30
+    assert cache.lookup(key) == (None, "miss")
+    assert cache.snapshot()["stats"]["quote"] == {"hits": 1, "stale_hits": 1, "misses": 1}
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = TTLCache(max_entries=2)
+    cache.store(("quote", ("A",)), 1, ttl=60)
+    cache.store(("quote", ("B",)), 2, ttl=60)
+    cache.lookup(("quote", ("A",)))
+    cache.store(("quote", ("C",)), 3, ttl=60)
+
+    assert cache.lookup(("quote", ("B",)))[1] == "miss"
+    assert cache.lookup(("quote", ("A",)))[0].value == 1
+
+def test_purge_by_namespace_and_key(clock):
+    cache = TTLCache()
+    cache.store(("quote", ("AAPL",)), 1, ttl=60)
+    cache.store(("quote", ("MSFT",)), 2, ttl=60)
+    cache.store(("overview", ("AAPL",)), 3, ttl=60)
+
+    assert cache.purge(key="AAPL") == 2
+    assert cache.purge(namespace="quote") == 1
+    assert cache.snapshot()["size"] == 0
+
+def test_cached_serves_stale_while_refreshing_once(clock, cache):
+    calls = []
+
+    @cached("quote", ttl=60, stale_ttl=300, key=lambda symbol: (symbol.upper(),))
+    async def fetch_quote(symbol):
+        calls.append(symbol)
+        await asyncio.sleep(0.01)
+        return {"price": len(calls)}
+
+    async def main():
+        assert await fetch_quote("aapl") == {"price": 1}
+        assert await fetch_quote("AAPL") == {"price": 1}
+        clock.now += 120
+        stale = await asyncio.gather(fetch_quote("AAPL"), fetch_quote("aapl"))
+        await asyncio.sleep(0.05)
+        return stale, await fetch_quote("AAPL")
+
+    stale, refreshed = asyncio.run(main())
+    assert stale == [{"price": 1}, {"price": 1}]
+    assert refreshed == {"price": 2}
+    assert len(calls) == 2
+
+def test_error_results_are_not_cached(clock, cache):
+    calls = []
+
+    @cached("quote", ttl=60)
+    async def fetch_quote(symbol):
+        calls.append(symbol)
+        return {"error": "rate limited"}
+
+    async def main():
+        await fetch_quote("AAPL")
+        await fetch_quote("AAPL")
+
+    asyncio.run(main())
+    assert len(calls) == 2
@@ -0,0 +1,104 @@
+# backend/tests/test_rate_limit.py
+import asyncio
+import time
+import pytest
+from backend.app import rate_limit
+from backend.app.rate_limit import (
+    RateLimitError,
+    TokenBucket,
+    is_rate_limit_error,
+    parse_retry_after,
+    raise_for_rate_limit,
+    retry_async
+)
+
+class FakeResponse:
+    def __init__(self, status, headers=None):
+        self.status = status
+        self.headers = headers or {}
+
+def test_bucket_allows_a_burst_then_paces_requests():
+    async def main():
+        bucket = TokenBucket("test", rate=50, capacity=3)
+        started = time.monotonic()
+        for _ in range(3):
+            await bucket.acquire()
+        burst = time.monotonic() - started
+        for _ in range(5):
+            await bucket.acquire()
+        return burst, time.monotonic() - started
+
+    burst, total = asyncio.run(main())
+    assert burst < 0.02
+    # Five more tokens at 50 per second take about 0.1s
+    assert 0.08 <= total < 0.5
+
+def test_block_for_holds_back_the_bucket():
+    async def main():
+        bucket = TokenBucket("test", rate=1000, capacity=10)
+        bucket.block_for(0.1)
+        started = time.monotonic()
+        await bucket.acquire()
+        return time.monotonic() - started
+
+    assert asyncio.run(main()) >= 0.09
+
+def test_parse_retry_after():
+    assert parse_retry_after("12") == 12.0
+    assert parse_retry_after("-3") == 0.0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
+
+def test_rate_limit_errors_are_recognized():
+    assert is_rate_limit_error(RateLimitError("gemini"))
+    assert is_rate_limit_error(Exception("429 Resource exhausted: quota exceeded"))
+    try:
+        try:
+            raise RateLimitError("gemini")
+        except RateLimitError as e:
+            raise ValueError("wrapped") from e
+    except ValueError as wrapped:
+        assert is_rate_limit_error(wrapped)
+    assert not is_rate_limit_error(ValueError("bad request"))
+
+def test_429_response_raises_and_pauses_the_upstream(monkeypatch):
+    bucket = TokenBucket("serper", rate=5, capacity=10)
+    monkeypatch.setitem(rate_limit._buckets, "serper", bucket)
+    raise_for_rate_limit("serper", FakeResponse(200))
+    with pytest.raises(RateLimitError) as error:
+        raise_for_rate_limit("serper", FakeResponse(429, {"Retry-After": "2"}))
+    assert error.value.retry_after == 2.0
+    assert bucket.blocked_until > time.monotonic() + 1.5
+
+def test_retry_async_retries_rate_limits_only():
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise RateLimitError("test", retry_after=0.01)
+        return "ok"
+
+    async def broken():
+        attempts.append(1)
+        raise ValueError("bad request")
+
+    assert asyncio.run(retry_async(flaky, max_retries=3)) == "ok"
+    assert len(attempts) == 3
+
+    attempts.clear()
+    with pytest.raises(ValueError):
+        asyncio.run(retry_async(broken, max_retries=3))
+    assert len(attempts) == 1
+
+def test_retry_async_gives_up_after_max_retries():
+    attempts = []
+
+    async def limited():
+        attempts.append(1)
+        raise RateLimitError("test", retry_after=0)
+
+    with pytest.raises(RateLimitError):
+        asyncio.run(retry_async(limited, max_retries=2))
+    assert len(attempts) == 3
@@ -0,0 +1,50 @@
+# backend/tests/test_retrieval.py
+import pytest
+from backend.app.agent import retrieval
+from backend.app.agent.retrieval import (
+    is_exact_term_match,
+    lexical_retrieval,
+    merge_matches,
+    reciprocal_rank_fusion
+)
+from backend.app.memory.bm25 import BM25Index
+
+def _ranked(*ids):
+    return [{"id": doc_id, "score": 1.0, "text": doc_id, "metadata": {}} for doc_id in ids]
+
+def test_rrf_favours_chunks_found_by_both_retrievers():
+    fused = reciprocal_rank_fusion(_ranked("a", "b", "c"), _ranked("c", "d"), k=60)
+    assert [m["id"] for m in fused][:2] == ["c", "a"]
+    assert fused[0]["score"] == pytest.approx(1 / 63 + 1 / 61)
+    assert len(reciprocal_rank_fusion(_ranked("a", "b", "c"), top_k=2)) == 2
+
+def test_merge_matches_keeps_the_best_copy():
+    merged = merge_matches(
+        [{"id": "a", "score": 0.5}, {"id": "b", "score": 0.9}],
+        [{"id": "a", "score": 0.7}]
+    )
+    assert [(m["id"], m["score"]) for m in merged] == [("b", 0.9), ("a", 0.7)]
+
+@pytest.fixture
+def bm25(tmp_path, monkeypatch):
+    index = BM25Index(tmp_path / "bm25.sqlite3")
+    index.add_many([
+        ("w1", "Widget Co launched the Model X widget in 2024.", {"company_name": "Widget Co"}),
+        ("w2", "Widget Co revenue grew on strong widget sales.", {"company_name": "Widget Co"}),
+        ("w3", "Widget Co is headquartered in Springfield.", {"company_name": "Widget Co"}),
+    ])
+    monkeypatch.setattr(retrieval, "get_bm25_index", lambda: index)
+    monkeypatch.setattr(retrieval, "LEXICAL_ONLY_RETRIEVAL", True)
+    return index
+
+def test_specific_terms_are_answered_lexically(bm25):
+    matches, exact = lexical_retrieval("When was the Model X launched?", "Widget Co")
+    assert matches[0]["id"] == "w1"
+    assert exact
+
+def test_vague_questions_need_vector_search(bm25):
+    _, exact = lexical_retrieval("how is widget co doing", "Widget Co")
+    assert not exact
+    matches, exact = lexical_retrieval("What does the Model Y cost?", "Widget Co")
+    assert not exact
+    assert not is_exact_term_match("Model X", "Widget Co", [])
@@ -0,0 +1,129 @@
+# backend/tests/test_segment_store.py
+import numpy as np
+import pytest
+from backend.app.memory import segment_store
+from backend.app.memory.segment_store import SegmentedVectorIndex, quantize, dequantize
+
+DIMENSION = 4
+
+def _vector(i):
+    rng = np.random.default_rng(i)
+    return rng.normal(size=DIMENSION).tolist()
+
+def _record(i, company="Widget Co"):
+    return (f"chunk-{i}", _vector(i), {"company_name": company, "text": f"Chunk {i} text ✓"})
+
+def _open(path, **kwargs):
+    return SegmentedVectorIndex(path, dimension=DIMENSION, **kwargs)
+
+def _settle(index):
+    """Wait for any background compaction to finish."""
+    thread = index._compaction_thread
+    if thread is not None:
+        thread.join()
+
+@pytest.mark.parametrize("quantization", ["float16", "int8"])
+def test_quantization_round_trip(quantization):
+    vectors = np.random.default_rng(0).normal(size=(8, DIMENSION)).astype(np.float32)
+    codes, scales = quantize(vectors, quantization)
+    assert np.allclose(dequantize(codes, scales), vectors, atol=0.05)
+
+def test_query_and_fetch_read_text_from_disk(tmp_path):
+    index = _open(tmp_path)
+    index.upsert([_record(i) for i in range(3)])
+
+    segment = index._segments[0]
+    assert all("text" not in metadata for metadata in segment.metadata)
+
+    match = index.query(_vector(1), top_k=1).matches[0]
+    assert match.id == "chunk-1"
+    assert match.metadata == {"company_name": "Widget Co", "text": "Chunk 1 text ✓"}
+    assert index.fetch(["chunk-2"])["vectors"]["chunk-2"]["metadata"]["text"] == "Chunk 2 text ✓"
+    index.close()
+
+def test_delete_survives_reload(tmp_path):
+    index = _open(tmp_path)
+    index.upsert([_record(i) for i in range(4)])
+    index.upsert([_record(i, company="Gadget Inc") for i in range(4, 6)])
+    index.delete(ids=["chunk-0"])
+    index.delete(filter={"company_name": "Gadget Inc"})
+    index.close()
+
+    index = _open(tmp_path)
+    assert set(index.fetch([f"chunk-{i}" for i in range(6)])["vectors"]) == {"chunk-1", "chunk-2", "chunk-3"}
+    assert index.describe_index_stats()["total_vector_count"] == 3
+    index.close()
+
+def test_full_tier_is_merged(tmp_path):
+    index = _open(tmp_path, merge_factor=4)
+    for i in range(4):
+        index.upsert([_record(i)])
+    _settle(index)
+
+    assert len(index._segments) == 1
+    assert len(index._segments[0]) == 4
+    assert index.query(_vector(3), top_k=1).matches[0].metadata["text"] == "Chunk 3 text ✓"
+    index.close()
+
+def test_compaction_leaves_large_segments_alone(tmp_path):
+    index = _open(tmp_path, merge_factor=4)
+    index.upsert([_record(i) for i in range(100)])
+    large = index._segments[0].name
+    for i in range(100, 104):
+        index.upsert([_record(i)])
+    _settle(index)
+
+    assert [s.name for s in index._segments][0] == large
+    assert sorted(len(s) for s in index._segments) == [4, 100]
+    index.close()
+
+def test_write_amplification_is_logarithmic(tmp_path, monkeypatch):
+    written = []
+    write = segment_store._Segment.write.__func__
+
+    def counting_write(cls, directory, seq, dimension, quantization, parts, total):
+        written.append(total)
+        return write(cls, directory, seq, dimension, quantization, parts, total)
+
+    monkeypatch.setattr(segment_store._Segment, "write", classmethod(counting_write))
+    index = _open(tmp_path, merge_factor=4)
+    for i in range(64):
+        index.upsert([_record(i)])
+        _settle(index)
+
+    # Each row is written once, then rewritten once per tier (4 -> 16 -> 64)
+    assert sum(written) == 64 * 4
+    assert [len(s) for s in index._segments] == [64]
+    index.close()
+
+def test_deletes_in_older_segments_survive_partial_compaction(tmp_path):
+    index = _open(tmp_path, merge_factor=4)
+    index.upsert([_record(i) for i in range(100)])
+    index.delete(ids=["chunk-5"])
+    for i in range(100, 104):
+        index.upsert([_record(i)])
+    _settle(index)
+    # Overwrite and delete rows of the merged segment, then reload
+    index.upsert([(f"chunk-101", _vector(0), {"company_name": "Widget Co", "text": "rewritten"})])
+    index.delete(ids=["chunk-102"])
+    index.close()
+
+    index = _open(tmp_path, merge_factor=4)
+    vectors = index.fetch(["chunk-5", "chunk-100", "chunk-101", "chunk-102"])["vectors"]
+    assert set(vectors) == {"chunk-100", "chunk-101"}
+    assert vectors["chunk-101"]["metadata"]["text"] == "rewritten"
+    assert index.describe_index_stats()["total_vector_count"] == 102
+    index.close()
+
+def test_compact_all_and_reload(tmp_path):
+    index = _open(tmp_path)
+    for i in range(3):
+        index.upsert([_record(i)])
+    index.delete(ids=["chunk-1"])
+    index.compact()
+    assert len(index._segments) == 1
+    index.close()
+
+    index = _open(tmp_path)
+    assert set(index.fetch(["chunk-0", "chunk-1", "chunk-2"])["vectors"]) == {"chunk-0", "chunk-2"}
+    index.close()
@@ -0,0 +1,95 @@
+# backend/tests/test_singleflight.py
+import asyncio
+import pytest
+from backend.app.singleflight import SingleFlight, coalesce, normalize_name
+
+def test_concurrent_calls_share_one_execution():
+    group = SingleFlight("test")
+    calls = []
+
+    async def work(value):
+        calls.append(value)
+        await asyncio.sleep(0.01)
+        return value * 2
+
+    async def main():
+        return await asyncio.gather(*(group.do("k", work, 21) for _ in range(5)))
+
+    assert asyncio.run(main()) == [42] * 5
+    assert calls == [21]
+    assert group.stats() == {"calls": 1, "shared": 4, "in_flight": 0}
+
+def test_different_keys_run_separately():
+    @coalesce("test_keys", key=lambda name: normalize_name(name))
+    async def ingest(name):
+        await asyncio.sleep(0.01)
+        return f"data for {name}"
+
+    async def main():
+        return await asyncio.gather(ingest("Tesla"), ingest("Apple"), ingest(" apple "))
+
+    tesla, apple, apple_again = asyncio.run(main())
+    assert tesla == "data for Tesla"
+    assert apple == apple_again == "data for Apple"
+
+def test_exception_reaches_every_caller():
+    group = SingleFlight("test")
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def main():
+        return await asyncio.gather(group.do("k", fail), group.do("k", fail), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert all(isinstance(r, ValueError) for r in results)
+
+def test_cancelling_one_waiter_keeps_the_work_for_others():
+    group = SingleFlight("test")
+    finished = []
+
+    async def work():
+        await asyncio.sleep(0.05)
+        finished.append(True)
+        return "done"
+
+    async def main():
+        first = asyncio.ensure_future(group.do("k", work))
+        second = asyncio.ensure_future(group.do("k", work))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        assert await second == "done"
+        with pytest.raises(asyncio.CancelledError):
+            await first
+
+    asyncio.run(main())
+    assert finished == [True]
+
+def test_cancelling_the_last_waiter_cancels_the_work():
+    group = SingleFlight("test")
+    cancelled = []
+
+    async def work():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def main():
+        waiters = [asyncio.ensure_future(group.do("k", work)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        await asyncio.sleep(0)
+        assert cancelled == [True]
+        assert group.stats()["in_flight"] == 0
+
+        # A new caller starts a fresh call rather than joining the cancelled one
+        async def quick():
+            return "fresh"
+        assert await group.do("k", quick) == "fresh"
+
+    asyncio.run(main())
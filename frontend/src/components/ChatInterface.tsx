@@ -35,14 +35,14 @@ export default function ChatInterface() {
           updatedAt: chat.updatedAt
         })));
         
-        // If there are chats, select the most recent one
+        // If there are chats, select the most recent one and load its messages
         if (chats.length > 0) {
           const sortedChats = [...chats].sort((a, b) => 
             new Date(b.updatedAt).getTime() - new Date(a.updatedAt).getTime()
           );
-          const recentChat = sortedChats[0];
-          setCurrentChatId(recentChat.id);
-          setMessages(recentChat.messages);
+          const recentChat = await chatService.getChat(sortedChats[0].id);
+          setCurrentChatId(sortedChats[0].id);
+          setMessages(recentChat ? recentChat.messages : []);
         } else {
           // Create a new chat if none exist
           handleNewChat();
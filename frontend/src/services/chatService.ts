@@ -13,6 +13,14 @@ export interface Chat {
   updatedAt: string;
 }
 
+export interface ChatSummary {
+  id: string;
+  title: string;
+  createdAt: string;
+  updatedAt: string;
+  messageCount?: number;
+}
+
 // Local storage implementation (fallback)
 const LOCAL_STORAGE_KEY = 'company_research_chats';
 
@@ -39,11 +47,11 @@ export const chatService = {
     }
   },
   
-  // Get all chats
-  async getChats(): Promise<Chat[]> {
+  // Get all chats, most recently updated first (summaries only, without messages)
+  async getChats(): Promise<ChatSummary[]> {
     try {
       // Try to fetch from backend
-      const response = await fetch('http://localhost:8000/api/chats/', {
+      const response = await fetch('http://localhost:8000/api/chats/?summary=true', {
         method: 'GET',
         headers: {
           'Content-Type': 'application/json',